@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from htpy import Element, div, h2, parallel, section, table, tbody, td, tr
+
+SECTIONS = 64
+ROWS = 2_000
+
+
+def make_section(n: int) -> Element:
+    return section[
+        h2[f"Section {n}"],
+        table[tbody[(tr[td[str(row)], td[f"Cell {n}/{row}"]] for row in range(ROWS))]],
+    ]
+
+
+def sequential_page() -> str:
+    return str(div[(make_section(n) for n in range(SECTIONS))])
+
+
+def parallel_page(executor: ThreadPoolExecutor) -> str:
+    # Callables are used to delay building each section to the worker thread.
+    sections = [lambda n=n: make_section(n) for n in range(SECTIONS)]
+    return str(div[parallel(executor=executor)[sections]])
+
+
+def measure(func: Callable[[], str]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+print(f"Python {sys.version.split()[0]}, GIL enabled: {gil_enabled}, CPUs: {os.cpu_count()}")
+print(f"Page: {SECTIONS} sections x {ROWS} rows")
+
+assert sequential_page() == parallel_page(ThreadPoolExecutor(max_workers=2))
+
+baseline = measure(sequential_page)
+print(f"sequential: {baseline:.3f} seconds")
+
+workers = 1
+while workers <= max(os.cpu_count() or 1, 1) * 2:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        result = measure(lambda: parallel_page(executor))
+    print(f"parallel, {workers} workers: {result:.3f} seconds ({baseline / result:.2f}x)")
+    workers *= 2
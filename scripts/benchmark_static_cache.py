@@ -0,0 +1,56 @@
+import time
+from collections.abc import Callable
+
+import htpy as h
+from htpy import a, body, li, nav, table, tbody, td, th, thead, tr, ul
+
+ROWS = 5_000
+REPEATS = 20
+
+navbar = h.static(nav[ul[tuple(li[a(href=f"/page/{i}")[f"Page {i}"]] for i in range(50))]])
+
+
+def dynamic_table() -> str:
+    return str(table[thead[tr[th["Row #"]]], tbody[(tr[td[str(row)]] for row in range(ROWS))]])
+
+
+def tuple_table() -> str:
+    return str(table[thead[tr[th["Row #"]]], tbody[tuple(tr[td[str(row)]] for row in range(ROWS))]])
+
+
+def page_with_navbar() -> str:
+    return str(body[navbar, table[tbody[(tr[td[str(row)]] for row in range(ROWS))]]])
+
+
+def measure(func: Callable[[], str]) -> tuple[float, float]:
+    """Return the fastest render in milliseconds with the cache disabled and enabled.
+
+    The two configurations are interleaved to even out warmup and noise.
+    """
+    disabled = enabled = float("inf")
+    for _ in range(REPEATS):
+        h.disable_static_cache()
+        start = time.perf_counter()
+        func()
+        disabled = min(disabled, time.perf_counter() - start)
+
+        h.enable_static_cache()
+        start = time.perf_counter()
+        func()
+        enabled = min(enabled, time.perf_counter() - start)
+    h.disable_static_cache()
+    return disabled * 1000, enabled * 1000
+
+
+tests = [
+    ("dynamic table", dynamic_table),
+    ("dynamic table, tuple children", tuple_table),
+    ("page with static navbar", page_with_navbar),
+]
+
+print(f"Table: {ROWS} rows, fastest of {REPEATS} renders")
+for name, func in tests:
+    disabled, enabled = measure(func)
+    print(
+        f"{name}: {disabled:.1f} ms disabled, {enabled:.1f} ms enabled ({enabled / disabled:.2f}x)"
+    )
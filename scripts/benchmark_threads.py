@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from htpy import table, tbody, td, th, thead, tr
+
+ROWS = 10_000
+RENDERS_PER_THREAD = 10
+
+
+def render_table() -> str:
+    return str(table[thead[tr[th["Row #"]]], tbody[(tr[td[str(row)]] for row in range(ROWS))]])
+
+
+def run(threads: int) -> float:
+    """Return the number of rendered tables per second."""
+
+    def worker() -> None:
+        for _ in range(RENDERS_PER_THREAD):
+            render_table()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(worker) for _ in range(threads)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+
+    return threads * RENDERS_PER_THREAD / elapsed
+
+
+gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+print(f"Python {sys.version.split()[0]}, GIL enabled: {gil_enabled}, CPUs: {os.cpu_count()}")
+print(f"Table: {ROWS} rows, {RENDERS_PER_THREAD} renders per thread")
+
+baseline = run(1)
+print(f"1 thread: {baseline:.1f} tables/s")
+
+threads = 2
+while threads <= max(os.cpu_count() or 1, 2) * 2:
+    result = run(threads)
+    print(f"{threads} threads: {result:.1f} tables/s ({result / baseline:.2f}x)")
+    threads *= 2
@@ -1,17 +1,43 @@
 from __future__ import annotations
 
+from htpy._cache import CacheBackend as CacheBackend
+from htpy._cache import CachedFragment as CachedFragment
+from htpy._cache import FileCacheBackend as FileCacheBackend
+from htpy._cache import LRUCacheBackend as LRUCacheBackend
+from htpy._cache import cache as cache
+from htpy._cache import depends_on as depends_on
+from htpy._cache import invalidate_tags as invalidate_tags
+from htpy._cache_policy import CachePolicy as CachePolicy
+from htpy._cache_policy import cache_policy as cache_policy
+from htpy._compiled import compiled as compiled
 from htpy._contexts import Context as Context
 from htpy._contexts import ContextConsumer as ContextConsumer
 from htpy._contexts import ContextProvider as ContextProvider
+from htpy._diff import diff as diff
 from htpy._elements import BaseElement as BaseElement
 from htpy._elements import Element as Element
 from htpy._elements import HTMLElement as HTMLElement
 from htpy._elements import VoidElement as VoidElement
+from htpy._fingerprint import fingerprint as fingerprint
+from htpy._flush import flush as flush
 from htpy._fragments import Fragment as Fragment
 from htpy._fragments import comment as comment
 from htpy._fragments import fragment as fragment
 from htpy._legacy_rendering import iter_node as iter_node  # pyright: ignore[reportDeprecated]
 from htpy._legacy_rendering import render_node as render_node  # pyright: ignore[reportDeprecated]
+from htpy._memoize import memoize as memoize
+from htpy._memoize import render_once_per_args as render_once_per_args
+from htpy._optimize import optimize as optimize
+from htpy._parallel import Parallel as Parallel
+from htpy._parallel import parallel as parallel
+from htpy._render_many import render_many as render_many
+from htpy._render_many import render_many_to_files as render_many_to_files
+from htpy._shared_cache import SharedMemoryCacheBackend as SharedMemoryCacheBackend
+from htpy._static_cache import disable_static_cache as disable_static_cache
+from htpy._static_cache import enable_static_cache as enable_static_cache
+from htpy._static_cache import static as static
+from htpy._templates import Slot as Slot
+from htpy._templates import Template as Template
 from htpy._types import Attribute as Attribute
 from htpy._types import Node as Node
 from htpy._types import Renderable as Renderable
@@ -0,0 +1,567 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import typing as t
+import uuid
+from pathlib import Path
+
+from htpy._cache_policy import CachePolicy, PolicyRecorder, record_policy
+from htpy._cache_policy import current_recorder as current_policy_recorder
+from htpy._compression import DEFAULT_LEVEL, PrecompressedChunk, deflate_segment
+from htpy._elements import _validate_children  # pyright: ignore[reportPrivateUsage]
+from htpy._memoize import LRUCache
+from htpy._render_async import aiter_chunks_node
+from htpy._render_sync import chunks_as_markup, iter_chunks_node
+from htpy._single_flight import Flight, SingleFlight
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
+
+    import markupsafe
+
+    from htpy._contexts import Context
+    from htpy._types import Node
+
+
+# The prefix of the keys of tag versions in the backends.
+_TAG_PREFIX = "htpy-tag:"
+
+
+class CacheBackend(t.Protocol):
+    """Storage for cached fragments.
+
+    Backends store bytes by string keys. Entries expire after ttl seconds, or
+    never if ttl is None.
+
+    Backends can also implement get_many(keys), which returns the values of
+    several keys at once, in the same order. It is used to read the versions
+    of the tags of an entry in one call.
+    """
+
+    def get(self, key: str) -> bytes | None: ...
+    def set(self, key: str, value: bytes, ttl: float | None) -> None: ...
+
+
+class LRUCacheBackend:
+    """In-process cache of at most maxsize entries.
+
+    The versions of tags are kept apart from the entries, at most tags_maxsize
+    of them, so that storing entries does not evict the versions that other
+    entries depend on.
+    """
+
+    def __init__(self, maxsize: int | None = 1024, *, tags_maxsize: int | None = 65536) -> None:
+        self._cache: LRUCache[str, bytes] = LRUCache(maxsize)
+        self._tag_versions: LRUCache[str, bytes] = LRUCache(tags_maxsize)
+
+    def _store(self, key: str) -> LRUCache[str, bytes]:
+        return self._tag_versions if key.startswith(_TAG_PREFIX) else self._cache
+
+    def get(self, key: str) -> bytes | None:
+        return self._store(key).get(key)
+
+    def set(self, key: str, value: bytes, ttl: float | None) -> None:
+        self._store(key).set(key, value, ttl)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._tag_versions.clear()
+
+
+class FileCacheBackend:
+    """Cache stored as files in a local directory."""
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory)
+
+    # Backends of the same directory are equal, so that concurrent renderings
+    # of a fragment share one rendering even if each creates its own backend.
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FileCacheBackend) and other.directory == self.directory
+
+    def __hash__(self) -> int:
+        return hash((FileCacheBackend, self.directory))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        expires, _, value = data.partition(b"\n")
+        if expires and float(expires) <= time.time():
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float | None) -> None:
+        expires = b"" if ttl is None else str(time.time() + ttl).encode()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first, to never expose partially written
+        # entries to readers.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(expires + b"\n" + value)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+
+default_backend: CacheBackend = LRUCacheBackend()
+
+
+def encode_entry(html: str, header: Mapping[str, t.Any], deflated: bytes | None = None) -> bytes:
+    """Encode HTML as a cache entry, with a JSON header for metadata.
+
+    deflated is the compressed form of the HTML made with deflate_segment(),
+    stored after the HTML.
+    """
+    if deflated is not None:
+        header = {**header, "deflate": [DEFAULT_LEVEL, len(deflated)]}
+    data = json.dumps(header, separators=(",", ":")).encode() + b"\n" + html.encode()
+    return data + deflated if deflated is not None else data
+
+
+def decode_entry(data: bytes) -> tuple[dict[str, t.Any], str] | None:
+    """Decode a cache entry. Returns None for invalid entries.
+
+    The HTML is a PrecompressedChunk if the entry has a compressed form.
+    """
+    header_data, sep, html_data = data.partition(b"\n")
+    if not sep:
+        return None
+    try:
+        header = json.loads(header_data)
+        if "deflate" not in header:
+            return header, html_data.decode()
+        level, size = header["deflate"]
+        if not 0 < size <= len(html_data):
+            return None
+        html = html_data[:-size].decode()
+    except ValueError:
+        return None
+    return header, PrecompressedChunk.with_deflated(html, html_data[-size:], level)
+
+
+class _Entry(t.NamedTuple):
+    html: str
+    fresh: bool
+    tags: dict[str, str]
+    policy: CachePolicy | None
+
+    def record(self) -> None:
+        # Make the tags and cache policy of this entry part of the enclosing
+        # cached fragments and responses.
+        if (recorder := _recorder.get()) is not None:
+            recorder.add(self.tags)
+        if self.policy is not None:
+            record_policy(self.policy)
+
+
+def _tag_key(tag: str) -> str:
+    return f"{_TAG_PREFIX}{tag}"
+
+
+def _get_many(backend: CacheBackend, keys: list[str]) -> list[bytes | None]:
+    get_many: Callable[[list[str]], list[bytes | None]] | None = getattr(backend, "get_many", None)
+    if get_many is not None:
+        return get_many(keys)
+    return [backend.get(key) for key in keys]
+
+
+def _tag_versions(backend: CacheBackend, tags: Iterable[str]) -> dict[str, str]:
+    tags = list(tags)
+    keys = [_tag_key(tag) for tag in tags]
+    result: dict[str, str] = {}
+    for tag, key, version in zip(tags, keys, _get_many(backend, keys), strict=True):
+        if version is None:
+            version = uuid.uuid4().hex.encode()
+            backend.set(key, version, None)
+        result[tag] = version.decode()
+    return result
+
+
+def tags_current(backend: CacheBackend, tags: Mapping[str, str]) -> bool:
+    """Check that none of the tags were invalidated since their versions were read."""
+    return not tags or _tag_versions(backend, tags) == tags
+
+
+class _TagRecorder:
+    """Tags used while rendering a cached fragment, and their versions.
+
+    Without a backend, only the tags are recorded, with empty versions.
+    """
+
+    __slots__ = ("backend", "parent", "versions")
+
+    def __init__(self, backend: CacheBackend | None, parent: _TagRecorder | None) -> None:
+        self.backend = backend
+        self.parent = parent
+        self.versions: dict[str, str] = {}
+
+    def add(self, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        recorder: _TagRecorder | None = self
+        while recorder is not None:
+            if missing := [tag for tag in tags if tag not in recorder.versions]:
+                if recorder.backend is None:
+                    recorder.versions.update(dict.fromkeys(missing, ""))
+                else:
+                    recorder.versions.update(_tag_versions(recorder.backend, missing))
+            recorder = recorder.parent
+
+
+# The recorder of the cached fragment that is currently rendering.
+_recorder: contextvars.ContextVar[_TagRecorder | None] = contextvars.ContextVar(
+    "htpy_tag_recorder", default=None
+)
+
+
+def depends_on(*tags: str) -> None:
+    """Record that the cached fragments being rendered depend on tags.
+
+    Call it while rendering, for example in a component. All enclosing
+    cached fragments are invalidated when any of the tags are invalidated
+    with invalidate_tags().
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.add(tags)
+
+
+class Dependencies(t.NamedTuple):
+    """Tags and cache policy recorded while rendering.
+
+    The tags map to their versions when they were recorded with a backend, and
+    to empty strings otherwise.
+    """
+
+    tags: dict[str, str]
+    policy: CachePolicy
+
+    def record(self) -> None:
+        # Record them again when the rendering is reused, in the enclosing
+        # cached fragments and responses.
+        if self.tags:
+            depends_on(*self.tags)
+        if self.policy != CachePolicy():
+            record_policy(self.policy)
+
+    def is_current(self, backend: CacheBackend) -> bool:
+        """Check that none of the tags were invalidated in backend since recording."""
+        return tags_current(backend, self.tags)
+
+
+class DependencyRecorder:
+    """Record the tags and cache policies of a rendering that is reused later.
+
+    They are also recorded in the enclosing cached fragments and responses.
+    With a backend, the versions of the tags are read from it when they are
+    recorded, to check later whether the rendering is still current.
+    """
+
+    __slots__ = ("_policy_recorder", "_tag_recorder")
+
+    def __init__(self, backend: CacheBackend | None = None) -> None:
+        self._tag_recorder = _TagRecorder(backend, _recorder.get())
+        self._policy_recorder = PolicyRecorder(current_policy_recorder.get())
+
+    @contextlib.contextmanager
+    def active(self) -> Iterator[None]:
+        token = _recorder.set(self._tag_recorder)
+        policy_token = current_policy_recorder.set(self._policy_recorder)
+        try:
+            yield
+        finally:
+            current_policy_recorder.reset(policy_token)
+            _recorder.reset(token)
+
+    @property
+    def dependencies(self) -> Dependencies:
+        return Dependencies(dict(self._tag_recorder.versions), self._policy_recorder.policy)
+
+
+def invalidate_tags(tags: Iterable[str], backend: CacheBackend | None = None) -> None:
+    """Invalidate all cached fragments that depend on any of the tags."""
+    backend = backend or default_backend
+    for tag in tags:
+        backend.set(_tag_key(tag), uuid.uuid4().hex.encode(), None)
+
+
+# Renderings of cached fragments in progress, by backend and key. Backends
+# that compare equal share their renderings.
+_flights: SingleFlight[str] = SingleFlight()
+
+# Keep references to background refresh tasks until they are done.
+_background_tasks: set[asyncio.Task[None]] = set()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _CacheOptions:
+    ttl: float | None
+    backend: CacheBackend
+    stale_while_revalidate: float | None
+    wait_timeout: float
+    precompress: bool
+
+
+class CachedFragment:
+    """A node whose rendered HTML is stored in a cache backend."""
+
+    __slots__ = ("_key", "_node", "_options")
+
+    def __init__(self, key: str, options: _CacheOptions, node: Node = None) -> None:
+        self._key = key
+        self._options = options
+        self._node = node
+
+    def __getitem__(self, node: Node) -> CachedFragment:
+        _validate_children(node)
+        return CachedFragment(self._key, self._options, node)
+
+    def __repr__(self) -> str:
+        return f"<CachedFragment {self._key!r}>"
+
+    def __str__(self) -> markupsafe.Markup:
+        return chunks_as_markup(self)
+
+    __html__ = __str__
+
+    @property
+    def _flight_key(self) -> tuple[CacheBackend, str]:
+        return self._options.backend, self._key
+
+    def _get(self) -> _Entry | None:
+        backend = self._options.backend
+        data = backend.get(self._key)
+        if data is None:
+            return None
+        entry = decode_entry(data)
+        if entry is None:
+            return None
+        header, html = entry
+
+        tags: dict[str, str] = header.get("tags", {})
+        if not tags_current(backend, tags):
+            # Invalidated.
+            return None
+
+        fresh_until = header.get("fresh_until")
+        policy = header.get("policy")
+        return _Entry(
+            html,
+            fresh_until is None or fresh_until > time.time(),
+            tags,
+            None if policy is None else CachePolicy.from_json(policy),
+        )
+
+    def _set(self, html: str, tags: dict[str, str], policy: CachePolicy) -> None:
+        options = self._options
+        header: dict[str, t.Any] = {}
+        ttl = options.ttl
+        if ttl is not None and options.stale_while_revalidate is not None:
+            # Keep the entry around after it expires, to serve it while it is
+            # being refreshed.
+            header["fresh_until"] = time.time() + ttl
+            ttl += options.stale_while_revalidate
+        if tags:
+            header["tags"] = tags
+        if policy != CachePolicy():
+            header["policy"] = policy.to_json()
+        deflated = deflate_segment(html.encode()) if options.precompress else None
+        options.backend.set(self._key, encode_entry(html, header, deflated), ttl)
+
+    def _record_entry(self) -> None:
+        if (entry := self._get()) is not None:
+            entry.record()
+
+    def _render(self, context: Mapping[Context[t.Any], t.Any] | None) -> Iterator[str]:
+        # Tee the chunks into the cache. Nothing is stored if rendering fails.
+        # Tags and cache policies are recorded while the children are
+        # rendered, but not while the chunks are consumed.
+        recorder = _TagRecorder(self._options.backend, _recorder.get())
+        policy_recorder = PolicyRecorder(current_policy_recorder.get())
+        iterator = iter_chunks_node(self._node, context)
+        chunks: list[str] = []
+        while True:
+            token = _recorder.set(recorder)
+            policy_token = current_policy_recorder.set(policy_recorder)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                current_policy_recorder.reset(policy_token)
+                _recorder.reset(token)
+            chunks.append(chunk)
+            yield chunk
+        self._set("".join(chunks), recorder.versions, policy_recorder.policy)
+
+    async def _arender(self, context: Mapping[Context[t.Any], t.Any] | None) -> AsyncIterator[str]:
+        recorder = _TagRecorder(self._options.backend, _recorder.get())
+        policy_recorder = PolicyRecorder(current_policy_recorder.get())
+        iterator = aiter_chunks_node(self._node, context)
+        chunks: list[str] = []
+        while True:
+            token = _recorder.set(recorder)
+            policy_token = current_policy_recorder.set(policy_recorder)
+            try:
+                chunk = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                current_policy_recorder.reset(policy_token)
+                _recorder.reset(token)
+            chunks.append(chunk)
+            yield chunk
+        self._set("".join(chunks), recorder.versions, policy_recorder.policy)
+
+    def _refresh(self, context: Mapping[Context[t.Any], t.Any] | None, flight: Flight[str]) -> None:
+        html = None
+        try:
+            html = "".join(self._render(context))
+        finally:
+            _flights.finish(self._flight_key, flight, html)
+
+    async def _arefresh(
+        self, context: Mapping[Context[t.Any], t.Any] | None, flight: Flight[str]
+    ) -> None:
+        # The task has a copy of the context of the rendering that started
+        # it, tags and policies must not be recorded in the enclosing
+        # fragments.
+        _recorder.set(None)
+        current_policy_recorder.set(None)
+        html = None
+        try:
+            html = "".join([chunk async for chunk in self._arender(context)])
+        finally:
+            _flights.finish(self._flight_key, flight, html)
+
+    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        if (cached := self._get()) is None:
+            leader, flight = _flights.start(self._flight_key)
+            if not leader:
+                # Use the result of the concurrent rendering. Render
+                # independently if it fails or takes too long.
+                html = _flights.wait(flight, self._options.wait_timeout)
+                if html is None:
+                    yield from self._render(context)
+                    return
+                self._record_entry()
+                if html:
+                    yield html
+                return
+
+            html = None
+            try:
+                chunks: list[str] = []
+                for chunk in self._render(context):
+                    chunks.append(chunk)
+                    yield chunk
+                html = "".join(chunks)
+            finally:
+                _flights.finish(self._flight_key, flight, html)
+            return
+
+        cached.record()
+        html, fresh = cached.html, cached.fresh
+        if not fresh:
+            leader, flight = _flights.start(self._flight_key)
+            if leader:
+                threading.Thread(
+                    target=self._refresh, args=(context, flight), name="htpy-cache-refresh"
+                ).start()
+        if html:
+            yield html
+
+    async def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        if (cached := self._get()) is None:
+            leader, flight = _flights.start(self._flight_key)
+            if not leader:
+                html = await _flights.await_result(flight, self._options.wait_timeout)
+                if html is None:
+                    async for chunk in self._arender(context):
+                        yield chunk
+                    return
+                self._record_entry()
+                if html:
+                    yield html
+                return
+
+            html = None
+            try:
+                chunks: list[str] = []
+                async for chunk in self._arender(context):
+                    chunks.append(chunk)
+                    yield chunk
+                html = "".join(chunks)
+            finally:
+                _flights.finish(self._flight_key, flight, html)
+            return
+
+        cached.record()
+        html, fresh = cached.html, cached.fresh
+        if not fresh:
+            leader, flight = _flights.start(self._flight_key)
+            if leader:
+                task = asyncio.ensure_future(self._arefresh(context, flight))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        if html:
+            yield html
+
+
+def cache(
+    key: str,
+    *,
+    ttl: float | None = 300,
+    backend: CacheBackend | None = None,
+    stale_while_revalidate: float | None = None,
+    wait_timeout: float = 10,
+    precompress: bool = False,
+) -> CachedFragment:
+    """Cache the rendered HTML of the children.
+
+    When the key is found in the cache, the stored HTML is rendered without
+    rendering the children. Otherwise the children are rendered as usual, and
+    stored in the cache for ttl seconds.
+
+    Concurrent renderings of the same key in other threads and tasks wait for
+    the first rendering and use its result, for at most wait_timeout seconds.
+
+    With stale_while_revalidate, expired HTML is kept for that many seconds
+    longer. It is rendered while the children are rendered again in the
+    background.
+
+    With precompress, the HTML is also stored compressed, to send it as is in
+    compressed responses.
+
+    The default backend is an in-process LRU cache.
+
+    Example:
+        cache("sidebar", ttl=60)[lambda: sidebar(user)]
+    """
+    options = _CacheOptions(
+        ttl, backend or default_backend, stale_while_revalidate, wait_timeout, precompress
+    )
+    return CachedFragment(key, options)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import threading
+import typing as t
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+def merge_vary(a: Iterable[str], b: Iterable[str]) -> tuple[str, ...]:
+    # Header names are case insensitive, keep the first spelling.
+    merged: dict[str, str] = {}
+    for name in (*a, *b):
+        merged.setdefault(name.lower(), name)
+    return tuple(merged.values())
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class CachePolicy:
+    """How long and by whom a rendered page may be cached.
+
+    Policies of the parts of a page are combined with merge(): the shortest
+    max_age wins, and the page is private or must not be stored if any part
+    is.
+    """
+
+    max_age: int | None = None
+    private: bool = False
+    no_store: bool = False
+    vary: tuple[str, ...] = ()
+
+    def merge(self, other: CachePolicy) -> CachePolicy:
+        if self.max_age is None:
+            max_age = other.max_age
+        elif other.max_age is None:
+            max_age = self.max_age
+        else:
+            max_age = min(self.max_age, other.max_age)
+        return CachePolicy(
+            max_age=max_age,
+            private=self.private or other.private,
+            no_store=self.no_store or other.no_store,
+            vary=merge_vary(self.vary, other.vary),
+        )
+
+    @property
+    def cache_control(self) -> str | None:
+        """The Cache-Control header, None if nothing was declared."""
+        if self.no_store:
+            return "no-store"
+        parts: list[str] = []
+        if self.private:
+            parts.append("private")
+        if self.max_age is not None:
+            parts.append(f"max-age={self.max_age}")
+        return ", ".join(parts) or None
+
+    def to_json(self) -> dict[str, t.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_json(cls, data: dict[str, t.Any]) -> CachePolicy:
+        return cls(
+            max_age=data["max_age"],
+            private=data["private"],
+            no_store=data["no_store"],
+            vary=tuple(data["vary"]),
+        )
+
+
+# Subtrees rendered with parallel add policies to the same recorders from
+# several threads.
+_lock = threading.Lock()
+
+
+class PolicyRecorder:
+    """The combined policy declared while rendering a response or a cached fragment."""
+
+    __slots__ = ("parent", "policy")
+
+    def __init__(self, parent: PolicyRecorder | None) -> None:
+        self.parent = parent
+        self.policy = CachePolicy()
+
+    def add(self, policy: CachePolicy) -> None:
+        recorder: PolicyRecorder | None = self
+        with _lock:
+            while recorder is not None:
+                recorder.policy = recorder.policy.merge(policy)
+                recorder = recorder.parent
+
+
+# The recorder of the innermost cached fragment or response being rendered.
+current_recorder: contextvars.ContextVar[PolicyRecorder | None] = contextvars.ContextVar(
+    "htpy_policy_recorder", default=None
+)
+
+
+def record_policy(policy: CachePolicy) -> None:
+    if (recorder := current_recorder.get()) is not None:
+        recorder.add(policy)
+
+
+@contextlib.contextmanager
+def recording_cache_policy() -> Iterator[PolicyRecorder]:
+    """Collect the cache policies declared while rendering in the block."""
+    recorder = PolicyRecorder(current_recorder.get())
+    token = current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        current_recorder.reset(token)
+
+
+def cache_policy(
+    *,
+    max_age: int | None = None,
+    private: bool = False,
+    no_store: bool = False,
+    vary: Iterable[str] = (),
+) -> None:
+    """Declare how the output of the component being rendered may be cached.
+
+    Call it while rendering, for example in a component. The policies of all
+    parts of a page are combined and used as the Cache-Control and Vary headers
+    by responses that render the page before sending it.
+    """
+    record_policy(
+        CachePolicy(max_age=max_age, private=private, no_store=no_store, vary=tuple(vary))
+    )
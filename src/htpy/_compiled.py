@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import ast
+import builtins
+import functools
+import inspect
+import textwrap
+import typing as t
+
+from htpy import _attributes
+from htpy._cache import DependencyRecorder
+from htpy._elements import BaseElement, _validate_children  # pyright: ignore[reportPrivateUsage]
+from htpy._fragments import fragment
+from htpy._render_sync import iter_chunks_node
+from htpy._templates import CHILD, TEXT, FilledTemplate, hole_marker, is_traceable, split_holes
+
+if t.TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from htpy._cache import Dependencies
+    from htpy._types import Node, Renderable
+
+
+P = t.ParamSpec("P")
+
+_NOT_TRACED = object()
+
+
+class _TraceError(Exception):
+    pass
+
+
+class _TraceArgument:
+    """Stand-in for an argument while tracing a component.
+
+    It can only be rendered, either as a child node or as a string. Any other
+    use, such as comparisons or attribute access, means that the component does
+    more than rendering the argument, and aborts the trace.
+    """
+
+    __slots__ = ("_index", "_trace")
+
+    def __init__(self, index: int, trace: _Trace) -> None:
+        self._index = index
+        self._trace = trace
+
+    def __html__(self) -> str:
+        return hole_marker(CHILD, str(self._index))
+
+    def __str__(self) -> str:
+        return hole_marker(TEXT, str(self._index))
+
+    def __format__(self, format_spec: str) -> str:
+        if format_spec:
+            raise _TraceError("format spec used on argument")
+        return str(self)
+
+    def __bool__(self) -> bool:
+        # Arguments are only passed to elements (see _uses_arguments_directly),
+        # which only test the truthiness of class names. Require the argument
+        # to be truthy when the component is rendered.
+        self._trace.truthy.add(self._index)
+        return True
+
+    def __eq__(self, other: object) -> bool:
+        raise _TraceError("argument compared")
+
+    def __hash__(self) -> int:
+        raise _TraceError("argument hashed")
+
+    def __iter__(self) -> t.NoReturn:
+        raise _TraceError("argument iterated")
+
+    def __getattr__(self, name: str) -> t.NoReturn:
+        # AttributeError, so that hasattr() checks when rendering work.
+        raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"<traced argument {self._index}>"
+
+
+_MISSING = object()
+
+
+def _resolve(expr: ast.expr, namespace: t.Mapping[str, t.Any]) -> t.Any:
+    """Find the value of a name, attribute, call or subscript of an element."""
+    if isinstance(expr, ast.Name):
+        return namespace.get(expr.id, _MISSING)
+    if isinstance(expr, ast.Attribute):
+        value = _resolve(expr.value, namespace)
+        if value is _MISSING or not inspect.ismodule(value):
+            return _MISSING
+        return getattr(value, expr.attr, _MISSING)
+    if isinstance(expr, ast.Call | ast.Subscript):
+        # Calling and subscripting an element gives an element.
+        value = _resolve(expr.func if isinstance(expr, ast.Call) else expr.value, namespace)
+        return value if isinstance(value, BaseElement) else _MISSING
+    return _MISSING
+
+
+def _is_element(expr: ast.expr, namespace: t.Mapping[str, t.Any]) -> bool:
+    value = _resolve(expr, namespace)
+    return isinstance(value, BaseElement) or value is fragment
+
+
+def _is_direct_use(
+    name: ast.Name,
+    parents: t.Mapping[ast.AST, ast.AST],
+    namespace: t.Mapping[str, t.Any],
+    *,
+    children_only: bool,
+) -> bool:
+    """Check that an argument is only passed to elements and returned.
+
+    The argument may be used as a child of an element, as an attribute value
+    and in f-strings without format specs, which are all rendered the same way
+    for every value of the argument. With children_only, it may only be used
+    as a child.
+    """
+    child: ast.AST = name
+    while True:
+        parent = parents.get(child)
+        if isinstance(parent, ast.Return):
+            return True
+        if isinstance(parent, ast.Tuple | ast.List):
+            pass
+        elif children_only and not isinstance(parent, ast.Subscript):
+            return False
+        elif isinstance(parent, ast.JoinedStr):
+            pass
+        elif isinstance(parent, ast.FormattedValue):
+            if parent.conversion != -1 or parent.format_spec is not None:
+                return False
+        elif isinstance(parent, ast.Subscript) and parent.slice is child:
+            if not _is_element(parent.value, namespace):
+                return False
+        elif isinstance(parent, ast.Subscript) and isinstance(child, ast.Call):
+            # The children of an element that was called with the argument.
+            pass
+        elif isinstance(parent, ast.keyword) and parent.arg is not None:
+            parent = parents[parent]
+            if not (isinstance(parent, ast.Call) and _is_element(parent.func, namespace)):
+                return False
+        elif isinstance(parent, ast.Dict) and child in parent.values:
+            # An attribute mapping passed to an element.
+            parent = parents[parent]
+            if not (isinstance(parent, ast.Call) and _is_element(parent.func, namespace)):
+                return False
+        else:
+            return False
+        child = parent
+
+
+def _uses_arguments_directly(func: Callable[..., Node], *, children_only: bool = False) -> bool:
+    """Check the source of a component, to know if it can be traced.
+
+    Tracing can not detect everything a component does with its arguments,
+    such as isinstance() checks or transforming them as strings, so only
+    components that pass their arguments directly to elements are traced.
+
+    With children_only, only the first argument is checked, which must only
+    be used as a child of elements.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+        module = ast.parse(source)
+    except (OSError, TypeError, SyntaxError):
+        return False
+
+    if not module.body:
+        return False
+    function = module.body[0]
+    if not isinstance(function, ast.FunctionDef) or function.name != func.__name__:
+        return False
+
+    args = function.args
+    if children_only:
+        positional = [*args.posonlyargs, *args.args]
+        if not positional:
+            return False
+        arg_names = {positional[0].arg}
+    else:
+        arg_names = {
+            arg.arg
+            for arg in [*args.posonlyargs, *args.args, *args.kwonlyargs, args.vararg, args.kwarg]
+            if arg is not None
+        }
+    closure = inspect.getclosurevars(func)
+    namespace = {**vars(builtins), **func.__globals__, **closure.nonlocals}
+
+    parents: dict[ast.AST, ast.AST] = {}
+    names: list[ast.Name] = []
+    for statement in function.body:
+        for node in ast.walk(statement):
+            for child in ast.iter_child_nodes(node):
+                parents[child] = node
+            if isinstance(node, ast.Name) and node.id in arg_names:
+                names.append(node)
+
+    return all(
+        isinstance(name.ctx, ast.Load)
+        and _is_direct_use(name, parents, namespace, children_only=children_only)
+        for name in names
+    )
+
+
+class _Trace:
+    def __init__(self) -> None:
+        self.truthy: set[int] = set()
+        self.segments: list[str] = []
+        self.holes: list[tuple[str, int]] = []
+        self.dependencies: Dependencies | None = None
+
+
+def _trace(func: Callable[..., Node], num_args: int, kwarg_names: tuple[str, ...]) -> _Trace | None:
+    trace = _Trace()
+    trace_args = [_TraceArgument(index, trace) for index in range(num_args + len(kwarg_names))]
+
+    # The tags and cache policies recorded by the component are recorded again
+    # by every call, since the component is not called again.
+    recorder = DependencyRecorder()
+    try:
+        with recorder.active():
+            node = func(*trace_args[:num_args], **dict(zip(kwarg_names, trace_args[num_args:])))  # noqa: B905
+            if not is_traceable(node, _TraceArgument):
+                return None
+            html = "".join(iter_chunks_node(node, None))
+    except Exception:
+        return None
+    trace.dependencies = recorder.dependencies
+
+    split = split_holes(html)
+    if split is None:
+        return None
+
+    trace.segments, holes = split
+    trace.holes = [(kind, int(key)) for kind, key in holes]
+    return trace
+
+
+def _fill(trace: _Trace, values: list[t.Any]) -> FilledTemplate | None:
+    for value in values:
+        # None, True and False may be checked with `is`, which is not detected
+        # while tracing.
+        if value is None or value is True or value is False:
+            return None
+
+    for index in trace.truthy:
+        if not values[index]:
+            return None
+
+    # Text values are joined with the static segments, only child nodes are
+    # kept as separate values.
+    segments: list[str] = []
+    child_values: list[Node] = []
+    current = trace.segments[0]
+    for (kind, index), segment in zip(trace.holes, trace.segments[1:]):  # noqa: B905
+        value = values[index]
+        if kind == TEXT:
+            if type(value) not in (str, int):
+                return None
+            current += str(_attributes._force_escape(value)) + segment  # pyright: ignore[reportPrivateUsage]
+        else:
+            _validate_children(value)
+            segments.append(current)
+            child_values.append(value)
+            current = segment
+    segments.append(current)
+
+    return FilledTemplate(segments, child_values)
+
+
+class _CompiledComponent(t.Generic[P]):
+    def __init__(self, func: Callable[P, Node]) -> None:
+        self._func = func
+        self._traces: dict[tuple[int, tuple[str, ...]], _Trace | None] = {}
+        self._traceable: bool | None = None
+
+    def __call__(self, *args: P.args, **kwargs: P.kwargs) -> Renderable:
+        if self._traceable is None:
+            self._traceable = _uses_arguments_directly(self._func)
+
+        shape = (len(args), tuple(kwargs))
+        trace = self._traces.get(shape, _NOT_TRACED)
+        if trace is _NOT_TRACED:
+            traced = _trace(self._func, *shape) if self._traceable else None
+            trace = self._traces.setdefault(shape, traced)
+
+        if trace is not None:
+            assert isinstance(trace, _Trace)
+            if (result := _fill(trace, [*args, *kwargs.values()])) is not None:
+                assert trace.dependencies is not None
+                trace.dependencies.record()
+                return result
+
+        node = self._func(*args, **kwargs)
+        if hasattr(node, "iter_chunks"):
+            return t.cast("Renderable", node)
+        return fragment[node]
+
+
+def compiled(func: Callable[P, Node]) -> Callable[P, Renderable]:
+    """Decorator that speeds up components that are pure functions of their arguments.
+
+    The component is traced once, with stand-in arguments, for each way it is
+    called (number of positional arguments and keyword argument names). The
+    static HTML of the trace is kept, and later calls only interleave the
+    escaped argument values into it.
+
+    Only components whose source passes the arguments directly to elements, as
+    children, attribute values or in f-strings without format specs, are
+    traced. Other components, and components whose source is not available,
+    are called as usual.
+    """
+    return functools.update_wrapper(_CompiledComponent(func), func)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import struct
+import sys
+import typing as t
+import zlib
+
+from htpy._flush import FlushChunk
+
+if sys.version_info >= (3, 14):
+    from compression import zstd
+else:
+    zstd = None
+
+Encoding: t.TypeAlias = t.Literal["zstd", "gzip", "deflate"]
+
+# Supported content codings, in order of preference.
+ENCODINGS: tuple[Encoding, ...] = (
+    ("zstd", "gzip", "deflate") if zstd is not None else ("gzip", "deflate")
+)
+
+DEFAULT_LEVEL = 6
+
+# Smaller chunks are compressed with the surrounding chunks. Splicing a chunk
+# costs a few bytes and resets the compression history.
+MIN_PRECOMPRESSED_SIZE = 256
+
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+_ZLIB_HEADER = b"\x78\x9c"
+
+
+def deflate_segment(data: bytes, level: int = DEFAULT_LEVEL) -> bytes:
+    """Compress data as a raw deflate segment that can be spliced into a stream.
+
+    The segment does not refer to earlier data and ends on a byte boundary
+    with a full flush, without the final block.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+
+class PrecompressedChunk(str):
+    """A chunk of HTML that keeps its compressed form.
+
+    It is a regular string everywhere, except in compressed responses where
+    the compressed form is sent as is rather than compressing the chunk
+    again.
+    """
+
+    _deflated: dict[int, bytes]
+
+    def deflated(self, level: int = DEFAULT_LEVEL) -> bytes:
+        try:
+            deflated = self._deflated
+        except AttributeError:
+            deflated = self._deflated = {}
+        if (segment := deflated.get(level)) is None:
+            # Racing threads compress the same chunk, which is harmless.
+            segment = deflated[level] = deflate_segment(self.encode(), level)
+        return segment
+
+    @classmethod
+    def with_deflated(cls, html: str, segment: bytes, level: int) -> PrecompressedChunk:
+        chunk = cls(html)
+        chunk._deflated = {level: segment}
+        return chunk
+
+
+class StreamCompressor:
+    """Compress chunks of HTML as a gzip or deflate stream.
+
+    Precompressed chunks are spliced into the stream as is. Other chunks are
+    compressed as they arrive.
+    """
+
+    def __init__(self, encoding: t.Literal["gzip", "deflate"], level: int = DEFAULT_LEVEL) -> None:
+        self.encoding = encoding
+        self.level = level
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._checksum = zlib.crc32(b"") if encoding == "gzip" else zlib.adler32(b"")
+        self._size = 0
+        self._header = _GZIP_HEADER if encoding == "gzip" else _ZLIB_HEADER
+        # Whether data has been passed to the compressor since the last flush.
+        self._pending = False
+        # Whether the compressor may refer to earlier data. A sync flush sends
+        # all pending data but keeps the history.
+        self._history = False
+
+    def _update(self, data: bytes) -> None:
+        if self.encoding == "gzip":
+            self._checksum = zlib.crc32(data, self._checksum)
+        else:
+            self._checksum = zlib.adler32(data, self._checksum)
+        self._size += len(data)
+
+    def _output(self, data: bytes) -> bytes:
+        if self._header and data:
+            data = self._header + data
+            self._header = b""
+        return data
+
+    def compress(self, chunk: str) -> bytes:
+        if isinstance(chunk, FlushChunk):
+            return self.flush()
+
+        data = chunk.encode()
+        self._update(data)
+
+        if isinstance(chunk, PrecompressedChunk) and len(data) >= MIN_PRECOMPRESSED_SIZE:
+            output = b""
+            if self._history:
+                # Align to a byte boundary and drop the history, since the
+                # decompressor history will contain the spliced chunk.
+                output = self._compressor.flush(zlib.Z_FULL_FLUSH)
+                self._pending = self._history = False
+            return self._output(output + chunk.deflated(self.level))
+
+        self._pending = self._history = True
+        return self._output(self._compressor.compress(data))
+
+    def flush(self) -> bytes:
+        """Return all data compressed so far, to send it to the client."""
+        if not self._pending:
+            return b""
+        self._pending = False
+        return self._output(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+
+    def finish(self) -> bytes:
+        output = self._output(self._compressor.flush(zlib.Z_FINISH))
+        if self.encoding == "gzip":
+            trailer = struct.pack("<II", self._checksum, self._size & 0xFFFFFFFF)
+        else:
+            trailer = struct.pack(">I", self._checksum)
+        return output + trailer
+
+
+class ZstdStreamCompressor:
+    """Compress chunks of HTML as a zstd stream. Only available on Python 3.14+."""
+
+    _compressor: t.Any
+    _pending: bool
+
+    def __init__(self, level: int | None = None) -> None:
+        if zstd is None:
+            raise RuntimeError("zstd compression requires Python 3.14 or later")
+        self._compressor = zstd.ZstdCompressor(level)
+        self._pending = False
+
+    def compress(self, chunk: str) -> bytes:
+        if isinstance(chunk, FlushChunk):
+            return self.flush()
+        self._pending = True
+        return t.cast("bytes", self._compressor.compress(chunk.encode()))
+
+    def flush(self) -> bytes:
+        if not self._pending:
+            return b""
+        self._pending = False
+        return t.cast("bytes", self._compressor.flush(self._compressor.FLUSH_BLOCK))
+
+    def finish(self) -> bytes:
+        return t.cast("bytes", self._compressor.flush(self._compressor.FLUSH_FRAME))
+
+
+def new_compressor(encoding: Encoding) -> StreamCompressor | ZstdStreamCompressor:
+    if encoding == "zstd":
+        return ZstdStreamCompressor()
+    return StreamCompressor(encoding)
+
+
+def negotiate_encoding(accept_encoding: str) -> Encoding | None:
+    """Choose the content coding for an Accept-Encoding header.
+
+    The coding with the highest quality value is used, preferring zstd, then
+    gzip and deflate on ties. Returns None if no coding is acceptable.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    default = qualities.get("*", 0.0)
+    best: Encoding | None = None
+    best_quality = 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_chunks(chunks: t.Iterable[str], encoding: Encoding) -> bytes:
+    compressor = new_compressor(encoding)
+    return b"".join([*map(compressor.compress, chunks), compressor.finish()])
@@ -5,7 +5,7 @@ import functools
 import typing as t
 
 from htpy._render_async import aiter_chunks_node
-from htpy._render_sync import chunks_as_markup, iter_chunks_node
+from htpy._render_sync import chunks_as_markup, iter_chunks_node, new_render_context
 
 try:
     from warnings import deprecated  # type: ignore[attr-defined,unused-ignore]
@@ -43,12 +43,18 @@ class ContextProvider(t.Generic[T]):
     __html__ = __str__
 
     def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
-        return iter_chunks_node(self.node, {**(context or {}), self.context: self.value})  # pyright: ignore [reportUnknownMemberType]
+        return iter_chunks_node(
+            self.node,
+            {**(context or new_render_context()), self.context: self.value},  # pyright: ignore [reportUnknownMemberType]
+        )
 
     def aiter_chunks(
         self, context: Mapping[Context[t.Any], t.Any] | None = None
     ) -> AsyncIterator[str]:
-        return aiter_chunks_node(self.node, {**(context or {}), self.context: self.value})  # pyright: ignore [reportUnknownMemberType]
+        return aiter_chunks_node(
+            self.node,
+            {**(context or new_render_context()), self.context: self.value},  # pyright: ignore [reportUnknownMemberType]
+        )
 
     @deprecated(
         "Calling .encode() on ContextProvider is deprecated and will be removed in a future release. "  # noqa: E501
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import re
+import typing as t
+
+from htpy._elements import BaseElement
+from htpy._fingerprint import _element_digest, fingerprint  # pyright: ignore[reportPrivateUsage]
+from htpy._fragments import Fragment
+
+if t.TYPE_CHECKING:
+    from htpy._types import Node
+
+
+# Attribute values are always quoted and escaped in the attribute string.
+_ID_RE = re.compile(r' id="([^"]*)"')
+_SWAP_OOB_RE = re.compile(r" hx-swap-oob(?:=| |$)")
+
+
+def _element_id(element: BaseElement) -> str | None:
+    match = _ID_RE.search(element._attrs)  # pyright: ignore[reportPrivateUsage]
+    return match.group(1) if match else None
+
+
+def _flatten(x: Node, result: list[Node]) -> list[Node]:
+    if x is None or x is True or x is False:
+        pass
+    elif isinstance(x, list | tuple):
+        for child in x:  # pyright: ignore[reportUnknownVariableType]
+            _flatten(child, result)  # pyright: ignore[reportUnknownArgumentType]
+    elif type(x) is Fragment:
+        _flatten(x._node, result)  # pyright: ignore[reportPrivateUsage]
+    else:
+        result.append(x)
+    return result
+
+
+def _swap_oob(element: BaseElement) -> BaseElement:
+    attrs = element._attrs  # pyright: ignore[reportPrivateUsage]
+    if not _SWAP_OOB_RE.search(attrs):
+        attrs += ' hx-swap-oob="true"'
+    return element.__class__(element._name, attrs, element._children)  # pyright: ignore[reportPrivateUsage]
+
+
+def _diff_children(old: Node, new: Node, changes: list[BaseElement]) -> bool:
+    """Collect the changed elements with ids.
+
+    Returns True if there are changes that can not be swapped by id, and the
+    parent has to be swapped as a whole.
+    """
+    old_children = _flatten(old, [])
+    new_children = _flatten(new, [])
+    if len(old_children) != len(new_children):
+        return True
+
+    for old_child, new_child in zip(old_children, new_children):  # noqa: B905
+        if isinstance(old_child, BaseElement) and isinstance(new_child, BaseElement):
+            if _diff_element(old_child, new_child, changes):
+                return True
+        elif isinstance(old_child, BaseElement) or isinstance(new_child, BaseElement):
+            return True
+        elif fingerprint(old_child) != fingerprint(new_child):
+            return True
+    return False
+
+
+def _diff_element(old: BaseElement, new: BaseElement, changes: list[BaseElement]) -> bool:
+    # The digests are cached on the elements, unchanged subtrees are skipped
+    # without looking at their children.
+    if _element_digest(old) == _element_digest(new):
+        return False
+
+    if (
+        type(old) is type(new)
+        and old._name == new._name  # pyright: ignore[reportPrivateUsage]
+        and old._attrs == new._attrs  # pyright: ignore[reportPrivateUsage]
+    ):
+        child_changes: list[BaseElement] = []
+        if not _diff_children(old._children, new._children, child_changes):  # pyright: ignore[reportPrivateUsage]
+            changes.extend(child_changes)
+            return False
+
+    new_id = _element_id(new)
+    if new_id is not None and new_id == _element_id(old):
+        changes.append(_swap_oob(new))
+        return False
+
+    return True
+
+
+def diff(old: Node, new: Node) -> list[BaseElement]:
+    """Find the smallest subtrees with ids that changed between two nodes.
+
+    The changed elements from new are returned with an hx-swap-oob attribute,
+    to be sent as out-of-band swaps to htmx. Elements are matched by position,
+    tag and id. Subtrees that are equal are skipped using their cached
+    fingerprints.
+
+    Raises ValueError if a change is not inside an element with an id.
+    """
+    changes: list[BaseElement] = []
+    if _diff_children(old, new, changes):
+        raise ValueError(
+            "The nodes can not be diffed: a change is not inside an element with the same id"
+        )
+    return changes
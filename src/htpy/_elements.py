@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import functools
 import keyword
 import typing as t
 from collections.abc import (
@@ -13,6 +12,7 @@ from collections.abc import (
     Mapping,
 )
 
+from htpy import _static_cache
 from htpy._attributes import attrs_string, id_class_names_from_css_str
 from htpy._contexts import ContextConsumer, ContextProvider
 from htpy._fragments import Fragment
@@ -39,7 +39,9 @@ ElementSelf = t.TypeVar("ElementSelf", bound="Element")
 
 
 class BaseElement:
-    __slots__ = ("_name", "_attrs", "_children")
+    # Elements can be weakly referenced, so that the static cache and
+    # fingerprints can be stored outside of the elements.
+    __slots__ = ("_name", "_attrs", "_children", "__weakref__")
 
     def __init__(self, name: str, attrs_str: str = "", children: Node = None) -> None:
         self._name = name
@@ -99,12 +101,24 @@ class BaseElement:
         return self.iter_chunks()
 
     def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        if _static_cache.state.enabled and id(self) in _static_cache.marked:
+            return _static_cache.iter_chunks(self, context)
+        return self._iter_chunks(context)
+
+    def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        if _static_cache.state.enabled and id(self) in _static_cache.marked:
+            return _static_cache.aiter_chunks(self, context)
+        return self._aiter_chunks(context)
+
+    def _iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None) -> Iterator[str]:
         yield f"<{self._name}{self._attrs}>"
         yield from iter_chunks_node(self._children, context)
         yield f"</{self._name}>"
 
-    async def aiter_chunks(
-        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    async def _aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None
     ) -> AsyncIterator[str]:
         yield f"<{self._name}{self._attrs}>"
         async for x in aiter_chunks_node(self._children, context):
@@ -160,24 +174,24 @@ class Element(BaseElement):
 
 
 class HTMLElement(Element):
-    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+    def _iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None) -> Iterator[str]:
         yield "<!doctype html>"
-        yield from super().iter_chunks(context)
+        yield from super()._iter_chunks(context)
 
-    async def aiter_chunks(
-        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    async def _aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None
     ) -> AsyncIterator[str]:
         yield "<!doctype html>"
-        async for chunk in super().aiter_chunks(context):
+        async for chunk in super()._aiter_chunks(context):
             yield chunk
 
 
 class VoidElement(BaseElement):
-    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+    def _iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None) -> Iterator[str]:
         yield f"<{self._name}{self._attrs}>"
 
-    async def aiter_chunks(
-        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    async def _aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None
     ) -> AsyncIterator[str]:
         yield f"<{self._name}{self._attrs}>"
 
@@ -199,13 +213,26 @@ def _python_to_html_name(name: str) -> str:
     return html_name
 
 
-@functools.lru_cache(maxsize=300)
+# Elements created via module __getattr__. A plain dict is used rather than
+# functools.lru_cache to keep lookups lock-free on free-threaded Python. Racing
+# threads may create the same element twice, which is harmless.
+_element_cache: dict[str, Element] = {}
+_ELEMENT_CACHE_SIZE = 300
+
+
 def get_element(name: str) -> Element:
+    if (element := _element_cache.get(name)) is not None:
+        return element
+
     if not name.islower():
         raise AttributeError(
             f"{name} is not a valid element name. html elements must have all lowercase names"
         )
-    return Element(_python_to_html_name(name))
+
+    element = Element(_python_to_html_name(name))
+    if len(_element_cache) < _ELEMENT_CACHE_SIZE:
+        element = _element_cache.setdefault(name, element)
+    return element
 
 
 _KnownValidChildren = (
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+import typing as t
+import weakref
+
+import markupsafe
+
+from htpy._elements import BaseElement, HTMLElement, VoidElement
+from htpy._flush import flush
+from htpy._fragments import Fragment
+from htpy._static_cache import has_default_rendering
+from htpy._templates import FilledTemplate
+
+if t.TYPE_CHECKING:
+    from htpy._types import Node
+
+
+# One byte before each part of the hashed data tells what follows. Text parts
+# are prefixed with their length, so that different trees can not hash the
+# same data.
+_ELEMENT = b"E"
+_TEXT = b"t"
+_MARKUP = b"m"
+_INT = b"i"
+_SEGMENT = b"s"
+_END = b")"
+
+# Element digests, computed once per element since elements are not modified
+# after they are created.
+_digests: weakref.WeakKeyDictionary[BaseElement, bytes] = weakref.WeakKeyDictionary()
+
+
+def _text(kind: bytes, value: str) -> bytes:
+    data = value.encode("utf-8", "surrogatepass")
+    return kind + len(data).to_bytes(8, "little") + data
+
+
+def _element_kind(element: BaseElement) -> bytes:
+    # Subclasses that render like the built-in elements hash like them.
+    if not has_default_rendering(element):
+        raise TypeError(
+            f"{element!r} can not be fingerprinted: it changes how elements are rendered"
+        )
+    if isinstance(element, HTMLElement):
+        return b"h"
+    if isinstance(element, VoidElement):
+        return b"v"
+    return b"e"
+
+
+def _element_digest(element: BaseElement) -> bytes:
+    digest = _digests.get(element)
+    if digest is not None:
+        return digest
+
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(_element_kind(element))
+    hasher.update(_text(_TEXT, element._name))  # pyright: ignore[reportPrivateUsage]
+    hasher.update(_text(_TEXT, element._attrs))  # pyright: ignore[reportPrivateUsage]
+    _update(hasher, element._children)  # pyright: ignore[reportPrivateUsage]
+    digest = hasher.digest()
+    # Racing threads compute the same digest, which is harmless.
+    _digests[element] = digest
+    return digest
+
+
+def _update(hasher: hashlib.blake2b, x: Node) -> None:
+    # Nodes that render nothing do not change the hash.
+    if x is None or x is True or x is False or x is flush:
+        return
+
+    if isinstance(x, BaseElement):
+        hasher.update(_ELEMENT + _element_digest(x))
+    elif isinstance(x, markupsafe.Markup):
+        hasher.update(_text(_MARKUP, x))
+    elif isinstance(x, str):
+        hasher.update(_text(_TEXT, x))
+    elif isinstance(x, int):
+        hasher.update(_text(_INT, str(x)))
+    elif isinstance(x, list | tuple):
+        for child in x:  # pyright: ignore[reportUnknownVariableType]
+            _update(hasher, child)  # pyright: ignore[reportUnknownArgumentType]
+    elif type(x) is Fragment:
+        _update(hasher, x._node)  # pyright: ignore[reportPrivateUsage]
+    elif type(x) is FilledTemplate:
+        segments = x._segments  # pyright: ignore[reportPrivateUsage]
+        hasher.update(_text(_SEGMENT, segments[0]))
+        for value, segment in zip(x._values, segments[1:]):  # pyright: ignore[reportPrivateUsage]  # noqa: B905
+            _update(hasher, value)
+            hasher.update(_text(_SEGMENT, segment))
+        hasher.update(_END)
+    else:
+        raise TypeError(
+            f"{x!r} can not be fingerprinted: only elements, fragments, strings, ints, "
+            "markup and lists and tuples of them are supported"
+        )
+
+
+def fingerprint(node: Node) -> str:
+    """Return a hash of the structure of a node, as a hex string.
+
+    Nodes with the same elements, attributes and children have the same
+    fingerprint, also between processes and Python versions. Use it as cache
+    keys, to find duplicate subtrees or as ETags.
+
+    Lazy children, such as callables, generators and awaitables, can not be
+    fingerprinted and raise TypeError. The fingerprint of an element is kept on
+    the element, since elements are not changed after they are created: do not
+    modify lists of children of fingerprinted elements.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    _update(hasher, node)
+    return hasher.hexdigest()
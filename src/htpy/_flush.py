@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import typing as t
+
+import markupsafe
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator, Mapping
+
+    from htpy._contexts import Context
+
+
+class FlushChunk(str):
+    """An empty chunk that asks buffering consumers to send what they have."""
+
+    __slots__ = ()
+
+
+FLUSH_CHUNK: t.Final = FlushChunk()
+
+
+class _FlushAtAwaitKey:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<flush at await>"
+
+
+# Key in the context mapping. When set, async rendering emits FLUSH_CHUNK
+# before it waits for awaitables and async iterables, so that the output
+# rendered so far can be sent while waiting.
+FLUSH_AT_AWAIT: t.Final = t.cast("Context[bool]", _FlushAtAwaitKey())
+
+
+class _Flush:
+    """A node that marks a point where buffered output should be sent."""
+
+    __slots__ = ()
+
+    def __str__(self) -> markupsafe.Markup:
+        return markupsafe.Markup()
+
+    __html__ = __str__
+
+    def __repr__(self) -> str:
+        return "<flush>"
+
+    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        yield FLUSH_CHUNK
+
+    async def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        yield FLUSH_CHUNK
+
+
+flush: t.Final = _Flush()
@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+import markupsafe
+
+from htpy import _cache
+from htpy._render_async import aiter_chunks_node
+from htpy._render_sync import RENDER_MEMO, chunks_as_markup, iter_chunks_node, new_render_context
+from htpy._single_flight import SingleFlight
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Hashable, Iterable, Iterator, Mapping
+
+    from htpy._cache import CacheBackend
+    from htpy._contexts import Context
+    from htpy._types import Node
+
+
+P = t.ParamSpec("P")
+K = t.TypeVar("K")
+V = t.TypeVar("V")
+
+# The rendered HTML of a memoized component, with the tags and cache policies
+# recorded while rendering it.
+_MemoizedEntry: t.TypeAlias = "tuple[markupsafe.Markup, _cache.Dependencies]"
+
+
+def _value_type(value: t.Any) -> t.Any:
+    if type(value) is tuple:
+        return tuple(_value_type(item) for item in value)  # pyright: ignore[reportUnknownVariableType]
+    return type(value)
+
+
+def argument_types(args: tuple[t.Any, ...], kwargs: Mapping[str, t.Any]) -> Hashable:
+    """Return the types of call arguments, to be part of a cache key.
+
+    Arguments that are equal can render differently: Markup("<b>") == "<b>"
+    and True == 1.
+    """
+    return (_value_type(args), tuple(_value_type(value) for value in kwargs.values()))
+
+
+class CacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int | None
+    currsize: int
+
+
+class LRUCache(t.Generic[K, V]):
+    """Thread safe LRU cache with optional expiry of entries."""
+
+    def __init__(self, maxsize: int | None = 128, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: K, is_valid: Callable[[V], bool] | None = None) -> V | None:
+        """Return the value of key, or None if it is missing or expired.
+
+        A value for which is_valid returns False is also treated as missing.
+        is_valid is called without holding the lock.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if is_valid is None:
+                self._count(value)
+                return value
+        if value is not None and not is_valid(value):
+            value = None
+        with self._lock:
+            self._count(value)
+        return value
+
+    def _lookup(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires is None or expires > time.monotonic():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+        return None
+
+    def _count(self, value: V | None) -> None:
+        if value is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, self.maxsize, len(self._entries)
+            )
+
+
+class _MemoizedCall:
+    __slots__ = ("_args", "_component", "_key", "_kwargs")
+
+    def __init__(
+        self,
+        component: _MemoizedComponent[...],
+        key: Hashable,
+        args: tuple[t.Any, ...],
+        kwargs: dict[str, t.Any],
+    ) -> None:
+        self._component = component
+        self._key = key
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> markupsafe.Markup:
+        return chunks_as_markup(self)
+
+    __html__ = __str__
+
+    def __repr__(self) -> str:
+        return f"<memoized {self._component.__wrapped__.__name__}{self._args!r}>"
+
+    def _cache_key(self, context: Mapping[Context[t.Any], t.Any] | None) -> Hashable:
+        contexts = self._component.contexts
+        if not contexts:
+            return self._key
+        context = context or {}
+        return (self._key, tuple(context.get(ctx, ctx.default) for ctx in contexts))
+
+    def _render(self, context: Mapping[Context[t.Any], t.Any] | None) -> _MemoizedEntry:
+        # The tags and cache policies are stored with the HTML, to record
+        # them again when the HTML is reused. The versions of the tags are
+        # stored as well, to not reuse the HTML after they are invalidated.
+        recorder = _cache.DependencyRecorder(self._component.backend)
+        with recorder.active():
+            node = self._component.__wrapped__(*self._args, **self._kwargs)
+            html = markupsafe.Markup("".join(iter_chunks_node(node, context)))
+        return html, recorder.dependencies
+
+    async def _arender(self, context: Mapping[Context[t.Any], t.Any] | None) -> _MemoizedEntry:
+        recorder = _cache.DependencyRecorder(self._component.backend)
+        with recorder.active():
+            node = self._component.__wrapped__(*self._args, **self._kwargs)
+            html = markupsafe.Markup("".join([x async for x in aiter_chunks_node(node, context)]))
+        return html, recorder.dependencies
+
+    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        component = self._component
+        key = self._cache_key(context)
+        entry = component.cache.get(key, component.is_current)
+        if entry is None:
+            leader, flight = component.flights.start(key)
+            if leader:
+                try:
+                    entry = self._render(context)
+                    component.cache.set(key, entry)
+                finally:
+                    component.flights.finish(key, flight, entry)
+            else:
+                # Use the result of a concurrent rendering of the same key.
+                entry = component.flights.wait(flight, component.wait_timeout)
+                if entry is None:
+                    entry = self._render(context)
+                else:
+                    entry[1].record()
+        else:
+            entry[1].record()
+        if html := entry[0]:
+            yield html
+
+    async def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        component = self._component
+        key = self._cache_key(context)
+        entry = component.cache.get(key, component.is_current)
+        if entry is None:
+            leader, flight = component.flights.start(key)
+            if leader:
+                try:
+                    entry = await self._arender(context)
+                    component.cache.set(key, entry)
+                finally:
+                    component.flights.finish(key, flight, entry)
+            else:
+                entry = await component.flights.await_result(flight, component.wait_timeout)
+                if entry is None:
+                    entry = await self._arender(context)
+                else:
+                    entry[1].record()
+        else:
+            entry[1].record()
+        if html := entry[0]:
+            yield html
+
+
+class _MemoizedComponent(t.Generic[P]):
+    __wrapped__: Callable[P, Node]
+
+    def __init__(
+        self,
+        func: Callable[P, Node],
+        *,
+        maxsize: int | None,
+        ttl: float | None,
+        key: Callable[P, Hashable] | None,
+        contexts: Iterable[Context[t.Any]],
+        wait_timeout: float,
+        backend: CacheBackend | None,
+    ) -> None:
+        functools.update_wrapper(self, func)
+        self.cache: LRUCache[Hashable, _MemoizedEntry] = LRUCache(maxsize, ttl)
+        self.backend = backend or _cache.default_backend
+        self.flights: SingleFlight[_MemoizedEntry] = SingleFlight()
+        self.key = key
+        self.contexts = tuple(contexts)
+        self.wait_timeout = wait_timeout
+
+    def __call__(self, *args: P.args, **kwargs: P.kwargs) -> _MemoizedCall:
+        if self.key:
+            key = self.key(*args, **kwargs)
+        else:
+            key = (args, tuple(kwargs.items()), argument_types(args, kwargs))
+        # Make sure that the key can be used in the cache.
+        hash(key)
+        return _MemoizedCall(self, key, args, kwargs)
+
+    def is_current(self, entry: _MemoizedEntry) -> bool:
+        # Entries are rendered again after any of their tags is invalidated.
+        return entry[1].is_current(self.backend)
+
+    def cache_info(self) -> CacheInfo:
+        return self.cache.info()
+
+    def cache_clear(self) -> None:
+        self.cache.clear()
+
+
+class _RenderOnceCall:
+    __slots__ = ("_args", "_component", "_key", "_kwargs")
+
+    def __init__(
+        self,
+        component: _RenderOnceComponent[...],
+        key: Hashable,
+        args: tuple[t.Any, ...],
+        kwargs: dict[str, t.Any],
+    ) -> None:
+        self._component = component
+        self._key = key
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> markupsafe.Markup:
+        return chunks_as_markup(self)
+
+    __html__ = __str__
+
+    def __repr__(self) -> str:
+        return f"<render once {self._component.__wrapped__.__name__}{self._args!r}>"
+
+    def _memo(
+        self, context: Mapping[Context[t.Any], t.Any]
+    ) -> tuple[dict[Hashable, _MemoizedEntry] | None, Hashable]:
+        # The same call can render differently with other context values. The
+        # context values are alive during the rendering, so their ids are
+        # stable.
+        context_ids = tuple(
+            (id(ctx), id(value)) for ctx, value in context.items() if ctx is not RENDER_MEMO
+        )
+        return context.get(RENDER_MEMO), (self._component, self._key, context_ids)
+
+    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        if context is None:
+            context = new_render_context()
+        memo, key = self._memo(context)
+        if memo is not None and (entry := memo.get(key)) is not None:
+            html, dependencies = entry
+            dependencies.record()
+            if html:
+                yield html
+            return
+
+        # The tags and cache policies are recorded while the component is
+        # rendered, but not while the chunks are consumed.
+        recorder = _cache.DependencyRecorder()
+        chunks: list[str] = []
+        with recorder.active():
+            iterator = iter_chunks_node(
+                self._component.__wrapped__(*self._args, **self._kwargs), context
+            )
+        while True:
+            with recorder.active():
+                chunk = next(iterator, None)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            yield chunk
+        if memo is not None:
+            memo[key] = markupsafe.Markup("".join(chunks)), recorder.dependencies
+
+    async def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        if context is None:
+            context = new_render_context()
+        memo, key = self._memo(context)
+        if memo is not None and (entry := memo.get(key)) is not None:
+            html, dependencies = entry
+            dependencies.record()
+            if html:
+                yield html
+            return
+
+        recorder = _cache.DependencyRecorder()
+        chunks: list[str] = []
+        with recorder.active():
+            iterator = aiter_chunks_node(
+                self._component.__wrapped__(*self._args, **self._kwargs), context
+            )
+        while True:
+            with recorder.active():
+                chunk = await anext(iterator, None)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            yield chunk
+        if memo is not None:
+            memo[key] = markupsafe.Markup("".join(chunks)), recorder.dependencies
+
+
+class _RenderOnceComponent(t.Generic[P]):
+    __wrapped__: Callable[P, Node]
+
+    def __init__(self, func: Callable[P, Node]) -> None:
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args: P.args, **kwargs: P.kwargs) -> _RenderOnceCall:
+        key = (args, tuple(kwargs.items()), argument_types(args, kwargs))
+        # Make sure that the key can be used in the memo table.
+        hash(key)
+        return _RenderOnceCall(self, key, args, kwargs)
+
+
+def render_once_per_args(func: Callable[P, Node]) -> _RenderOnceComponent[P]:
+    """Decorator that renders a component once per rendering for each set of arguments.
+
+    When the component is used again with the same arguments, which must be
+    hashable, in the same rendering (such as one call to str() or
+    iter_chunks()), the HTML of the first use is reused. Nothing is kept after
+    the rendering.
+    """
+    return _RenderOnceComponent(func)
+
+
+@t.overload
+def memoize(func: Callable[P, Node], /) -> _MemoizedComponent[P]: ...
+@t.overload
+def memoize(
+    *,
+    maxsize: int | None = 128,
+    ttl: float | None = None,
+    key: Callable[..., Hashable] | None = None,
+    contexts: Iterable[Context[t.Any]] = (),
+    wait_timeout: float = 10,
+    backend: CacheBackend | None = None,
+) -> Callable[[Callable[P, Node]], _MemoizedComponent[P]]: ...
+def memoize(
+    func: Callable[P, Node] | None = None,
+    /,
+    *,
+    maxsize: int | None = 128,
+    ttl: float | None = None,
+    key: Callable[..., Hashable] | None = None,
+    contexts: Iterable[Context[t.Any]] = (),
+    wait_timeout: float = 10,
+    backend: CacheBackend | None = None,
+) -> t.Any:
+    """Decorator that caches the rendered HTML of a component.
+
+    The HTML is cached for each distinct set of arguments, which must be
+    hashable, or for each value returned by key(*args, **kwargs) if given. The
+    values of the contexts, as provided when rendering, are also part of the
+    cache key.
+
+    At most maxsize entries are cached, the least recently used entries are
+    discarded first. Entries expire after ttl seconds if given.
+
+    Entries that depend on tags recorded with depends_on() are rendered again
+    after any of the tags are invalidated with invalidate_tags(). The versions
+    of the tags are read from backend, the default cache backend if not given.
+
+    Concurrent renderings of the same entry in other threads and tasks wait
+    for the first rendering and use its result, for at most wait_timeout
+    seconds.
+
+    Use cache_info() and cache_clear() on the decorated component to inspect
+    and clear the cache.
+    """
+
+    def decorator(func: Callable[P, Node]) -> _MemoizedComponent[P]:
+        return _MemoizedComponent(
+            func,
+            maxsize=maxsize,
+            ttl=ttl,
+            key=key,
+            contexts=contexts,
+            wait_timeout=wait_timeout,
+            backend=backend,
+        )
+
+    if func is None:
+        return decorator
+    return decorator(func)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import typing as t
+
+import markupsafe
+
+from htpy._contexts import ContextProvider
+from htpy._elements import BaseElement, Element, HTMLElement, VoidElement
+from htpy._fragments import Fragment, fragment
+
+if t.TYPE_CHECKING:
+    from htpy._types import Node
+
+
+class _Optimizer:
+    def __init__(self) -> None:
+        self.parts: list[Node] = []
+        self._static: list[str] = []
+
+    def _flush_static(self) -> None:
+        if self._static:
+            self.parts.append(markupsafe.Markup("".join(self._static)))
+            self._static = []
+
+    def add_static(self, html: str) -> None:
+        self._static.append(html)
+
+    def add_dynamic(self, node: Node) -> None:
+        self._flush_static()
+        self.parts.append(node)
+
+    def result(self) -> Node:
+        self._flush_static()
+        if len(self.parts) == 1:
+            return self.parts[0]
+        return tuple(self.parts)
+
+    def add(self, x: Node) -> None:
+        if x is None or x is True or x is False:
+            return
+
+        if isinstance(x, str):
+            self.add_static(str(markupsafe.escape(x)))
+
+        elif isinstance(x, int):
+            self.add_static(str(x))
+
+        elif isinstance(x, list | tuple):
+            for child in x:  # pyright: ignore[reportUnknownVariableType]
+                self.add(child)  # pyright: ignore[reportUnknownArgumentType]
+
+        elif type(x) is Fragment:
+            self.add(x._node)  # pyright: ignore[reportPrivateUsage]
+
+        elif type(x) in (BaseElement, Element, HTMLElement):
+            assert isinstance(x, BaseElement)
+            if type(x) is HTMLElement:
+                self.add_static("<!doctype html>")
+            self.add_static(f"<{x._name}{x._attrs}>")  # pyright: ignore[reportPrivateUsage]
+            self.add(x._children)  # pyright: ignore[reportPrivateUsage]
+            self.add_static(f"</{x._name}>")  # pyright: ignore[reportPrivateUsage]
+
+        elif type(x) is VoidElement:
+            self.add_static(f"<{x._name}{x._attrs}>")  # pyright: ignore[reportPrivateUsage]
+
+        elif isinstance(x, ContextProvider):
+            self.add_dynamic(
+                ContextProvider(x.context, x.value, _optimize_node(x.node))  # pyright: ignore[reportUnknownArgumentType, reportUnknownMemberType]
+            )
+
+        else:
+            # Generators, callables, awaitables, context consumers and other
+            # objects that may render differently every time.
+            self.add_dynamic(x)
+
+
+def _optimize_node(node: Node) -> Node:
+    optimizer = _Optimizer()
+    optimizer.add(node)
+    return optimizer.result()
+
+
+def optimize(node: Node) -> Fragment:
+    """Return an equivalent node that is cheaper to render.
+
+    Nested lists, tuples and fragments are flattened, None/True/False are
+    dropped and text is escaped. Elements are replaced by their tags, and runs
+    of static content are merged into single Markup strings. Generators,
+    callables, awaitables and context consumers are kept as is.
+
+    Lists are copied when optimizing. Changes to lists after optimizing are not
+    reflected in the optimized node.
+    """
+    return fragment[_optimize_node(node)]
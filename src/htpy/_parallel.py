@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from htpy._render_async import aiter_chunks_node
+from htpy._render_sync import chunks_as_markup, iter_chunks_node
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator, Mapping
+    from concurrent.futures import Executor, Future
+
+    import markupsafe
+
+    from htpy._contexts import Context
+    from htpy._types import Node
+
+
+_default_executor: ThreadPoolExecutor | None = None
+_default_executor_lock = threading.Lock()
+
+# Set while a thread is rendering a parallel subtree. Nested parallel
+# containers render sequentially in that case, since waiting on the same pool
+# from one of its own workers could otherwise deadlock.
+_worker_state = threading.local()
+
+
+def _get_default_executor() -> ThreadPoolExecutor:
+    global _default_executor
+
+    if _default_executor is None:
+        with _default_executor_lock:
+            if _default_executor is None:
+                _default_executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count(), thread_name_prefix="htpy-parallel"
+                )
+    return _default_executor
+
+
+def _render_subtree(node: Node, context: Mapping[Context[t.Any], t.Any] | None) -> str:
+    _worker_state.active = True
+    try:
+        return "".join(iter_chunks_node(node, context))
+    finally:
+        _worker_state.active = False
+
+
+async def _arender_subtree(node: Node, context: Mapping[Context[t.Any], t.Any] | None) -> str:
+    return "".join([chunk async for chunk in aiter_chunks_node(node, context)])
+
+
+class Parallel:
+    """A collection of nodes that are rendered concurrently.
+
+    Each node is rendered into a separate buffer. The buffers are emitted in
+    order, as soon as all preceding nodes have finished rendering.
+    """
+
+    __slots__ = ("_nodes", "_executor")
+
+    def __init__(self, nodes: tuple[Node, ...], executor: Executor | None) -> None:
+        self._nodes = nodes
+        self._executor = executor
+
+    def __str__(self) -> markupsafe.Markup:
+        return chunks_as_markup(self)
+
+    __html__ = __str__
+
+    def __repr__(self) -> str:
+        return f"<Parallel {self._nodes!r}>"
+
+    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        if len(self._nodes) < 2 or getattr(_worker_state, "active", False):
+            for node in self._nodes:
+                yield from iter_chunks_node(node, context)
+            return
+
+        executor = self._executor or _get_default_executor()
+        # Run in a copy of the context, so that tags and cache policies
+        # declared by the subtrees are recorded.
+        futures: list[Future[str]] = [
+            executor.submit(contextvars.copy_context().run, _render_subtree, node, context)
+            for node in self._nodes
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        if len(self._nodes) < 2:
+            for node in self._nodes:
+                async for chunk in aiter_chunks_node(node, context):
+                    yield chunk
+            return
+
+        # In async context, the subtrees are rendered as concurrent tasks on
+        # the running event loop. Subtrees that await I/O then overlap.
+        tasks = [asyncio.ensure_future(_arender_subtree(node, context)) for node in self._nodes]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class _ParallelGetter:
+    def __init__(self, executor: Executor | None = None) -> None:
+        self._executor = executor
+
+    def __call__(self, *, executor: Executor) -> _ParallelGetter:
+        return _ParallelGetter(executor)
+
+    def __getitem__(self, nodes: Node) -> Parallel:
+        if isinstance(nodes, tuple | list):
+            return Parallel(tuple(nodes), self._executor)  # pyright: ignore[reportUnknownArgumentType]
+        return Parallel((nodes,), self._executor)
+
+
+parallel = _ParallelGetter()
@@ -11,6 +11,8 @@ from collections.abc import (
 
 import markupsafe
 
+from ._flush import FLUSH_AT_AWAIT, FLUSH_CHUNK
+from ._render_sync import new_render_context
 from ._types import HasHtml, KnownInvalidChildren, Node
 
 if t.TYPE_CHECKING:
@@ -24,6 +26,8 @@ async def aiter_chunks_node(
 
     while True:
         if isinstance(x, Awaitable):
+            if context is not None and FLUSH_AT_AWAIT in context:
+                yield FLUSH_CHUNK
             x = await x  # pyright: ignore [reportUnknownVariableType]
             continue
 
@@ -42,6 +46,9 @@ async def aiter_chunks_node(
     if x is False:
         return
 
+    if context is None:
+        context = new_render_context()
+
     if hasattr(x, "aiter_chunks"):  # pyright: ignore [reportUnknownVariableType, reportUnknownArgumentType]
         async for chunk in x.aiter_chunks(context):  # pyright: ignore
             yield chunk
@@ -54,8 +61,26 @@ async def aiter_chunks_node(
             async for chunk in aiter_chunks_node(child, context):  # pyright: ignore
                 yield chunk
     elif isinstance(x, AsyncIterable):  # pyright: ignore[reportUnnecessaryIsInstance]
+        if FLUSH_AT_AWAIT in context:
+            async for chunk in _aiter_chunks_flushing(x, context):  # pyright: ignore[reportUnknownArgumentType]
+                yield chunk
+            return
         async for child in x:  # pyright: ignore[reportUnknownVariableType]
             async for chunk in aiter_chunks_node(child, context):  # pyright: ignore[reportUnknownArgumentType]
                 yield chunk
     else:
         raise TypeError(f"{x!r} is not a valid child element")
+
+
+async def _aiter_chunks_flushing(
+    x: AsyncIterable[Node], context: Mapping[Context[t.Any], t.Any]
+) -> AsyncIterator[str]:
+    iterator = aiter(x)
+    while True:
+        yield FLUSH_CHUNK
+        try:
+            child = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        async for chunk in aiter_chunks_node(child, context):
+            yield chunk
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import collections
+import itertools
+import os
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+
+from htpy._render_sync import iter_chunks_node
+
+if t.TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from concurrent.futures import Future
+    from multiprocessing.context import BaseContext
+
+    from htpy._types import Node
+
+
+RenderJob: t.TypeAlias = "tuple[Callable[..., Node], tuple[t.Any, ...]]"
+RenderFileJob: t.TypeAlias = "tuple[str | os.PathLike[str], Callable[..., Node], tuple[t.Any, ...]]"
+
+T = t.TypeVar("T")
+R = t.TypeVar("R")
+
+
+def _render_job(func: Callable[..., Node], args: tuple[t.Any, ...], encoding: str) -> bytes:
+    return "".join(iter_chunks_node(func(*args), None)).encode(encoding)
+
+
+def _render_batch(batch: list[RenderJob], encoding: str) -> list[bytes]:
+    return [_render_job(func, args, encoding) for func, args in batch]
+
+
+def _write_batch(batch: list[RenderFileJob], encoding: str) -> list[None]:
+    for path, func, args in batch:
+        with open(path, "wb") as f:
+            f.write(_render_job(func, args, encoding))
+    return [None] * len(batch)
+
+
+def _run_batches(
+    batch_func: Callable[[list[T], str], list[R]],
+    jobs: Iterable[T],
+    *,
+    workers: int | None,
+    chunksize: int,
+    encoding: str,
+    progress: Callable[[int], None] | None,
+    mp_context: BaseContext | None,
+) -> Iterator[R]:
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    max_workers = workers or os.cpu_count() or 1
+    jobs_iter = iter(jobs)
+    completed = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        # Only keep a bounded number of batches in flight, the jobs iterable
+        # may be lazy and very long.
+        pending: collections.deque[Future[list[R]]] = collections.deque()
+
+        def submit_next() -> bool:
+            batch = list(itertools.islice(jobs_iter, chunksize))
+            if not batch:
+                return False
+            pending.append(executor.submit(batch_func, batch, encoding))
+            return True
+
+        while len(pending) < max_workers * 2 and submit_next():
+            pass
+
+        try:
+            while pending:
+                results = pending.popleft().result()
+                submit_next()
+                completed += len(results)
+                yield from results
+                if progress is not None:
+                    progress(completed)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def render_many(
+    jobs: Iterable[RenderJob],
+    *,
+    workers: int | None = None,
+    chunksize: int = 16,
+    encoding: str = "utf-8",
+    progress: Callable[[int], None] | None = None,
+    mp_context: BaseContext | None = None,
+) -> Iterator[bytes]:
+    """Render many pages in parallel using a pool of worker processes.
+
+    Each job is a `(callable, args)` tuple. The callable is called with args in
+    a worker process and must return a node. Both the callable and the args must
+    be picklable, the returned node does not need to be.
+
+    The rendered pages are yielded as encoded bytes, in the same order as the
+    jobs. `progress` is called with the number of completed jobs after each
+    finished batch of `chunksize` jobs. `mp_context` is passed to
+    `concurrent.futures.ProcessPoolExecutor` to control how workers are started.
+    """
+    return _run_batches(
+        _render_batch,
+        jobs,
+        workers=workers,
+        chunksize=chunksize,
+        encoding=encoding,
+        progress=progress,
+        mp_context=mp_context,
+    )
+
+
+def render_many_to_files(
+    jobs: Iterable[RenderFileJob],
+    *,
+    workers: int | None = None,
+    chunksize: int = 16,
+    encoding: str = "utf-8",
+    progress: Callable[[int], None] | None = None,
+    mp_context: BaseContext | None = None,
+) -> None:
+    """Render many pages in parallel and write them straight to files.
+
+    Each job is a `(path, callable, args)` tuple. The page is rendered and
+    written to path in the worker process. See `render_many` for details.
+    """
+    for _ in _run_batches(
+        _write_batch,
+        jobs,
+        workers=workers,
+        chunksize=chunksize,
+        encoding=encoding,
+        progress=progress,
+        mp_context=mp_context,
+    ):
+        pass
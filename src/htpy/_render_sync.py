@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 import typing as t
 import weakref
 from collections.abc import AsyncIterable, Awaitable, Generator, Iterable
@@ -14,8 +15,28 @@ if t.TYPE_CHECKING:
     from htpy._contexts import Context
     from htpy._types import Node, Renderable
 
-# Track consumed generators to prevent double consumption
+# Track consumed generators to prevent double consumption. A generator can be
+# rendered from any thread, so the check and the update are made under a lock.
+# The lock is only taken for generator children.
 _consumed_generators: weakref.WeakSet[Generator[t.Any, t.Any, t.Any]] = weakref.WeakSet()
+_consumed_generators_lock = threading.Lock()
+
+
+class _RenderMemoKey:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "<render memo>"
+
+
+# Key in the context mapping for the memo table used by render_once_per_args().
+# The table is created when rendering starts and lives as long as the
+# rendering, since the same context mapping is passed to all nodes.
+RENDER_MEMO: t.Final = t.cast("Context[dict[t.Hashable, t.Any]]", _RenderMemoKey())
+
+
+def new_render_context() -> Mapping[Context[t.Any], t.Any]:
+    return {RENDER_MEMO: {}}
 
 
 def chunks_as_markup(renderable: Renderable) -> markupsafe.Markup:
@@ -37,6 +58,9 @@ def iter_chunks_node(x: Node, context: Mapping[Context[t.Any], t.Any] | None) ->
     if x is False:
         return
 
+    if context is None:
+        context = new_render_context()
+
     if hasattr(x, "iter_chunks"):
         yield from x.iter_chunks(context)  # pyright: ignore
     elif isinstance(x, str | HasHtml):
@@ -44,9 +68,10 @@ def iter_chunks_node(x: Node, context: Mapping[Context[t.Any], t.Any] | None) ->
     elif isinstance(x, int):
         yield str(x)
     elif isinstance(x, Generator):
-        if x in _consumed_generators:
-            raise RuntimeError("Generator has already been consumed")
-        _consumed_generators.add(x)
+        with _consumed_generators_lock:
+            if x in _consumed_generators:
+                raise RuntimeError("Generator has already been consumed")
+            _consumed_generators.add(x)
         for child in x:
             yield from iter_chunks_node(child, context)
     elif isinstance(x, Iterable) and not isinstance(x, KnownInvalidChildren):  # pyright: ignore [reportUnnecessaryIsInstance]
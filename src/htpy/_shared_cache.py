@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+# File layout:
+#
+#   header: magic, number of sets, ways per set, max entry size
+#   slots:  number of sets * ways slots of _SLOT.size + max entry size bytes
+#
+# Each slot is protected by a sequence lock: writers make the sequence number
+# odd while the slot is being written, and even again when done. Readers do not
+# take any lock, they retry if the sequence number was odd or changed while
+# reading. Writers are serialized with flock() on the file.
+_MAGIC = b"HTPYSHM1"
+_HEADER = struct.Struct("<8sIII")
+_HEADER_SIZE = 64
+# sequence number, key hash, expiry time (0 = never), last use time, length
+_SLOT = struct.Struct("<Q16sddI")
+_SLOT_HEADER_SIZE = 48
+_SEQ = struct.Struct("<Q")
+_LAST_USED = struct.Struct("<d")
+_LAST_USED_OFFSET = 32
+_EMPTY_HASH = bytes(16)
+_READ_ATTEMPTS = 10
+
+
+def _key_hash(key: str) -> bytes:
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    # The all zero hash marks empty slots.
+    return digest if digest != _EMPTY_HASH else b"\x01" + digest[1:]
+
+
+class SharedMemoryCacheBackend:
+    """Fragment cache shared by all processes on a host, in a memory mapped file.
+
+    The file is split into sets of slots, a key can only be stored in the slots
+    of one set. When all slots of the set are used, the least recently used
+    entry is replaced. Entries larger than max_entry_size are not cached.
+
+    Reads do not take any locks, writes are serialized with a file lock. Only
+    supported on Unix.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        *,
+        size: int = 64 * 1024 * 1024,
+        max_entry_size: int = 64 * 1024,
+        ways: int = 8,
+    ) -> None:
+        self.path = os.fspath(path)
+        self.max_entry_size = max_entry_size
+        self.ways = ways
+        self._slot_size = _SLOT_HEADER_SIZE + max_entry_size
+        self.num_sets = max(1, (size - _HEADER_SIZE) // self._slot_size // ways)
+
+        self._thread_lock = threading.Lock()
+        self._pid: int | None = None
+        self._fd = -1
+        self._mm: mmap.mmap | None = None
+
+    def __getstate__(self) -> dict[str, t.Any]:
+        # Each process opens the file itself.
+        size = _HEADER_SIZE + self.num_sets * self.ways * self._slot_size
+        return {
+            "path": self.path,
+            "size": size,
+            "max_entry_size": self.max_entry_size,
+            "ways": self.ways,
+        }
+
+    def __setstate__(self, state: dict[str, t.Any]) -> None:
+        path = state.pop("path")
+        self.__init__(path, **state)  # type: ignore[misc]
+
+    def _file_size(self) -> int:
+        return _HEADER_SIZE + self.num_sets * self.ways * self._slot_size
+
+    def _mmap(self) -> mmap.mmap:
+        # File locks are shared by processes that share the file descriptor, so
+        # forked processes must open the file again.
+        if self._mm is not None and self._pid == os.getpid():
+            return self._mm
+
+        with self._thread_lock:
+            if self._mm is not None and self._pid == os.getpid():
+                return self._mm
+
+            import fcntl
+
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    header = os.pread(fd, _HEADER.size, 0)
+                    expected = _HEADER.pack(_MAGIC, self.num_sets, self.ways, self.max_entry_size)
+                    if not header:
+                        os.ftruncate(fd, self._file_size())
+                        os.pwrite(fd, expected, 0)
+                    elif header != expected:
+                        raise ValueError(
+                            f"{self.path} is not a cache file, or was created with other settings"
+                        )
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                mm = mmap.mmap(fd, self._file_size())
+            except BaseException:
+                os.close(fd)
+                raise
+
+            self._fd = fd
+            self._mm = mm
+            self._pid = os.getpid()
+            return mm
+
+    def close(self) -> None:
+        with self._thread_lock:
+            if self._mm is not None and self._pid == os.getpid():
+                self._mm.close()
+                os.close(self._fd)
+            self._mm = None
+            self._pid = None
+
+    def _slot_offsets(self, key_hash: bytes) -> Iterator[int]:
+        first_slot = int.from_bytes(key_hash[:8], "little") % self.num_sets * self.ways
+        for slot in range(first_slot, first_slot + self.ways):
+            yield _HEADER_SIZE + slot * self._slot_size
+
+    def get(self, key: str) -> bytes | None:
+        mm = self._mmap()
+        key_hash = _key_hash(key)
+
+        for offset in self._slot_offsets(key_hash):
+            for _ in range(_READ_ATTEMPTS):
+                seq, slot_hash, expires, _, length = _SLOT.unpack_from(mm, offset)
+                if seq & 1:
+                    # Being written, try again.
+                    time.sleep(0)
+                    continue
+                if slot_hash != key_hash:
+                    break
+
+                data_offset = offset + _SLOT_HEADER_SIZE
+                value = mm[data_offset : data_offset + min(length, self.max_entry_size)]
+                if _SEQ.unpack_from(mm, offset)[0] != seq:
+                    continue
+
+                now = time.time()
+                if expires and expires <= now:
+                    return None
+                # Not protected by the lock, a lost update only affects which
+                # entry is evicted.
+                _LAST_USED.pack_into(mm, offset + _LAST_USED_OFFSET, now)
+                return value
+            else:
+                # The slot kept changing, treat it as a miss.
+                return None
+
+        return None
+
+    def _write(
+        self, mm: mmap.mmap, offset: int, key_hash: bytes, expires: float, value: bytes
+    ) -> None:
+        (seq,) = _SEQ.unpack_from(mm, offset)
+        _SEQ.pack_into(mm, offset, seq + 1)
+        data_offset = offset + _SLOT_HEADER_SIZE
+        mm[data_offset : data_offset + len(value)] = value
+        _SLOT.pack_into(mm, offset, seq + 1, key_hash, expires, time.time(), len(value))
+        _SEQ.pack_into(mm, offset, seq + 2)
+
+    def set(self, key: str, value: bytes, ttl: float | None) -> None:
+        if len(value) > self.max_entry_size:
+            return
+
+        import fcntl
+
+        mm = self._mmap()
+        key_hash = _key_hash(key)
+        expires = 0.0 if ttl is None else time.time() + ttl
+
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                target = None
+                oldest = None
+                for offset in self._slot_offsets(key_hash):
+                    _, slot_hash, slot_expires, last_used, _ = _SLOT.unpack_from(mm, offset)
+                    if slot_hash == key_hash:
+                        target = offset
+                        break
+                    if slot_hash == _EMPTY_HASH or (slot_expires and slot_expires <= now):
+                        last_used = -1.0
+                    if oldest is None or last_used < oldest[0]:
+                        oldest = (last_used, offset)
+
+                if target is None:
+                    assert oldest is not None
+                    target = oldest[1]
+                self._write(mm, target, key_hash, expires, value)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def clear(self) -> None:
+        import fcntl
+
+        mm = self._mmap()
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for set_index in range(self.num_sets):
+                    for way in range(self.ways):
+                        offset = _HEADER_SIZE + (set_index * self.ways + way) * self._slot_size
+                        self._write(mm, offset, _EMPTY_HASH, 0.0, b"")
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
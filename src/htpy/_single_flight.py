@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import typing as t
+
+if t.TYPE_CHECKING:
+    from collections.abc import Hashable
+
+T = t.TypeVar("T")
+
+
+class Flight(t.Generic[T]):
+    """A rendering in progress, that other threads and tasks can wait for."""
+
+    __slots__ = ("event", "result", "task", "thread", "waiters")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: T | None = None
+        self.thread = threading.get_ident()
+        self.task = _current_task()
+        self.waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future[T | None]]] = []
+
+
+def _current_task() -> asyncio.Task[t.Any] | None:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+def _set_result(future: asyncio.Future[T | None], result: T | None) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+class SingleFlight(t.Generic[T]):
+    """Make sure that only one thread or task renders the same key at a time.
+
+    The first caller of start() for a key becomes the leader and must call
+    finish() with the result, such as the rendered HTML, or None if rendering failed. Other callers
+    wait for the result of the leader.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, Flight[T]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, key: Hashable) -> tuple[bool, Flight[T]]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return False, flight
+            flight = self._flights[key] = Flight()
+            return True, flight
+
+    def finish(self, key: Hashable, flight: Flight[T], result: T | None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.result = result
+            flight.event.set()
+            waiters, flight.waiters = flight.waiters, []
+
+        for loop, future in waiters:
+            # The loop may be closed if the waiting task has been abandoned.
+            try:
+                loop.call_soon_threadsafe(_set_result, future, result)
+            except RuntimeError:
+                pass
+
+    def wait(self, flight: Flight[T], timeout: float) -> T | None:
+        """Wait for the result of the leader.
+
+        Returns None if rendering failed or timed out, or if the leader runs in
+        the current thread, since it can not make progress while waiting.
+        """
+        if flight.thread == threading.get_ident():
+            return None
+        flight.event.wait(timeout)
+        return flight.result
+
+    async def await_result(self, flight: Flight[T], timeout: float) -> T | None:
+        """Wait for the result of the leader, without blocking the event loop."""
+        if flight.task is not None and flight.task is _current_task():
+            return None
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[T | None] = loop.create_future()
+        with self._lock:
+            if flight.event.is_set():
+                return flight.result
+            flight.waiters.append((loop, future))
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
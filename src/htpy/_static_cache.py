@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import sys
+import threading
+import typing as t
+import weakref
+
+from htpy._compression import PrecompressedChunk
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator, Mapping
+
+    from htpy._contexts import Context
+    from htpy._elements import BaseElement
+    from htpy._types import Node
+
+
+N = t.TypeVar("N", bound="Node")
+
+
+class _State:
+    enabled = False
+    max_bytes = 0
+    used_bytes = 0
+    lock = threading.Lock()
+    # Set while a static subtree is rendered to be cached. Nested elements are
+    # not cached separately, since their output is part of the cached parent.
+    local = threading.local()
+
+
+state = _State()
+
+# The static cache state of the elements marked with static(): the cached
+# output (a str) or one of the markers below. Kept outside of the elements,
+# since it is only used for a few long-lived elements. Other elements are not
+# tracked, to not slow down the rendering of elements made for each request.
+entries: weakref.WeakKeyDictionary[BaseElement, object] = weakref.WeakKeyDictionary()
+
+# The ids of the marked elements, checked before anything else when an element
+# is rendered. A set lookup is much cheaper than a lookup in entries, which
+# creates a weak reference each time. An id is removed when its element is
+# garbage collected, before the id can be reused.
+marked: set[int] = set()
+
+MARKED = object()
+NOT_STATIC = object()
+CACHE_FULL = object()
+
+
+def _mark(x: t.Any) -> None:
+    from htpy._elements import BaseElement
+    from htpy._fragments import Fragment
+
+    if isinstance(x, list | tuple):
+        for child in x:  # pyright: ignore[reportUnknownVariableType]
+            _mark(child)
+    elif type(x) is Fragment:
+        _mark(x._node)  # pyright: ignore[reportPrivateUsage]
+    elif isinstance(x, BaseElement) and has_default_rendering(x):
+        if x not in entries:
+            entries[x] = MARKED
+            marked.add(id(x))
+            weakref.finalize(x, marked.discard, id(x))
+        _mark(x._children)  # pyright: ignore[reportPrivateUsage]
+
+
+def static(node: N) -> N:
+    """Mark the elements of a long-lived node to be cached by the static cache.
+
+    Use it for nodes that are built once, such as at import time, and rendered
+    many times. Returns the node.
+    """
+    _mark(node)
+    return node
+
+
+def enable_static_cache(max_bytes: int = 32 * 1024 * 1024) -> None:
+    """Cache the output of immutable elements marked with static().
+
+    Marked elements whose whole subtree is immutable (strings, ints, markup,
+    None, bools, tuples and other immutable elements) are rendered once and the
+    output is kept for the element. Later renderings emit the cached output as
+    a single chunk.
+
+    No more than max_bytes of output is kept in total.
+    """
+    with state.lock:
+        state.max_bytes = max_bytes
+        state.enabled = True
+
+
+def disable_static_cache() -> None:
+    """Stop using and populating the static cache."""
+    state.enabled = False
+
+
+def _release(size: int) -> None:
+    with state.lock:
+        state.used_bytes -= size
+
+
+def _reserve(size: int) -> bool:
+    with state.lock:
+        if state.used_bytes + size > state.max_bytes:
+            return False
+        state.used_bytes += size
+        return True
+
+
+def has_default_rendering(element: BaseElement) -> bool:
+    """Check that the element is not a subclass that changes how it renders."""
+    from htpy._elements import BaseElement, HTMLElement, VoidElement
+
+    cls = type(element)
+    return (
+        cls.iter_chunks is BaseElement.iter_chunks
+        and cls.aiter_chunks is BaseElement.aiter_chunks
+        and cls._iter_chunks  # pyright: ignore[reportPrivateUsage]
+        in (
+            BaseElement._iter_chunks,  # pyright: ignore[reportPrivateUsage]
+            HTMLElement._iter_chunks,  # pyright: ignore[reportPrivateUsage]
+            VoidElement._iter_chunks,  # pyright: ignore[reportPrivateUsage]
+        )
+    )
+
+
+def is_static(x: t.Any) -> bool:
+    from htpy._elements import BaseElement
+    from htpy._fragments import Fragment
+    from htpy._templates import FilledTemplate
+
+    if x is None or isinstance(x, str | int):
+        return True
+
+    if isinstance(x, tuple):
+        return all(is_static(child) for child in x)  # pyright: ignore[reportUnknownVariableType]
+
+    if type(x) is Fragment:
+        return is_static(x._node)  # pyright: ignore[reportPrivateUsage]
+
+    if type(x) is FilledTemplate:
+        return all(is_static(value) for value in x._values)  # pyright: ignore[reportPrivateUsage]
+
+    if isinstance(x, BaseElement):
+        if not has_default_rendering(x):
+            return False
+
+        cached = entries.get(x)
+        if cached is NOT_STATIC:
+            return False
+        if isinstance(cached, str):
+            return True
+        return is_static(x._children)  # pyright: ignore[reportPrivateUsage]
+
+    return False
+
+
+def _cached_output(element: BaseElement) -> str | None:
+    cached = entries.get(element)
+
+    if isinstance(cached, str):
+        return cached
+
+    if cached is not MARKED or getattr(state.local, "rendering", False):
+        return None
+
+    if not is_static(element):
+        entries[element] = NOT_STATIC
+        return None
+
+    state.local.rendering = True
+    try:
+        output = "".join(element._iter_chunks(None))  # pyright: ignore[reportPrivateUsage]
+    finally:
+        state.local.rendering = False
+
+    size = sys.getsizeof(output)
+    if _reserve(size):
+        # The compressed form is made when the element is first rendered in a
+        # compressed response, and kept with the output.
+        output = PrecompressedChunk(output)
+        entries[element] = output
+        weakref.finalize(element, _release, size)
+    else:
+        # The cache is full, avoid rendering this element up front again.
+        entries[element] = CACHE_FULL
+    return output
+
+
+def iter_chunks(
+    element: BaseElement, context: Mapping[Context[t.Any], t.Any] | None
+) -> Iterator[str]:
+    if (output := _cached_output(element)) is not None:
+        return iter((output,))
+    return element._iter_chunks(context)  # pyright: ignore[reportPrivateUsage]
+
+
+async def aiter_chunks(
+    element: BaseElement, context: Mapping[Context[t.Any], t.Any] | None
+) -> AsyncIterator[str]:
+    if (output := _cached_output(element)) is not None:
+        yield output
+        return
+
+    async for chunk in element._aiter_chunks(context):  # pyright: ignore[reportPrivateUsage]
+        yield chunk
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import re
+import typing as t
+
+import markupsafe
+
+from htpy._attributes import _force_escape, attrs_string  # pyright: ignore[reportPrivateUsage]
+from htpy._compression import PrecompressedChunk
+from htpy._elements import BaseElement, _validate_children  # pyright: ignore[reportPrivateUsage]
+from htpy._flush import FlushChunk, flush
+from htpy._fragments import Fragment
+from htpy._render_async import aiter_chunks_node
+from htpy._render_sync import chunks_as_markup, iter_chunks_node
+from htpy._static_cache import has_default_rendering
+from htpy._types import HasHtml
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator, Mapping
+
+    from htpy._contexts import Context
+    from htpy._types import Node
+
+
+# Holes are rendered as markers made from private use characters, which are
+# left untouched by escaping. The surrounding spaces and mixed case letters make
+# sure that a hole that has been transformed as a string (e.g. with .strip() or
+# .upper()) is not recognized as a hole.
+_HOLE_START = " \ue000hH"
+_HOLE_END = "\ue001 "
+_HOLE_RE = re.compile(f"{_HOLE_START}([a-z]):([^\ue001]*){_HOLE_END}")
+_HOLE_CHARS_RE = re.compile("[\ue000\ue001]")
+
+# The start of an attribute that has a slot as its whole value.
+_ATTRIBUTE_START_RE = re.compile(r' ([^\s"\'<>/=]+)="\Z')
+
+# Hole kinds:
+#   CHILD: The hole object itself was used as a child node.
+#   TEXT: The hole was converted to a string, e.g. as an attribute value or in
+#         an f-string. The value is escaped as text.
+#   FLUSH: A flush node in the template. It has no name.
+#   ATTRIBUTE: A TEXT hole that is the whole value of an attribute, found by
+#              Template.
+CHILD = "c"
+TEXT = "t"
+FLUSH = "f"
+ATTRIBUTE = "a"
+
+
+def hole_marker(kind: str, key: str) -> str:
+    return f"{_HOLE_START}{kind}:{key}{_HOLE_END}"
+
+
+def split_holes(html: str) -> tuple[list[str], list[tuple[str, str]]] | None:
+    """Split rendered HTML into static segments and the holes between them.
+
+    Returns None if the HTML contains partial or mangled markers.
+    """
+    parts = _HOLE_RE.split(html)
+    segments = parts[::3]
+
+    if any(_HOLE_CHARS_RE.search(segment) for segment in segments):
+        return None
+
+    holes = list(zip(parts[1::3], parts[2::3], strict=True))
+    return segments, holes
+
+
+def is_traceable(x: t.Any, hole_type: type[t.Any]) -> bool:
+    """Check if the node renders the same every time, apart from holes."""
+    if x is None or x is flush or isinstance(x, str | int | hole_type):
+        return True
+
+    if isinstance(x, list | tuple):
+        return all(is_traceable(child, hole_type) for child in x)  # pyright: ignore[reportUnknownVariableType]
+
+    if type(x) is Fragment:
+        return is_traceable(x._node, hole_type)  # pyright: ignore[reportPrivateUsage]
+
+    if type(x) is FilledTemplate:
+        # The segments are static HTML, such as the children compiled by
+        # htpy.compiler.
+        return all(is_traceable(value, hole_type) for value in x._values)  # pyright: ignore[reportPrivateUsage]
+
+    if isinstance(x, BaseElement) and has_default_rendering(x):
+        return is_traceable(x._children, hole_type)  # pyright: ignore[reportPrivateUsage]
+
+    return False
+
+
+class FilledTemplate:
+    """Static segments interleaved with values.
+
+    segments has one more item than values. Values are rendered as regular
+    child nodes.
+    """
+
+    __slots__ = ("_segments", "_values")
+
+    def __init__(self, segments: t.Sequence[str], values: t.Sequence[Node]) -> None:
+        self._segments = segments
+        self._values = values
+
+    def __str__(self) -> markupsafe.Markup:
+        return chunks_as_markup(self)
+
+    __html__ = __str__
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self._segments!r} {self._values!r}>"
+
+    def iter_chunks(self, context: Mapping[Context[t.Any], t.Any] | None = None) -> Iterator[str]:
+        segments = self._segments
+        if segments[0]:
+            yield segments[0]
+        for value, segment in zip(self._values, segments[1:]):  # noqa: B905
+            yield from iter_chunks_node(value, context)
+            if segment:
+                yield segment
+
+    async def aiter_chunks(
+        self, context: Mapping[Context[t.Any], t.Any] | None = None
+    ) -> AsyncIterator[str]:
+        segments = self._segments
+        if segments[0]:
+            yield segments[0]
+        for value, segment in zip(self._values, segments[1:]):  # noqa: B905
+            async for chunk in aiter_chunks_node(value, context):
+                yield chunk
+            if segment:
+                yield segment
+
+
+class Slot:
+    """A named hole in a Template.
+
+    Slots can be used as child nodes, as attribute values and in f-strings.
+    """
+
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str) -> None:
+        if not name.isidentifier():
+            raise ValueError(f"Slot names must be valid identifiers, got {name!r}")
+        self._name = name
+
+    def __html__(self) -> str:
+        return hole_marker(CHILD, self._name)
+
+    def __str__(self) -> str:
+        return hole_marker(TEXT, self._name)
+
+    def __repr__(self) -> str:
+        return f"<Slot {self._name!r}>"
+
+
+class Template:
+    """A static node with named slots, rendered once.
+
+    Calling render() with values for the slots only interleaves the escaped
+    values with the precomputed HTML.
+
+    flush nodes in the template are kept. The static HTML before a flush node,
+    such as the doctype and the head of a page, is kept in precompressed form
+    to be sent as is in compressed responses.
+    """
+
+    __slots__ = ("_holes", "_names", "_segments")
+
+    def __init__(self, node: Node) -> None:
+        if not is_traceable(node, Slot):
+            raise ValueError(
+                "Templates can only contain elements, fragments, strings, integers and slots"
+            )
+
+        split = split_holes(
+            "".join(
+                hole_marker(FLUSH, "") if isinstance(chunk, FlushChunk) else chunk
+                for chunk in iter_chunks_node(node, None)
+            )
+        )
+        if split is None:
+            raise ValueError("Slots can not be transformed, use them directly in the template")
+
+        segments, holes = split
+        # Slots that are the whole value of an attribute are rendered with the
+        # attribute, which is left out for values such as None, False and "".
+        self._holes: list[tuple[str, str, str]] = []
+        for i, (kind, name) in enumerate(holes):
+            attribute = ""
+            if (
+                kind == TEXT
+                and segments[i + 1].startswith('"')
+                and (match := _ATTRIBUTE_START_RE.search(segments[i]))
+            ):
+                kind = ATTRIBUTE
+                attribute = markupsafe.Markup(match.group(1)).unescape()
+                segments[i] = segments[i][: match.start()]
+                segments[i + 1] = segments[i + 1][1:]
+            self._holes.append((kind, name, attribute))
+
+        self._segments = segments
+        self._names = frozenset(name for kind, name, _ in self._holes if kind != FLUSH)
+        for i, (kind, _, _) in enumerate(self._holes):
+            if kind == FLUSH:
+                self._segments[i] = PrecompressedChunk(self._segments[i])
+
+    def __repr__(self) -> str:
+        return f"<Template {sorted(self._names)!r}>"
+
+    def render(self, **values: t.Any) -> FilledTemplate:
+        if values.keys() != self._names:
+            missing = sorted(self._names - values.keys())
+            unexpected = sorted(values.keys() - self._names)
+            raise TypeError(f"Invalid slot values, missing: {missing}, unexpected: {unexpected}")
+
+        segments: list[str] = []
+        child_values: list[Node] = []
+        current = self._segments[0]
+        for (kind, name, attribute), segment in zip(self._holes, self._segments[1:]):  # noqa: B905
+            if kind == FLUSH:
+                segments.append(current)
+                child_values.append(flush)
+                current = segment
+                continue
+
+            value = values[name]
+            if kind == ATTRIBUTE:
+                current += attrs_string({attribute: value}) + segment
+            elif kind == TEXT:
+                # Escaped the same way as attribute values.
+                if (
+                    value is None
+                    or isinstance(value, bool)
+                    or not isinstance(value, str | int | HasHtml)
+                ):
+                    raise TypeError(
+                        f"Value for slot {name!r} must be a string or an integer, got {value!r}"
+                    )
+                current += str(_force_escape(value)) + segment
+            else:
+                _validate_children(value)
+                segments.append(current)
+                child_values.append(value)
+                current = segment
+        segments.append(current)
+
+        return FilledTemplate(segments, child_values)
@@ -5,15 +5,22 @@ import typing as t
 
 import markupsafe
 
+from htpy._cache import DependencyRecorder
+from htpy._compiled import _uses_arguments_directly  # pyright: ignore[reportPrivateUsage]
+from htpy._memoize import argument_types
+from htpy._render_sync import iter_chunks_node
+from htpy._templates import CHILD, FilledTemplate, hole_marker, is_traceable, split_holes
+
 try:
     from warnings import deprecated  # type: ignore[attr-defined,unused-ignore]
 except ImportError:
     from typing_extensions import deprecated
 
 if t.TYPE_CHECKING:
-    from collections.abc import AsyncIterator, Callable, Iterator, Mapping
+    from collections.abc import AsyncIterator, Callable, Hashable, Iterator, Mapping
 
     import htpy
+    from htpy._cache import Dependencies
 
 
 C = t.TypeVar("C", bound="htpy.Node")
@@ -21,14 +28,96 @@ P = t.ParamSpec("P")
 R = t.TypeVar("R", bound="htpy.Renderable")
 
 
+class _ChildrenHole:
+    __slots__ = ()
+
+    def __html__(self) -> str:
+        return hole_marker(CHILD, "children")
+
+    def __bool__(self) -> bool:
+        # The layout depends on the children, it can not be precompiled.
+        raise TypeError("children used in a boolean context")
+
+
+class _PrecompiledLayout(t.Generic[C, P, R]):
+    """Render the layout once per distinct arguments, around a hole for the children.
+
+    The HTML before and after the children is kept in a LRU cache, with the
+    tags and cache policies recorded by the layout, which are recorded again
+    when the HTML is used.
+    """
+
+    def __init__(self, func: Callable[t.Concatenate[C | None, P], R], maxsize: int | None) -> None:
+        self._func = func
+        self._split = functools.lru_cache(maxsize)(self._split_uncached)
+        functools.update_wrapper(self, func)
+
+    def _split_uncached(
+        self,
+        types: Hashable,
+        args: tuple[t.Any, ...],
+        kwargs: tuple[tuple[str, t.Any], ...],
+    ) -> tuple[markupsafe.Markup, markupsafe.Markup, Dependencies] | None:
+        # The types are only part of the cache key.
+        recorder = DependencyRecorder()
+        try:
+            with recorder.active():
+                node = self._func(_ChildrenHole(), *args, **dict(kwargs))  # type: ignore[arg-type]
+                # Only layouts that render the same every time can be cached.
+                if not is_traceable(node, _ChildrenHole):
+                    return None
+                html = "".join(iter_chunks_node(node, None))
+        except Exception:
+            return None
+
+        split = split_holes(html)
+        if split is None or len(split[1]) != 1:
+            return None
+
+        prefix, suffix = split[0]
+        return markupsafe.Markup(prefix), markupsafe.Markup(suffix), recorder.dependencies
+
+    @functools.cached_property
+    def _precompilable(self) -> bool:
+        # The layout is only rendered once with a placeholder for the
+        # children, which can not detect everything a layout does with them,
+        # such as isinstance() checks. Only layouts that use the children as
+        # children of elements are precompiled.
+        return _uses_arguments_directly(self._func, children_only=True)
+
+    def __call__(self, children: C | None, *args: P.args, **kwargs: P.kwargs) -> R:
+        if children is not None and self._precompilable:
+            try:
+                split = self._split(argument_types(args, kwargs), args, tuple(kwargs.items()))
+            except TypeError:
+                # Unhashable arguments.
+                split = None
+
+            if split is not None:
+                prefix, suffix, dependencies = split
+                dependencies.record()
+                return t.cast("R", FilledTemplate([prefix, suffix], [children]))
+
+        return self._func(children, *args, **kwargs)
+
+
 class _WithChildrenUnbound(t.Generic[C, P, R]):
     wrapped: Callable[t.Concatenate[C | None, P], R]
 
-    def __init__(self, func: Callable[t.Concatenate[C | None, P], R]) -> None:
+    def __init__(
+        self,
+        func: Callable[t.Concatenate[C | None, P], R],
+        *,
+        precompiled: bool = False,
+        maxsize: int | None = 128,
+    ) -> None:
         # This instance is created at import time when decorating the component.
         # It means that this object is global, and shared between all renderings
         # of the same component.
         self.wrapped = func
+        self._render: Callable[t.Concatenate[C | None, P], R] = (
+            _PrecompiledLayout(func, maxsize) if precompiled else func
+        )
 
     def __repr__(self) -> str:
         return f"with_children({self.wrapped.__name__}, <unbound>)"
@@ -43,14 +132,14 @@ class _WithChildrenUnbound(t.Generic[C, P, R]):
         # and kwargs instead of mutating, so that state doesn't leak between
         # multiple renderings of the same component.
         #
-        return _WithChildrenBound(self.wrapped, args, kwargs)
+        return _WithChildrenBound(self._render, args, kwargs)
 
     def __getitem__(self, children: C | None) -> R:
         # This is the unbound component being used with children:
         #
         #     my_component["My content"]
         #
-        return self.wrapped(children)  # type: ignore[call-arg]
+        return self._render(children)  # type: ignore[call-arg]
 
     def __str__(self) -> markupsafe.Markup:
         # This is the unbound component being rendered to a string:
@@ -140,9 +229,27 @@ class _WithChildrenBound(t.Generic[C, P, R]):
         return self._func(None, *self._args, **self._kwargs).aiter_chunks(context)
 
 
+@t.overload
 def with_children(
     func: Callable[t.Concatenate[C | None, P], R],
-) -> _WithChildrenUnbound[C | None, P, R]:
+    /,
+) -> _WithChildrenUnbound[C | None, P, R]: ...
+@t.overload
+def with_children(
+    *,
+    precompiled: bool = False,
+    maxsize: int | None = 128,
+) -> Callable[
+    [Callable[t.Concatenate[C | None, P], R]],
+    _WithChildrenUnbound[C | None, P, R],
+]: ...
+def with_children(
+    func: Callable[t.Concatenate[C | None, P], R] | None = None,
+    /,
+    *,
+    precompiled: bool = False,
+    maxsize: int | None = 128,
+) -> t.Any:
     """Decorator to make a component support children nodes.
 
     This decorator allows you to create components that can accept children nodes
@@ -155,9 +262,22 @@ def with_children(
 
         # Usage:
         my_component(title="Hello")[span["World"]]
+
+    With precompiled=True, the component is rendered once for each distinct set
+    of arguments, and the HTML before and after the children is cached, in a LRU
+    cache of maxsize entries. It only applies to components that render the
+    same HTML each time they are called with the same arguments.
     """
-    wrapper = _WithChildrenUnbound(func)
-    # Ensure the wrapper has the same signature as the original function
-    # This is crucial for LSP to recognize the function arguments
-    functools.update_wrapper(wrapper, func)
-    return wrapper
+
+    def decorator(
+        func: Callable[t.Concatenate[C | None, P], R],
+    ) -> _WithChildrenUnbound[C | None, P, R]:
+        wrapper = _WithChildrenUnbound(func, precompiled=precompiled, maxsize=maxsize)
+        # Ensure the wrapper has the same signature as the original function
+        # This is crucial for LSP to recognize the function arguments
+        functools.update_wrapper(wrapper, func)
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
@@ -0,0 +1,440 @@
+"""Import hook that compiles htpy element expressions at import time.
+
+The children of element expressions such as `div(".card")[h2["Title"], p[text]]`
+in the selected modules are rewritten into code that builds the HTML string
+segments directly. Tags, attributes given as literals and literal children of
+nested elements are rendered when the module is compiled, dynamic expressions
+are rendered as regular children at runtime. The outermost element of an
+expression is created as usual, so that it can be returned and used like any
+other element.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import importlib.abc
+import importlib.machinery
+import importlib.metadata
+import importlib.util
+import marshal
+import sys
+import typing as t
+from pathlib import Path
+
+import markupsafe
+
+import htpy
+from htpy import _attributes, _elements
+from htpy._elements import BaseElement, Element, HTMLElement, VoidElement, _validate_children
+from htpy._templates import FilledTemplate
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from types import CodeType, ModuleType
+
+    from htpy._types import Node
+
+__all__ = ["install", "uninstall"]
+
+# Bump when the generated code changes to invalidate cached bytecode.
+_COMPILER_VERSION = 2
+
+
+def _cache_optimization() -> str:
+    # The compiled code contains HTML rendered by htpy, the cached code must be
+    # recompiled when htpy renders elements and attributes differently.
+    try:
+        version = importlib.metadata.version("htpy")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    digest = hashlib.sha256(version.encode())
+    for module in (_attributes, _elements):
+        digest.update(Path(module.__file__ or "").read_bytes())
+    return f"htpy{_COMPILER_VERSION}x{digest.hexdigest()[:16]}"
+
+
+_CACHE_OPTIMIZATION = _cache_optimization()
+_RUNTIME_NAME = "__htpy_compiler__"
+
+
+def _start_tag(element: BaseElement, /, *args: t.Any, **kwargs: t.Any) -> markupsafe.Markup:
+    result = element(*args, **kwargs)
+    return markupsafe.Markup(f"<{result._name}{result._attrs}>")  # pyright: ignore[reportPrivateUsage]
+
+
+def _child(node: Node) -> Node:
+    _validate_children(node)
+    return node
+
+
+def _build(segments: Sequence[str], values: Sequence[Node]) -> FilledTemplate:
+    # Start tags with dynamic attributes are Markup and can be joined with the
+    # surrounding static segments.
+    if not any(isinstance(value, markupsafe.Markup) for value in values):
+        return FilledTemplate(segments, values)
+
+    new_segments: list[str] = []
+    new_values: list[Node] = []
+    current = segments[0]
+    for value, segment in zip(values, segments[1:]):  # noqa: B905
+        if isinstance(value, markupsafe.Markup):
+            current += str(value) + segment
+        else:
+            new_segments.append(current)
+            new_values.append(value)
+            current = segment
+    new_segments.append(current)
+    return FilledTemplate(new_segments, new_values)
+
+
+def _htpy_element(name: str) -> BaseElement | None:
+    element = getattr(htpy, name, None)
+    if type(element) in (Element, HTMLElement, VoidElement):
+        return t.cast("BaseElement", element)
+    return None
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Segments:
+    def __init__(self) -> None:
+        self.segments: list[str] = [""]
+        self.values: list[ast.expr] = []
+        self.elements = 0
+
+    def add_static(self, html: str) -> None:
+        self.segments[-1] += html
+
+    def add_dynamic(self, value: ast.expr) -> None:
+        self.values.append(value)
+        self.segments.append("")
+
+
+def _runtime_call(name: str, args: list[ast.expr], keywords: list[ast.keyword]) -> ast.Call:
+    return ast.Call(
+        func=ast.Attribute(
+            value=ast.Name(id=_RUNTIME_NAME, ctx=ast.Load()), attr=name, ctx=ast.Load()
+        ),
+        args=args,
+        keywords=keywords,
+    )
+
+
+def _bound_names(tree: ast.AST) -> dict[str, list[ast.AST]]:
+    """Find all nodes that bind each name in the module."""
+    result: dict[str, list[ast.AST]] = {}
+
+    def add(name: str, node: ast.AST) -> None:
+        result.setdefault(name, []).append(node)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            add(node.id, node)
+        elif isinstance(node, ast.arg):
+            add(node.arg, node)
+        elif isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef):
+            add(node.name, node)
+        elif isinstance(node, ast.Import | ast.ImportFrom):
+            for alias in node.names:
+                add((alias.asname or alias.name).split(".")[0], node)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            add(node.name, node)
+        elif isinstance(node, ast.Global | ast.Nonlocal):
+            for name in node.names:
+                add(name, node)
+        elif isinstance(node, ast.MatchAs | ast.MatchStar) and node.name:
+            add(node.name, node)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            add(node.rest, node)
+    return result
+
+
+class _Transformer(ast.NodeTransformer):
+    def __init__(self, tree: ast.Module) -> None:
+        self.changed = False
+        self.elements: dict[str, BaseElement] = {}
+        self.modules: set[str] = set()
+
+        for name, nodes in _bound_names(tree).items():
+            # Only consider names that are never bound to anything else.
+            elements = {
+                self._imported_element(node, name) if isinstance(node, ast.ImportFrom) else None
+                for node in nodes
+            }
+            if len(elements) == 1 and (element := elements.pop()) is not None:
+                self.elements[name] = element
+            elif all(
+                isinstance(node, ast.Import) and self._imports_htpy(node, name) for node in nodes
+            ):
+                self.modules.add(name)
+
+    @staticmethod
+    def _imported_element(node: ast.ImportFrom, name: str) -> BaseElement | None:
+        if node.module != "htpy" or node.level != 0:
+            return None
+        for alias in node.names:
+            if (alias.asname or alias.name) == name:
+                return _htpy_element(alias.name)
+        return None
+
+    @staticmethod
+    def _imports_htpy(node: ast.Import, name: str) -> bool:
+        # Both `import htpy` and `import htpy.starlette` bind the name htpy.
+        return any(
+            (alias.asname or alias.name.split(".")[0]) == name
+            and (alias.name == "htpy" or (alias.asname is None and alias.name.startswith("htpy.")))
+            for alias in node.names
+        )
+
+    def _element(self, node: ast.expr) -> BaseElement | None:
+        if isinstance(node, ast.Name):
+            return self.elements.get(node.id)
+        if (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id in self.modules
+            and not node.attr.startswith("_")
+        ):
+            return _htpy_element(node.attr)
+        return None
+
+    def _element_with_attributes(
+        self, node: ast.expr
+    ) -> tuple[BaseElement, ast.Call | None] | None:
+        if isinstance(node, ast.Call) and (element := self._element(node.func)) is not None:
+            return element, node
+        if (element := self._element(node)) is not None:
+            return element, None
+        return None
+
+    def _is_element_expression(self, node: ast.expr) -> bool:
+        if isinstance(node, ast.Subscript):
+            return self._element_with_attributes(node.value) is not None
+        return self._element_with_attributes(node) is not None
+
+    def _add_element(
+        self,
+        segments: _Segments,
+        element: BaseElement,
+        call: ast.Call | None,
+        children: ast.expr | None,
+    ) -> None:
+        if children is not None and not isinstance(element, Element):
+            # Void elements do not support children, keep the error at runtime.
+            raise _Unsupported
+
+        segments.elements += 1
+        if isinstance(element, HTMLElement):
+            segments.add_static("<!doctype html>")
+
+        name = element._name  # pyright: ignore[reportPrivateUsage]
+        if call is None:
+            segments.add_static(f"<{name}{element._attrs}>")  # pyright: ignore[reportPrivateUsage]
+        else:
+            try:
+                args = [ast.literal_eval(arg) for arg in call.args]
+                kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in call.keywords if kw.arg}
+                if len(kwargs) != len(call.keywords):
+                    raise ValueError("**kwargs")
+                result = element(*args, **kwargs)
+            except Exception:
+                # Dynamic attributes or errors: let the element render the
+                # start tag at runtime.
+                segments.add_dynamic(
+                    _runtime_call(
+                        "_start_tag",
+                        [call.func, *(self.visit(arg) for arg in call.args)],
+                        [
+                            ast.keyword(arg=kw.arg, value=self.visit(kw.value))
+                            for kw in call.keywords
+                        ],
+                    )
+                )
+            else:
+                segments.add_static(f"<{name}{result._attrs}>")  # pyright: ignore[reportPrivateUsage]
+
+        if isinstance(element, Element):
+            if children is not None:
+                self._add_children(segments, children)
+            segments.add_static(f"</{name}>")
+
+    def _add_children(self, segments: _Segments, node: ast.expr) -> None:
+        if isinstance(node, ast.Tuple | ast.List):
+            if any(isinstance(elt, ast.Starred) for elt in node.elts):
+                raise _Unsupported
+            for elt in node.elts:
+                self._add_children(segments, elt)
+
+        elif isinstance(node, ast.Constant) and (
+            node.value is None or isinstance(node.value, bool | str | int)
+        ):
+            if node.value is None or isinstance(node.value, bool):
+                pass
+            elif isinstance(node.value, str):
+                segments.add_static(str(markupsafe.escape(node.value)))
+            else:
+                segments.add_static(str(node.value))
+
+        elif isinstance(node, ast.Subscript) and (
+            element_with_attrs := self._element_with_attributes(node.value)
+        ):
+            self._add_element(segments, *element_with_attrs, node.slice)
+
+        elif element_with_attrs := self._element_with_attributes(node):
+            self._add_element(segments, *element_with_attrs, None)
+
+        else:
+            segments.add_dynamic(_runtime_call("_child", [self.visit(node)], []))
+
+    def _compile_children(self, node: ast.expr) -> ast.expr | None:
+        segments = _Segments()
+        try:
+            self._add_children(segments, node)
+        except _Unsupported:
+            return None
+
+        if not segments.elements:
+            # Nothing to render in advance.
+            return None
+
+        self.changed = True
+        return ast.copy_location(
+            _runtime_call(
+                "_build",
+                [
+                    ast.Tuple(elts=[ast.Constant(s) for s in segments.segments], ctx=ast.Load()),
+                    ast.Tuple(elts=segments.values, ctx=ast.Load()),
+                ],
+                [],
+            ),
+            node,
+        )
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        # The element itself is created as usual, only its children are
+        # compiled. The element can then be returned, stored and changed like
+        # any other element.
+        element_with_attrs = self._element_with_attributes(node.value)
+        if (
+            element_with_attrs is not None
+            and isinstance(element_with_attrs[0], Element)
+            and isinstance(node.ctx, ast.Load)
+            and (children := self._compile_children(node.slice)) is not None
+        ):
+            node.value = self.visit(node.value)
+            node.slice = children
+            return node
+
+        return self.generic_visit(node)
+
+
+def _insert_runtime_import(tree: ast.Module) -> None:
+    index = 0
+    if (
+        tree.body
+        and isinstance(tree.body[0], ast.Expr)
+        and isinstance(tree.body[0].value, ast.Constant)
+    ):
+        index = 1
+    while (
+        index < len(tree.body)
+        and isinstance(tree.body[index], ast.ImportFrom)
+        and tree.body[index].module == "__future__"  # type: ignore[attr-defined]
+    ):
+        index += 1
+
+    tree.body.insert(
+        index,
+        ast.Import(names=[ast.alias(name="htpy.compiler", asname=_RUNTIME_NAME)]),
+    )
+
+
+def _transform(tree: ast.Module) -> ast.Module:
+    """Rewrite htpy element expressions in a parsed module."""
+    transformer = _Transformer(tree)
+    tree = transformer.visit(tree)
+    if transformer.changed:
+        _insert_runtime_import(tree)
+    return ast.fix_missing_locations(tree)
+
+
+class _HtpyLoader(importlib.machinery.SourceFileLoader):
+    def source_to_code(  # type: ignore[override]
+        self, data: bytes, path: str, *, _optimize: int = -1
+    ) -> CodeType:
+        tree = ast.parse(data, filename=path)
+        return compile(_transform(tree), path, "exec", dont_inherit=True, optimize=_optimize)
+
+    def get_code(self, fullname: str) -> CodeType:
+        # Like SourceLoader.get_code, but with the compiled code cached
+        # separately from regular bytecode.
+        source_path = self.get_filename(fullname)
+        bytecode_path = importlib.util.cache_from_source(
+            source_path, optimization=_CACHE_OPTIMIZATION
+        )
+        stats = self.path_stats(source_path)
+        header = (
+            importlib.util.MAGIC_NUMBER
+            + (0).to_bytes(4, "little")
+            + (int(stats["mtime"]) & 0xFFFFFFFF).to_bytes(4, "little")
+            + (int(stats["size"]) & 0xFFFFFFFF).to_bytes(4, "little")
+        )
+
+        try:
+            data = self.get_data(bytecode_path)
+        except OSError:
+            pass
+        else:
+            if data[:16] == header:
+                return marshal.loads(data[16:])  # type: ignore[no-any-return]
+
+        code = self.source_to_code(self.get_data(source_path), source_path)
+        if not sys.dont_write_bytecode:
+            try:
+                self.set_data(bytecode_path, header + marshal.dumps(code))
+            except OSError:
+                pass
+        return code
+
+
+class _HtpyFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, modules: Iterable[str]) -> None:
+        self.modules = tuple(modules)
+
+    def _matches(self, fullname: str) -> bool:
+        return any(
+            fullname == module or fullname.startswith(f"{module}.") for module in self.modules
+        )
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+    ) -> importlib.machinery.ModuleSpec | None:
+        if not self._matches(fullname):
+            return None
+
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path, target)
+        if spec is None or not isinstance(spec.loader, importlib.machinery.SourceFileLoader):
+            return spec
+
+        spec.loader = _HtpyLoader(fullname, spec.loader.path)
+        return spec
+
+
+def install(modules: Iterable[str]) -> None:
+    """Compile htpy element expressions in modules when they are imported.
+
+    modules is a list of module names. Submodules of the modules are also
+    compiled. Modules that are already imported are not affected.
+    """
+    sys.meta_path.insert(0, _HtpyFinder(modules))
+
+
+def uninstall() -> None:
+    """Remove all import hooks added by install()."""
+    sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, _HtpyFinder)]
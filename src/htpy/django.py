@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import hashlib
 import typing as t
 
+from django.core.cache import caches
+from django.http import HttpResponse
 from django.template import Context, TemplateDoesNotExist
+from django.utils.cache import patch_vary_headers
 from django.utils.module_loading import import_string
 
 from . import Element, fragment
+from ._cache_policy import recording_cache_policy
 
 if t.TYPE_CHECKING:
     from collections.abc import Callable
@@ -13,6 +18,8 @@ if t.TYPE_CHECKING:
     from django.core.checks import Error
     from django.http import HttpRequest
 
+    from ._types import Node
+
 
 class _HtpyTemplate:
     def __init__(self, func: Callable[[Context | None, HttpRequest | None], Element]) -> None:
@@ -34,3 +41,67 @@ class HtpyTemplateBackend:
 
     def check(self) -> list[Error]:
         return []
+
+
+class DjangoCacheBackend:
+    """Fragment cache backend that stores entries in a Django cache.
+
+    Use it with htpy.cache():
+
+        cache("sidebar", backend=DjangoCacheBackend("default"))[...]
+    """
+
+    def __init__(self, alias: str = "default") -> None:
+        self.alias = alias
+
+    # Backends of the same cache are equal, so that concurrent renderings of a
+    # fragment share one rendering even if each creates its own backend.
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, DjangoCacheBackend) and other.alias == self.alias
+
+    def __hash__(self) -> int:
+        return hash((DjangoCacheBackend, self.alias))
+
+    def _key(self, key: str) -> str:
+        # Hash keys to make them safe for all cache backends, such as memcached.
+        return f"htpy:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def get(self, key: str) -> bytes | None:
+        return t.cast("bytes | None", caches[self.alias].get(self._key(key)))
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]:
+        hashed = [self._key(key) for key in keys]
+        values = caches[self.alias].get_many(hashed)
+        return [values.get(key) for key in hashed]
+
+    def set(self, key: str, value: bytes, ttl: float | None) -> None:
+        caches[self.alias].set(self._key(key), value, timeout=ttl)
+
+
+class HtpyResponse(HttpResponse):
+    """Render a node as the content of a response.
+
+    The Cache-Control and Vary headers are set from the cache policies
+    declared by the components while rendering, unless cache_control is given
+    or the Cache-Control header is set in headers.
+    """
+
+    def __init__(
+        self,
+        node: Node,
+        *,
+        cache_control: str | None = None,
+        content_type: str = "text/html; charset=utf-8",
+        **kwargs: t.Any,
+    ) -> None:
+        with recording_cache_policy() as recorder:
+            content = str(fragment[node])
+        super().__init__(content, content_type=content_type, **kwargs)
+
+        policy = recorder.policy
+        if cache_control is None:
+            cache_control = policy.cache_control
+        if cache_control is not None and not self.has_header("Cache-Control"):
+            self["Cache-Control"] = cache_control
+        if policy.vary:
+            patch_vary_headers(self, policy.vary)
@@ -1,18 +1,160 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
+import re
+import tempfile
 import typing as t
 
-from starlette.responses import StreamingResponse
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
+from starlette.responses import Response
 
+from ._cache_policy import merge_vary, recording_cache_policy
+from ._compression import negotiate_encoding, new_compressor
+from ._fingerprint import fingerprint
+from ._flush import FLUSH_AT_AWAIT, FlushChunk
 from ._fragments import fragment
+from ._render_sync import new_render_context
 
 if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterable, AsyncIterator, Awaitable
+
     from starlette.background import BackgroundTask
+    from starlette.types import Receive, Scope, Send
 
+    from ._cache_policy import CachePolicy
+    from ._compression import Encoding
     from ._types import Node
 
 
-class HtpyResponse(StreamingResponse):
+def _quote_etag(etag: str) -> str:
+    if etag.startswith(('"', 'W/"')):
+        return etag
+    return f'"{etag}"'
+
+
+def _encoded_etag(etag: str, encoding: Encoding) -> str:
+    # Each content-coding is a different representation, with its own ETag.
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison.
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+class _BodyEncoder:
+    """Encode chunks, coalesced into bodies of about send_size bytes.
+
+    Chunks are either collected as str and encoded together, or compressed as
+    they arrive.
+    """
+
+    def __init__(self, charset: str, encoding: Encoding | None, send_size: int) -> None:
+        self.charset = charset
+        self.compressor = new_compressor(encoding) if encoding is not None else None
+        self.send_size = send_size
+        self.size = 0
+        self._parts: list[str] = []
+        self._compressed: list[bytes] = []
+
+    def _take(self) -> bytes:
+        if self.compressor is not None:
+            body = b"".join(self._compressed)
+            self._compressed.clear()
+        else:
+            body = "".join(self._parts).encode(self.charset)
+            self._parts.clear()
+        self.size = 0
+        return body
+
+    def add(self, chunk: str) -> bytes | None:
+        """Add a chunk, return a body to send if there is enough to send."""
+        if self.compressor is not None:
+            if data := self.compressor.compress(chunk):
+                self._compressed.append(data)
+                self.size += len(data)
+        else:
+            self._parts.append(chunk)
+            self.size += len(chunk)
+
+        if self.size >= self.send_size or (self.size and isinstance(chunk, FlushChunk)):
+            return self._take()
+        return None
+
+    def finish(self) -> bytes:
+        if self.compressor is not None:
+            self._compressed.append(self.compressor.finish())
+        return self._take()
+
+
+async def _listen_for_disconnect(receive: Receive) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _run_until_disconnect(scope: Scope, receive: Receive, response: Awaitable[None]) -> None:
+    spec_version = tuple(map(int, scope.get("asgi", {}).get("spec_version", "2.0").split(".")))
+    if spec_version >= (2, 4):
+        # send() raises OSError when the client has disconnected.
+        try:
+            await response
+        except OSError:
+            raise ClientDisconnect() from None
+        return
+
+    response_task = asyncio.ensure_future(response)
+    listener = asyncio.ensure_future(_listen_for_disconnect(receive))
+    try:
+        await asyncio.wait((response_task, listener), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (response_task, listener):
+            task.cancel()
+        await asyncio.gather(response_task, listener, return_exceptions=True)
+    if not response_task.cancelled() and (exc := response_task.exception()) is not None:
+        raise exc
+
+
+class HtpyResponse(Response):
+    """Stream a node as HTML.
+
+    The chunks are coalesced into messages of about send_size bytes. Output
+    rendered so far is also sent before the rendering waits for awaitables and
+    async iterables, and at flush nodes. The node is not rendered for HEAD
+    requests, and rendering stops when the client disconnects.
+
+    With etag, the response has an ETag header and requests with a matching
+    If-None-Match header get a 304 Not Modified response, without rendering
+    the node. Pass the ETag as a string, or True to use the fingerprint() of
+    the node.
+
+    With buffer=True, the whole node is rendered before the response is sent,
+    with a Content-Length header. Output larger than buffer_size bytes is kept
+    in a temporary file. The Cache-Control and Vary headers are then set from
+    the cache policies declared by the components, unless cache_control is
+    given.
+
+    With buffer="auto", the output is buffered and sent in a single message
+    with a Content-Length header if the node is rendered without waiting for
+    awaitables or async iterables, and its output is at most buffer_size
+    bytes. Otherwise the response is streamed.
+
+    With compress=True, the response is compressed with zstd (on Python
+    3.14+), gzip or deflate, as accepted by the client. Streamed output is
+    flushed to the client before waiting for awaitables and at flush nodes.
+    Precompressed chunks, from cache(precompress=True) and the static cache,
+    are sent without compressing them again. The content-coding is appended
+    to the ETag of compressed responses, such as "v1-gzip".
+    """
+
     def __init__(
         self,
         node: Node,
@@ -20,11 +162,304 @@ class HtpyResponse(StreamingResponse):
         headers: t.Mapping[str, str] | None = None,
         media_type: str | None = "text/html",
         background: BackgroundTask | None = None,
+        *,
+        etag: str | bool | None = None,
+        cache_control: str | None = None,
+        buffer: bool | t.Literal["auto"] = False,
+        buffer_size: int = 64 * 1024,
+        compress: bool = False,
+        send_size: int = 16 * 1024,
+    ) -> None:
+        self.node = fragment[node]
+        self.buffer = buffer
+        self.buffer_size = buffer_size
+        self.compress = compress
+        self.send_size = send_size
+        if etag is True:
+            etag = fingerprint(node)
+        self.etag = _quote_etag(etag) if isinstance(etag, str) else None
+
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.init_headers(headers)
+        if self.etag is not None:
+            self.headers["etag"] = self.etag
+        if cache_control is not None:
+            self.headers["cache-control"] = cache_control
+        if compress:
+            self._add_vary(["Accept-Encoding"])
+
+    def _not_modified(self, scope: Scope) -> bool:
+        etag = self.headers.get("etag")
+        if etag is None or self.status_code != 200:
+            return False
+        if scope.get("method") not in ("GET", "HEAD"):
+            return False
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        return if_none_match is not None and _etag_matches(if_none_match, etag)
+
+    def _apply_cache_policy(self, policy: CachePolicy) -> None:
+        if "cache-control" not in self.headers and policy.cache_control is not None:
+            self.headers["cache-control"] = policy.cache_control
+        self._add_vary(policy.vary)
+
+    def _add_vary(self, names: t.Iterable[str]) -> None:
+        if names:
+            vary = [v.strip() for v in self.headers.get("vary", "").split(",") if v.strip()]
+            self.headers["vary"] = ", ".join(merge_vary(vary, names))
+
+    def _content_encoding(self, scope: Scope) -> Encoding | None:
+        if not self.compress or "content-encoding" in self.headers:
+            return None
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is not None and self.etag is not None:
+            self.headers["etag"] = _encoded_etag(self.etag, encoding)
+        return encoding
+
+    async def _start(self, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+
+    async def _send_body(self, send: Send, body: bytes, *, more_body: bool) -> None:
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _stream(
+        self,
+        send: Send,
+        chunks: AsyncIterator[str],
+        encoder: _BodyEncoder,
+    ) -> None:
+        async for chunk in chunks:
+            if (body := encoder.add(chunk)) is not None:
+                await self._send_body(send, body, more_body=True)
+        await self._send_body(send, encoder.finish(), more_body=False)
+
+    async def _send_streaming(self, send: Send, encoding: Encoding | None) -> None:
+        await self._start(send)
+        context = {**new_render_context(), FLUSH_AT_AWAIT: True}
+        chunks = self.node.aiter_chunks(context)
+        try:
+            await self._stream(send, chunks, _BodyEncoder(self.charset, encoding, self.send_size))
+        finally:
+            await chunks.aclose()  # type: ignore[attr-defined]
+
+    async def _send_buffered(self, send: Send, encoding: Encoding | None) -> None:
+        # Output larger than buffer_size is kept in a temporary file.
+        encoder = _BodyEncoder(self.charset, encoding, self.send_size)
+        with tempfile.SpooledTemporaryFile(max_size=self.buffer_size) as file:
+            with recording_cache_policy() as recorder:
+                async for chunk in self.node.aiter_chunks():
+                    if (body := encoder.add(chunk)) is not None:
+                        file.write(body)
+                file.write(encoder.finish())
+            self._apply_cache_policy(recorder.policy)
+
+            length = file.tell()
+            self.headers["content-length"] = str(length)
+            await self._start(send)
+            file.seek(0)
+            while True:
+                body = file.read(self.send_size)
+                more_body = file.tell() < length
+                await self._send_body(send, body, more_body=more_body)
+                if not more_body:
+                    break
+
+    async def _send_auto(self, send: Send, encoding: Encoding | None) -> None:
+        # Buffer the output until the rendering has to wait, or the output is
+        # larger than buffer_size. Then stream the rest.
+        encoder = _BodyEncoder(self.charset, encoding, self.send_size)
+        bodies: list[bytes] = []
+        size = 0
+        context = {**new_render_context(), FLUSH_AT_AWAIT: True}
+        chunks = self.node.aiter_chunks(context)
+        try:
+            with recording_cache_policy() as recorder:
+                async for chunk in chunks:
+                    if (body := encoder.add(chunk)) is not None:
+                        bodies.append(body)
+                        size += len(body)
+                    if isinstance(chunk, FlushChunk) or size + encoder.size > self.buffer_size:
+                        await self._start(send)
+                        for body in bodies:
+                            await self._send_body(send, body, more_body=True)
+                        await self._stream(send, chunks, encoder)
+                        return
+
+            bodies.append(encoder.finish())
+            content = b"".join(bodies)
+            self._apply_cache_policy(recorder.policy)
+            self.headers["content-length"] = str(len(content))
+            await self._start(send)
+            await self._send_body(send, content, more_body=False)
+        finally:
+            await chunks.aclose()  # type: ignore[attr-defined]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = self._content_encoding(scope)
+        if self._not_modified(scope):
+            headers = {
+                key: value
+                for key, value in self.headers.items()
+                if key not in ("content-type", "content-length")
+            }
+            response = Response(status_code=304, headers=headers, background=self.background)
+            await response(scope, receive, send)
+            return
+
+        if encoding is not None:
+            self.headers["content-encoding"] = encoding
+        if scope.get("method") == "HEAD":
+            await self._start(send)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif self.buffer == "auto":
+            await _run_until_disconnect(scope, receive, self._send_auto(send, encoding))
+        elif self.buffer:
+            await _run_until_disconnect(scope, receive, self._send_buffered(send, encoding))
+        else:
+            await _run_until_disconnect(scope, receive, self._send_streaming(send, encoding))
+
+        if self.background is not None:
+            await self.background()
+
+
+_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+
+def _check_field(name: str, value: str) -> str:
+    if _LINE_BREAK_RE.search(value) or "\0" in value:
+        raise ValueError(f"SSE {name} can not contain line breaks or null characters: {value!r}")
+    return value
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ServerSentEvent:
+    """A node sent as an event by HtpySSEResponse, with the event fields."""
+
+    node: Node
+    event: str | None = None
+    id: str | None = None
+    retry: int | None = None
+
+
+async def _render_event(item: Node | ServerSentEvent) -> str:
+    event = item if isinstance(item, ServerSentEvent) else ServerSentEvent(item)
+    html = "".join([chunk async for chunk in fragment[event.node].aiter_chunks()])
+
+    lines: list[str] = []
+    if event.event is not None:
+        lines.append(f"event: {_check_field('event', event.event)}\n")
+    if event.id is not None:
+        lines.append(f"id: {_check_field('id', event.id)}\n")
+    if event.retry is not None:
+        lines.append(f"retry: {event.retry}\n")
+    # Line breaks separate fields, so each line of the HTML is sent as a data
+    # field. The client joins them with "\n".
+    lines.extend(f"data: {line}\n" for line in _LINE_BREAK_RE.split(html))
+    lines.append("\n")
+    return "".join(lines)
+
+
+class HtpySSEResponse(Response):
+    """Stream nodes from an async iterable as server-sent events.
+
+    Each node is rendered and sent as the data of an event. Yield
+    ServerSentEvent to set the event type, id or retry time of an event.
+
+    Events that are ready at the same time, or within coalesce seconds, are
+    sent together in messages of up to about send_size bytes. A comment is
+    sent as a keepalive ping after ping seconds without events. With retry,
+    the reconnection time in milliseconds is sent to the client first.
+    Rendering stops when the client disconnects.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        events: AsyncIterable[Node | ServerSentEvent],
+        status_code: int = 200,
+        headers: t.Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+        *,
+        retry: int | None = None,
+        ping: float | None = 15,
+        coalesce: float = 0,
+        send_size: int = 16 * 1024,
     ) -> None:
-        super().__init__(
-            content=fragment[node].aiter_chunks(),
-            status_code=status_code,
-            headers=headers,
-            media_type=media_type,
-            background=background,
+        self.events = events
+        self.retry = retry
+        self.ping = ping
+        self.coalesce = coalesce
+        self.send_size = send_size
+
+        self.status_code = status_code
+        self.background = background
+        self.init_headers(headers)
+        self.headers.setdefault("cache-control", "no-cache")
+        # Ask nginx to not buffer the events.
+        self.headers.setdefault("x-accel-buffering", "no")
+
+    async def _send_body(self, send: Send, body: str) -> None:
+        await send(
+            {"type": "http.response.body", "body": body.encode(self.charset), "more_body": True}
         )
+
+    async def _stream(self, send: Send) -> None:
+        loop = asyncio.get_running_loop()
+        iterator = aiter(self.events)
+        pending = asyncio.ensure_future(anext(iterator))
+        try:
+            if self.retry is not None:
+                await self._send_body(send, f"retry: {self.retry}\n\n")
+
+            while True:
+                done, _ = await asyncio.wait((pending,), timeout=self.ping)
+                if not done:
+                    await self._send_body(send, ": ping\n\n")
+                    continue
+
+                # Collect the events that are ready within the coalesce time.
+                frames: list[str] = []
+                size = 0
+                deadline = loop.time() + self.coalesce
+                while done and size < self.send_size:
+                    try:
+                        item = pending.result()
+                    except StopAsyncIteration:
+                        if frames:
+                            await self._send_body(send, "".join(frames))
+                        return
+                    frame = await _render_event(item)
+                    frames.append(frame)
+                    size += len(frame)
+                    pending = asyncio.ensure_future(anext(iterator))
+                    timeout = max(deadline - loop.time(), 0)
+                    done, _ = await asyncio.wait((pending,), timeout=timeout)
+                await self._send_body(send, "".join(frames))
+        finally:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    async def _start(self, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+
+    async def _send_events(self, send: Send) -> None:
+        await self._start(send)
+        await self._stream(send)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope.get("method") == "HEAD":
+            await self._start(send)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await _run_until_disconnect(scope, receive, self._send_events(send))
+        if self.background is not None:
+            await self.background()
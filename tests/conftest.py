@@ -7,6 +7,7 @@ import typing as t
 import pytest
 
 import htpy as h
+from htpy._cache import default_backend
 
 if t.TYPE_CHECKING:
     from collections.abc import Callable, Generator
@@ -36,6 +37,12 @@ def django_env() -> None:
     django.setup()
 
 
+@pytest.fixture
+def clear_default_backend() -> None:
+    assert isinstance(default_backend, h.LRUCacheBackend)
+    default_backend.clear()
+
+
 @pytest.fixture
 def render_result() -> RenderResult:
     return []
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import time
+import typing as t
+
+import pytest
+
+import htpy as h
+from htpy._cache import decode_entry, encode_entry
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from .conftest import RenderFixture
+
+
+pytestmark = pytest.mark.usefixtures("clear_default_backend")
+
+
+@pytest.fixture(params=["lru", "file"])
+def backend(request: pytest.FixtureRequest, tmp_path: Path) -> h.CacheBackend:
+    if request.param == "lru":
+        return h.LRUCacheBackend()
+    return h.FileCacheBackend(tmp_path / "cache")
+
+
+def test_miss_and_hit(render: RenderFixture, backend: h.CacheBackend) -> None:
+    calls: list[str] = []
+
+    def expensive() -> h.Element:
+        calls.append("called")
+        return h.ul[h.li["<a>"], h.li["b"]]
+
+    assert str(h.cache("list", backend=backend)[h.div[expensive]]) == (
+        "<div><ul><li>&lt;a&gt;</li><li>b</li></ul></div>"
+    )
+    assert render(h.cache("list", backend=backend)[h.div[expensive]]) == [
+        "<div><ul><li>&lt;a&gt;</li><li>b</li></ul></div>"
+    ]
+    assert calls == ["called"]
+
+
+def test_miss_renders_chunks(render: RenderFixture, backend: h.CacheBackend) -> None:
+    assert render(h.cache("key", backend=backend)[h.div["a", lambda: "b"]]) == [
+        "<div>",
+        "a",
+        "b",
+        "</div>",
+    ]
+    assert backend.get("key") is not None
+
+
+def test_ttl(monkeypatch: pytest.MonkeyPatch, backend: h.CacheBackend) -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    str(h.cache("key", ttl=10, backend=backend)["first"])
+    now += 5
+    assert str(h.cache("key", ttl=10, backend=backend)["second"]) == "first"
+    now += 6
+    assert str(h.cache("key", ttl=10, backend=backend)["third"]) == "third"
+
+
+def test_no_ttl(backend: h.CacheBackend) -> None:
+    str(h.cache("key", ttl=None, backend=backend)["first"])
+    assert str(h.cache("key", ttl=None, backend=backend)["second"]) == "first"
+
+
+def test_default_backend() -> None:
+    str(h.cache("key")["first"])
+    assert str(h.cache("key")["second"]) == "first"
+    assert str(h.cache("other")["third"]) == "third"
+
+
+def test_generator_not_consumed_on_hit() -> None:
+    str(h.cache("key")["cached"])
+
+    def gen() -> Iterator[str]:
+        raise AssertionError("must not be called")
+        yield ""
+
+    assert str(h.cache("key")[gen()]) == "cached"
+
+
+def test_async(render_async: RenderFixture) -> None:
+    calls: list[str] = []
+
+    async def child() -> str:
+        calls.append("called")
+        return "async"
+
+    assert render_async(
+        h.fragment[
+            h.cache("key")[h.p[lambda: child()]],
+            h.cache("key")[h.p[lambda: child()]],
+        ]
+    ) == ["<p>", "async", "</p>", "<p>async</p>"]
+    assert calls == ["called"]
+
+
+def test_error_not_cached() -> None:
+    def fail() -> str:
+        raise ValueError("error")
+
+    with pytest.raises(ValueError, match="error"):
+        str(h.cache("key")[h.div[fail]])
+
+    assert str(h.cache("key")["ok"]) == "ok"
+
+
+def test_partial_rendering_not_cached() -> None:
+    chunks = h.cache("key")[h.div["a", "b"]].iter_chunks()
+    next(chunks)
+    t.cast("t.Generator[str, None, None]", chunks).close()
+
+    assert str(h.cache("key")["ok"]) == "ok"
+
+
+def test_empty() -> None:
+    assert list(h.cache("key")[None].iter_chunks()) == []
+    assert list(h.cache("key")["not rendered"].iter_chunks()) == []
+
+
+def test_invalid_child() -> None:
+    with pytest.raises(TypeError, match="is not a valid child element"):
+        h.cache("key")[b"bytes"]
+
+
+def test_invalid_entry(backend: h.CacheBackend) -> None:
+    backend.set("key", b"invalid", None)
+    assert str(h.cache("key", backend=backend)["rendered"]) == "rendered"
+
+
+def test_entry_encoding() -> None:
+    data = encode_entry("<p>å</p>\n", {"a": 1})
+    assert decode_entry(data) == ({"a": 1}, "<p>å</p>\n")
+
+
+def test_lru_backend_maxsize() -> None:
+    backend = h.LRUCacheBackend(maxsize=1)
+    backend.set("a", b"a", None)
+    backend.set("b", b"b", None)
+    assert backend.get("a") is None
+    assert backend.get("b") == b"b"
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import htpy as h
+from htpy._cache_policy import recording_cache_policy
+from htpy._templates import FilledTemplate
+
+if t.TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+pytestmark = pytest.mark.usefixtures("clear_default_backend")
+
+
+def declaring(text: str, **policy: t.Any) -> Callable[[], h.Node]:
+    def component() -> h.Node:
+        h.cache_policy(**policy)
+        return h.li[text]
+
+    return component
+
+
+def render_policy(node: h.Node) -> h.CachePolicy:
+    with recording_cache_policy() as recorder:
+        str(h.fragment[node])
+    return recorder.policy
+
+
+@pytest.mark.parametrize(
+    ("policies", "cache_control"),
+    [
+        ([], None),
+        ([{"max_age": 60}], "max-age=60"),
+        ([{"max_age": 60}, {"max_age": 10}, {}], "max-age=10"),
+        ([{"max_age": 0}, {"max_age": 10}], "max-age=0"),
+        ([{"max_age": 60}, {"private": True}], "private, max-age=60"),
+        ([{"private": True}], "private"),
+        ([{"max_age": 60}, {"no_store": True}], "no-store"),
+    ],
+)
+def test_merge(policies: list[dict[str, t.Any]], cache_control: str | None) -> None:
+    policy = h.CachePolicy()
+    for kwargs in policies:
+        policy = policy.merge(h.CachePolicy(**kwargs))
+    assert policy.cache_control == cache_control
+
+
+def test_merge_vary() -> None:
+    policy = h.CachePolicy(vary=("Cookie",)).merge(h.CachePolicy(vary=("Accept", "Cookie")))
+    assert policy.vary == ("Cookie", "Accept")
+
+
+def test_recorded_while_rendering() -> None:
+    policy = render_policy(
+        h.ul[
+            declaring("a", max_age=60, vary=["Cookie"]),
+            declaring("b", max_age=30, private=True),
+        ]
+    )
+    assert policy == h.CachePolicy(max_age=30, private=True, vary=("Cookie",))
+
+
+def test_outside_recording() -> None:
+    assert str(h.div[declaring("a", max_age=60)]) == "<div><li>a</li></div>"
+
+
+def test_nested_recording() -> None:
+    def inner() -> h.Node:
+        with recording_cache_policy() as recorder:
+            str(declaring("inner", max_age=10)())
+        assert recorder.policy.max_age == 10
+        return "x"
+
+    assert render_policy([declaring("outer", max_age=60), inner]).max_age == 10
+
+
+def test_cached_fragment() -> None:
+    def page() -> h.Node:
+        return h.cache("fragment")[declaring("a", max_age=60, private=True)]
+
+    assert render_policy(page()) == h.CachePolicy(max_age=60, private=True)
+    # The policy is stored with the cached HTML.
+    assert render_policy(page()) == h.CachePolicy(max_age=60, private=True)
+
+
+def test_parallel() -> None:
+    policy = render_policy(h.parallel[declaring("a", max_age=60), declaring("b", max_age=10)])
+    assert policy.max_age == 10
+
+
+def test_parallel_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    merge = h.CachePolicy.merge
+
+    def slow_merge(self: h.CachePolicy, other: h.CachePolicy) -> h.CachePolicy:
+        # Give other threads the chance to merge at the same time.
+        time.sleep(0.001)
+        return merge(self, other)
+
+    monkeypatch.setattr(h.CachePolicy, "merge", slow_merge)
+    headers = [f"X-Header-{i}" for i in range(20)]
+    with ThreadPoolExecutor(max_workers=len(headers)) as executor:
+        policy = render_policy(
+            h.parallel(executor=executor)[[declaring(name, vary=[name]) for name in headers]]
+        )
+    assert sorted(policy.vary) == sorted(headers)
+
+
+def test_async() -> None:
+    async def component() -> h.Node:
+        h.cache_policy(max_age=5)
+        return "a"
+
+    async def render() -> h.CachePolicy:
+        with recording_cache_policy() as recorder:
+            [chunk async for chunk in h.div[component].aiter_chunks()]
+        return recorder.policy
+
+    assert asyncio.run(render()).max_age == 5
+
+
+def test_components_must_be_called_while_rendering() -> None:
+    def user_menu(user: str) -> h.Element:
+        h.cache_policy(max_age=60, private=True)
+        return h.nav[user]
+
+    # Called while rendering.
+    assert render_policy(h.div[lambda: user_menu("a")]) == h.CachePolicy(max_age=60, private=True)
+    # Called before rendering, the policy is not recorded.
+    node = h.div[user_menu("a")]
+    assert render_policy(node) == h.CachePolicy()
+
+
+def test_compiled() -> None:
+    @h.compiled
+    def badge(label: str) -> h.Element:
+        h.cache_policy(max_age=60)
+        return h.span[label]
+
+    assert render_policy(lambda: badge("a")).max_age == 60
+    # Filled from the trace, without calling the component.
+    assert isinstance(badge("b"), FilledTemplate)
+    assert render_policy(lambda: badge("b")).max_age == 60
+
+
+def test_precompiled_layout() -> None:
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node, title: str) -> h.Element:
+        h.cache_policy(max_age=60)
+        return h.main[h.h1[title], children]
+
+    assert render_policy(lambda: layout("title")["a"]).max_age == 60
+    assert isinstance(layout("title")["b"], FilledTemplate)
+    assert render_policy(lambda: layout("title")["b"]).max_age == 60
+
+
+def test_render_once_per_args() -> None:
+    @h.render_once_per_args
+    def icon(name: str) -> h.Element:
+        h.cache_policy(max_age=60)
+        return h.i[name]
+
+    def page() -> h.Node:
+        return [icon("a"), h.cache("icons")[icon("a")]]
+
+    assert render_policy(page()).max_age == 60
+    # The second use of the icon, in the cached fragment, recorded the policy.
+    assert render_policy(h.cache("icons")["not cached"]) == h.CachePolicy(max_age=60)
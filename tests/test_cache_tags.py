@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import typing as t
+
+import pytest
+
+import htpy as h
+
+if t.TYPE_CHECKING:
+    from pathlib import Path
+
+    from .conftest import RenderFixture
+
+
+pytestmark = pytest.mark.usefixtures("clear_default_backend")
+
+
+@pytest.fixture(params=["lru", "file"])
+def backend(request: pytest.FixtureRequest, tmp_path: Path) -> h.CacheBackend:
+    if request.param == "lru":
+        return h.LRUCacheBackend()
+    return h.FileCacheBackend(tmp_path / "cache")
+
+
+def product(product_id: int, name: str) -> h.Element:
+    h.depends_on(f"product:{product_id}")
+    return h.li[name]
+
+
+def test_invalidate(render: RenderFixture, backend: h.CacheBackend) -> None:
+    str(h.cache("product", backend=backend)[lambda: product(1, "first")])
+    assert str(h.cache("product", backend=backend)[lambda: product(1, "second")]) == (
+        "<li>first</li>"
+    )
+
+    h.invalidate_tags(["product:1"], backend=backend)
+    assert render(h.cache("product", backend=backend)[lambda: product(1, "third")]) == [
+        "<li>",
+        "third",
+        "</li>",
+    ]
+    assert str(h.cache("product", backend=backend)[lambda: product(1, "fourth")]) == (
+        "<li>third</li>"
+    )
+
+
+def test_invalidate_other_tag(backend: h.CacheBackend) -> None:
+    str(h.cache("product", backend=backend)[lambda: product(1, "first")])
+    h.invalidate_tags(["product:2"], backend=backend)
+    assert str(h.cache("product", backend=backend)[lambda: product(1, "second")]) == (
+        "<li>first</li>"
+    )
+
+
+def test_default_backend() -> None:
+    str(h.cache("product")[lambda: product(1, "first")])
+    h.invalidate_tags(["product:1"])
+    assert str(h.cache("product")[lambda: product(1, "second")]) == "<li>second</li>"
+
+
+def test_nested_tags() -> None:
+    def products(names: list[str]) -> h.Element:
+        return h.ul[
+            (
+                h.cache(f"product:{i}")[functools.partial(product, i, name)]
+                for i, name in enumerate(names)
+            )
+        ]
+
+    def page(names: list[str]) -> h.CachedFragment:
+        return h.cache("list")[h.div[lambda: products(names)]]
+
+    str(page(["a", "b"]))
+    h.invalidate_tags(["product:1"])
+    # The outer fragment and the fragment of product 1 are rendered again.
+    assert str(page(["c", "d"])) == "<div><ul><li>a</li><li>d</li></ul></div>"
+    assert str(page(["e", "f"])) == "<div><ul><li>a</li><li>d</li></ul></div>"
+
+
+def test_tags_of_cached_fragment_recorded_in_outer_fragment() -> None:
+    str(h.cache("inner")[lambda: product(1, "inner")])
+
+    # The inner fragment is cached when the outer fragment is first rendered.
+    assert str(h.cache("outer")[h.div[h.cache("inner")[lambda: product(1, "x")]]]) == (
+        "<div><li>inner</li></div>"
+    )
+    h.invalidate_tags(["product:1"])
+    assert str(h.cache("outer")[h.div[h.cache("inner")[lambda: product(1, "new")]]]) == (
+        "<div><li>new</li></div>"
+    )
+
+
+def test_tags_not_recorded_in_other_fragments() -> None:
+    def page() -> h.Element:
+        return h.div[h.cache("a")[lambda: product(1, "a")], h.cache("b")["b"]]
+
+    str(page())
+    h.invalidate_tags(["product:1"])
+    assert str(h.cache("b")["new"]) == "b"
+
+
+def test_depends_on_outside_cache() -> None:
+    assert str(h.div[lambda: product(1, "a")]) == "<div><li>a</li></div>"
+
+
+def test_no_tags_stored_without_depends_on(backend: h.CacheBackend) -> None:
+    str(h.cache("key", backend=backend)["value"])
+    data = backend.get("key")
+    assert data is not None
+    assert data.startswith(b"{}\n")
+
+
+def test_async(backend: h.CacheBackend) -> None:
+    async def async_product(name: str) -> h.Element:
+        h.depends_on("product:1")
+        return h.li[name]
+
+    async def render(name: str) -> str:
+        fragment = h.cache("product", backend=backend)[h.div[lambda: async_product(name)]]
+        return "".join([chunk async for chunk in fragment.aiter_chunks()])
+
+    assert asyncio.run(render("first")) == "<div><li>first</li></div>"
+    assert asyncio.run(render("second")) == "<div><li>first</li></div>"
+    h.invalidate_tags(["product:1"], backend=backend)
+    assert asyncio.run(render("third")) == "<div><li>third</li></div>"
+
+
+class CountingBackend(h.LRUCacheBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[tuple[str, list[str]]] = []
+
+    def get(self, key: str) -> bytes | None:
+        self.calls.append(("get", [key]))
+        return super().get(key)
+
+    def get_many(self, keys: list[str]) -> list[bytes | None]:
+        self.calls.append(("get_many", keys))
+        return [super(CountingBackend, self).get(key) for key in keys]
+
+
+def test_tag_versions_read_at_once() -> None:
+    backend = CountingBackend()
+
+    def products() -> h.Node:
+        h.depends_on("product:1", "product:2", "product:3")
+        return "products"
+
+    str(h.cache("products", backend=backend)[products])
+    backend.calls.clear()
+    assert str(h.cache("products", backend=backend)[products]) == "products"
+    assert backend.calls == [
+        ("get", ["products"]),
+        ("get_many", ["htpy-tag:product:1", "htpy-tag:product:2", "htpy-tag:product:3"]),
+    ]
+
+
+def test_tag_versions_not_evicted_by_entries() -> None:
+    backend = h.LRUCacheBackend(maxsize=2)
+    calls: list[int] = []
+
+    def fragment(product_id: int) -> h.CachedFragment:
+        def render() -> h.Element:
+            calls.append(product_id)
+            return product(product_id, str(product_id))
+
+        return h.cache(f"product:{product_id}", backend=backend)[render]
+
+    for _ in range(3):
+        assert str(h.div[fragment(1), fragment(2)]) == "<div><li>1</li><li>2</li></div>"
+    assert calls == [1, 2]
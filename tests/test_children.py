@@ -6,7 +6,7 @@ import decimal
 import pathlib
 import re
 import typing as t
-from collections.abc import Iterator
+from collections.abc import Generator, Iterator
 
 import pytest
 from markupsafe import Markup
@@ -158,6 +158,34 @@ def test_raise_error_consume_generator_twice() -> None:
         list(fragment_.iter_chunks())
 
 
+def test_started_generator_renders_remaining_items() -> None:
+    def gen() -> Iterator[str]:
+        yield "a"
+        yield "b"
+
+    started_gen = gen()
+    next(started_gen)
+
+    assert str(div[started_gen]) == "<div>b</div>"
+
+
+def test_raise_error_consume_non_native_generator_twice() -> None:
+    class CustomGenerator(Generator[str, None, None]):
+        def __init__(self) -> None:
+            self.items = iter("ab")
+
+        def send(self, value: None) -> str:
+            return next(self.items)
+
+        def throw(self, *args: t.Any) -> t.NoReturn:
+            raise StopIteration
+
+    element = div[CustomGenerator()]
+    assert str(element) == "<div>ab</div>"
+    with pytest.raises(RuntimeError, match="Generator has already been consumed"):
+        str(element)
+
+
 def test_non_generator_iterator(render: RenderFixture, trace: TraceFixture) -> None:
     result = div[SingleShotIterator("hello", trace=trace)]
 
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import typing as t
+
+import markupsafe
+import pytest
+
+import htpy as h
+from htpy._templates import FilledTemplate
+
+if t.TYPE_CHECKING:
+    from .conftest import RenderFixture
+
+
+@h.compiled
+def product_row(name: str, price: int, *, url: str = "/") -> h.Element:
+    return h.tr[h.td[h.a(href=url)[name]], h.td(".price", data_price=price)[f"{price} SEK"]]
+
+
+def test_compiled(render: RenderFixture) -> None:
+    assert render(product_row("<Chair>", 100, url="/chair?a=1&b=2")) == [
+        '<tr><td><a href="/chair?a=1&amp;b=2">',
+        "&lt;Chair&gt;",
+        '</a></td><td class="price" data-price="100">100 SEK</td></tr>',
+    ]
+    assert isinstance(product_row("chair", 1), FilledTemplate)
+
+
+def test_matches_uncompiled() -> None:
+    values = [("a", 1), ("<b>", 2), (markupsafe.Markup("<i>c</i>"), 3)]
+    for name, price in values:
+        assert str(product_row(name, price)) == str(product_row.__wrapped__(name, price))  # type: ignore[attr-defined]
+
+
+def test_element_argument(render: RenderFixture) -> None:
+    name: t.Any = h.b["bold"]
+    assert render(product_row(name, 1)) == [
+        '<tr><td><a href="/">',
+        "<b>",
+        "bold",
+        "</b>",
+        '</a></td><td class="price" data-price="1">1 SEK</td></tr>',
+    ]
+
+
+def test_text_argument_requires_str_or_int() -> None:
+    # Other values used as text falls back to calling the component.
+    price: t.Any = h.b["bold"]
+    assert str(product_row("chair", price)) == str(product_row.__wrapped__("chair", price))  # type: ignore[attr-defined]
+    assert not isinstance(product_row("chair", price), FilledTemplate)
+
+
+def test_none_falls_back() -> None:
+    @h.compiled
+    def greeting(name: str | None) -> h.Element:
+        return h.p["Anonymous" if name is None else name]
+
+    assert str(greeting("Andreas")) == "<p>Andreas</p>"
+    assert str(greeting(None)) == "<p>Anonymous</p>"
+
+
+def test_control_flow_falls_back() -> None:
+    calls: list[str] = []
+
+    @h.compiled
+    def badge(count: int) -> h.Element:
+        calls.append("called")
+        if count > 10:
+            return h.span(".badge.many")["10+"]
+        return h.span(".badge")[count]
+
+    assert str(badge(5)) == '<span class="badge">5</span>'
+    assert str(badge(50)) == '<span class="badge many">10+</span>'
+    # The component is not traced, since it compares the argument.
+    assert calls == ["called"] * 2
+
+
+def upper_if_str(x: t.Any) -> h.Element:
+    return h.div[x.upper() if isinstance(x, str) else x]
+
+
+def length(x: t.Any) -> h.Element:
+    return h.div[len(str(x))]
+
+
+def zero_padded(n: int) -> h.Element:
+    return h.div[str(n).zfill(3)]
+
+
+def with_repr(n: int) -> h.Element:
+    return h.div[repr(n)]
+
+
+def local_element(x: str) -> h.Element:
+    element = h.div
+    return element[x]
+
+
+def dict_lookup(x: str) -> h.Element:
+    labels = {"a": "A"}
+    return h.div[labels[x]]
+
+
+def helper_call(x: str) -> h.Element:
+    return h.div[upper_if_str(x)]
+
+
+@pytest.mark.parametrize(
+    ("component", "value"),
+    [
+        (upper_if_str, "abc"),
+        (length, "abc"),
+        (zero_padded, 5),
+        (with_repr, 5),
+        (local_element, "a"),
+        (dict_lookup, "a"),
+        (helper_call, "abc"),
+    ],
+)
+def test_indirect_use_not_traced(component: t.Callable[[t.Any], h.Element], value: t.Any) -> None:
+    compiled = h.compiled(component)
+    assert str(compiled(value)) == str(component(value))
+    assert not isinstance(compiled(value), FilledTemplate)
+
+
+def test_attribute_mapping_traced() -> None:
+    @h.compiled
+    def item(value: str) -> h.Element:
+        return h.li({"data-value": value})[h.fragment[value, "!"]]
+
+    assert isinstance(item("a"), FilledTemplate)
+    assert str(item("<a>")) == '<li data-value="&lt;a&gt;">&lt;a&gt;!</li>'
+
+
+@pytest.mark.parametrize(
+    "component",
+    [
+        lambda name: h.p[name.upper()],
+        lambda name: h.p[str(name).upper()],
+        lambda name: h.p[str(name).strip()],
+        lambda name: h.p[name if name else "-"],
+        lambda name: h.p[{"a": "b"}.get(name)],
+        lambda name: h.p[f"{name:>10}"],
+        lambda name: h.p[lambda: name],
+        lambda name: h.p[[h.i[x] for x in name]],
+    ],
+)
+def test_unsupported_usage_falls_back(component: t.Callable[[str], h.Element]) -> None:
+    compiled = h.compiled(component)
+    assert str(compiled(" a ")) == str(component(" a "))
+
+
+def test_class_argument() -> None:
+    @h.compiled
+    def button(cls: str) -> h.Element:
+        return h.button(class_=["btn", cls])["Click"]
+
+    assert str(button("primary")) == '<button class="btn primary">Click</button>'
+    assert isinstance(button("primary"), FilledTemplate)
+    assert str(button("")) == '<button class="btn">Click</button>'
+
+
+def test_list_argument() -> None:
+    @h.compiled
+    def items(children: list[h.Element]) -> h.Element:
+        return h.ul[children]
+
+    assert str(items([h.li["a"], h.li["b"]])) == "<ul><li>a</li><li>b</li></ul>"
+
+
+def test_invalid_child_argument() -> None:
+    @h.compiled
+    def item(child: t.Any) -> h.Element:
+        return h.li[child]
+
+    with pytest.raises(TypeError, match="is not a valid child element"):
+        item(b"bytes")
+
+
+def test_context_in_argument(render: RenderFixture) -> None:
+    ctx: h.Context[str] = h.Context("ctx")
+
+    @h.compiled
+    def item(child: h.Node) -> h.Element:
+        return h.li[child]
+
+    consumer = ctx.consumer(lambda value: value)
+    assert render(ctx.provider("from context", item(consumer()))) == [
+        "<li>",
+        "from context",
+        "</li>",
+    ]
+
+
+def test_keyword_argument_shapes() -> None:
+    @h.compiled
+    def link(text: str, href: str = "#") -> h.Element:
+        return h.a(href=href)[text]
+
+    assert str(link("a")) == '<a href="#">a</a>'
+    assert str(link("a", "/b")) == '<a href="/b">a</a>'
+    assert str(link("a", href="/c")) == '<a href="/c">a</a>'
+    assert str(link(href="/d", text="d")) == '<a href="/d">d</a>'
+
+
+def test_wraps() -> None:
+    assert product_row.__name__ == "product_row"  # pyright: ignore[reportFunctionMemberAccess]
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import importlib.util
+import sys
+import textwrap
+import typing as t
+from pathlib import Path
+
+import pytest
+
+import htpy as h
+from htpy._templates import FilledTemplate
+from htpy.compiler import _CACHE_OPTIMIZATION, install, uninstall
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import ModuleType
+
+    from .conftest import RenderFixture
+
+
+ImportModule = t.Callable[[str], "tuple[ModuleType, ModuleType]"]
+
+
+@pytest.fixture
+def import_module(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[ImportModule]:
+    """Import source as a compiled module and as a regular module."""
+    counter = 0
+    monkeypatch.syspath_prepend(str(tmp_path))
+    install(["compiled_components"])
+
+    def import_module(source: str) -> tuple[ModuleType, ModuleType]:
+        nonlocal counter
+        counter += 1
+        source = textwrap.dedent(source)
+
+        package = tmp_path / "compiled_components"
+        package.mkdir(exist_ok=True)
+        (package / "__init__.py").touch()
+        (package / f"module{counter}.py").write_text(source)
+        compiled = importlib.import_module(f"compiled_components.module{counter}")
+
+        (tmp_path / f"regular_module{counter}.py").write_text(source)
+        regular = importlib.import_module(f"regular_module{counter}")
+        return compiled, regular
+
+    yield import_module
+
+    uninstall()
+    for name in list(sys.modules):
+        if name.startswith(("compiled_components", "regular_module")):
+            del sys.modules[name]
+
+
+def test_compiled_module(import_module: ImportModule, render: RenderFixture) -> None:
+    compiled, regular = import_module(
+        """
+        from htpy import a, div, h2, p, br, img
+
+        def card(title, url, body):
+            return div("#main.card", {"data-x": 1}, hidden=False)[
+                h2["Title: ", title],
+                a(href=url)[p["<Static> ", 1, None, True], body],
+                br,
+                img(src="/logo.png", alt="Logo"),
+            ]
+        """
+    )
+    args = ("<Title>", "/a?b=1&c=2", h.b["bold"])
+
+    node = compiled.card(*args)
+    assert isinstance(node, h.Element)
+    assert isinstance(node._children, FilledTemplate)  # pyright: ignore[reportPrivateUsage]
+    assert str(node) == str(regular.card(*args))
+    assert render(node) == [
+        '<div id="main" class="card" data-x="1">',
+        "<h2>Title: ",
+        "&lt;Title&gt;",
+        '</h2><a href="/a?b=1&amp;c=2"><p>&lt;Static&gt; 1</p>',
+        "<b>",
+        "bold",
+        "</b>",
+        '</a><br><img src="/logo.png" alt="Logo">',
+        "</div>",
+    ]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        'div["text"]',
+        'div[1, 2, "three"]',
+        'div[["a", ["b", span["c"]]], "d"]',
+        "div[value]",
+        "div(class_=value)[value]",
+        'div(".a", id=value)["x"]',
+        'div(attrs, title="t")["x"]',
+        "div(**attrs)[value]",
+        'div(*[attrs])["x"]',
+        "div[(span[x] for x in items)]",
+        "div[[span[x] for x in items]]",
+        "div[lambda: span[value]]",
+        'div[f"{value}!"]',
+        'html[body["x"]]',
+        'html(lang="en")[body["x"]]',
+        'ul[li["a"], li(class_=["x", {"y": value}])["b"]]',
+        'div["a"]["b"]',
+        'div(".a")["b"](".c")',
+        'str(div["a"])',
+        'div[div["a"]["b"]]',
+        'div(".a")[div, input, input(disabled=True)]',
+        'h.div(".a")[h.span[value], h.my_element["x"]]',
+    ],
+)
+def test_matches_runtime(import_module: ImportModule, expression: str) -> None:
+    compiled, regular = import_module(
+        f"""
+        import htpy as h
+        from htpy import body, div, html, input, li, span, ul
+
+        value = "<value>"
+        attrs = {{"data-value": value}}
+        items = ["a", "<b>"]
+
+        def component():
+            return {expression}
+        """
+    )
+    assert str(compiled.component()) == str(regular.component())
+
+
+def test_evaluation_order(import_module: ImportModule) -> None:
+    compiled, regular = import_module(
+        """
+        from htpy import div, span
+
+        def component(log):
+            def value(name):
+                log.append(name)
+                return name
+
+            return div(id=value("a"))[value("b"), span(id=value("c"))[value("d")], value("e")]
+        """
+    )
+    compiled_log: list[str] = []
+    regular_log: list[str] = []
+    assert str(compiled.component(compiled_log)) == str(regular.component(regular_log))
+    assert compiled_log == regular_log == ["a", "b", "c", "d", "e"]
+
+
+def test_invalid_child(import_module: ImportModule) -> None:
+    compiled, _ = import_module(
+        """
+        from htpy import div
+
+        def component(child):
+            return div[child]
+        """
+    )
+    with pytest.raises(TypeError, match="is not a valid child element"):
+        compiled.component(b"bytes")
+
+
+def test_invalid_attribute(import_module: ImportModule) -> None:
+    compiled, _ = import_module(
+        """
+        from htpy import div
+
+        def component():
+            return div(".foo", "#bar")["x"]
+        """
+    )
+    with pytest.raises(ValueError, match="dictionary update sequence"):
+        compiled.component()
+
+
+def test_void_element_children(import_module: ImportModule) -> None:
+    compiled, _ = import_module(
+        """
+        from htpy import br
+
+        def component():
+            return br["x"]
+        """
+    )
+    with pytest.raises(TypeError):
+        compiled.component()
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        # Rebound names are not htpy elements.
+        """
+        from htpy import div
+
+        div = {"x": "not an element"}
+
+        def component(value):
+            return div["x"]
+        """,
+        """
+        from htpy import div
+
+        def component(div):
+            return div["x"]
+        """,
+        # Not an element.
+        """
+        from htpy import fragment
+
+        def component(value):
+            return fragment["x"]
+        """,
+        # Not imported from htpy.
+        """
+        from collections import Counter as div
+
+        def component(value):
+            return div["x"]
+        """,
+    ],
+)
+def test_not_compiled(import_module: ImportModule, source: str) -> None:
+    compiled, regular = import_module(source)
+    assert type(compiled.component({"x": "value"})) is type(regular.component({"x": "value"}))
+
+
+def test_async_component(import_module: ImportModule) -> None:
+    compiled, _ = import_module(
+        """
+        import asyncio
+        from htpy import div
+
+        async def child():
+            await asyncio.sleep(0)
+            return "async"
+
+        async def component():
+            return div[await child(), child()]
+        """
+    )
+
+    async def render() -> list[str]:
+        return [chunk async for chunk in (await compiled.component()).aiter_chunks()]
+
+    assert asyncio.run(render()) == ["<div>", "async", "async", "</div>"]
+
+
+def test_context(import_module: ImportModule, render: RenderFixture) -> None:
+    compiled, _ = import_module(
+        """
+        import htpy as h
+
+        ctx = h.Context("ctx")
+
+        @ctx.consumer
+        def consumer(value):
+            return h.i[value]
+
+        def component():
+            return ctx.provider("provided", h.div[h.span["a"], consumer()])
+        """
+    )
+    assert render(compiled.component()) == [
+        "<div>",
+        "<span>a</span>",
+        "<i>",
+        "provided",
+        "</i>",
+        "</div>",
+    ]
+
+
+def test_bytecode_cache(import_module: ImportModule, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    compiled, _ = import_module(
+        """
+        from htpy import div
+
+        def component():
+            return div[div["cached"]]
+        """
+    )
+    source_path = Path(str(compiled.__file__))
+    bytecode_path = Path(
+        importlib.util.cache_from_source(str(source_path), optimization=_CACHE_OPTIMIZATION)
+    )
+    assert bytecode_path.exists()
+    # Regular bytecode must not contain the compiled code.
+    assert not Path(importlib.util.cache_from_source(str(source_path))).exists()
+
+    del sys.modules[compiled.__name__]
+    cached = importlib.import_module(compiled.__name__)
+    assert isinstance(cached.component()._children, FilledTemplate)
+    assert str(cached.component()) == "<div><div>cached</div></div>"
+
+
+def test_bytecode_cache_tag() -> None:
+    # The tag changes with the compiler version and with htpy.
+    assert _CACHE_OPTIMIZATION.startswith("htpy2x")
+    assert _CACHE_OPTIMIZATION.isalnum()
+
+
+def test_returns_elements(import_module: ImportModule) -> None:
+    compiled, regular = import_module(
+        """
+        from htpy import body, html, main, p, title
+
+        def paragraph(text):
+            return p[text]
+
+        def base():
+            return html[title["Page"], body[main["content"]]]
+        """
+    )
+    assert isinstance(compiled.paragraph("x"), h.Element)
+    assert isinstance(compiled.base(), h.HTMLElement)
+    assert str(compiled.base()["more"]) == str(regular.base()["more"])
+    assert str(compiled.base()(lang="en")) == str(regular.base()(lang="en"))
+    assert str(h.Template(compiled.base()).render()) == str(regular.base())
+
+
+def test_not_installed_for_other_modules(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "other_components.py").write_text(
+        "from htpy import div\n\ndef component():\n    return div['x']\n"
+    )
+    install(["compiled_components"])
+    try:
+        module = importlib.import_module("other_components")
+        assert isinstance(module.component(), h.Element)
+    finally:
+        uninstall()
+        del sys.modules["other_components"]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import gzip
+import sys
+import typing as t
+import zlib
+
+import markupsafe
+import pytest
+
+import htpy as h
+from htpy._cache import decode_entry, encode_entry
+from htpy._compression import (
+    ENCODINGS,
+    MIN_PRECOMPRESSED_SIZE,
+    PrecompressedChunk,
+    StreamCompressor,
+    ZstdStreamCompressor,
+    compress_chunks,
+    deflate_segment,
+    negotiate_encoding,
+)
+from htpy._flush import FLUSH_CHUNK
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+Encoding = t.Literal["gzip", "deflate"]
+requires_zstd = pytest.mark.skipif(sys.version_info < (3, 14), reason="requires Python 3.14")
+
+FOOTER = PrecompressedChunk("<footer>" + "<p>Footer text</p>" * 50 + "</footer>")
+
+
+pytestmark = pytest.mark.usefixtures("clear_default_backend")
+
+
+def decompress(data: bytes, encoding: Encoding) -> str:
+    if encoding == "gzip":
+        return gzip.decompress(data).decode()
+    return zlib.decompress(data).decode()
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [],
+        [""],
+        ["<p>å</p>"],
+        [FOOTER],
+        [FOOTER, FOOTER],
+        ["<html>", FOOTER, "<p>dynamic</p>" * 20, FOOTER, "</html>"],
+        [PrecompressedChunk("<br>"), "x"],
+    ],
+)
+def test_round_trip(chunks: list[str], encoding: Encoding) -> None:
+    assert decompress(compress_chunks(chunks, encoding), encoding) == "".join(chunks)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_precompressed_chunk_after_flush(encoding: Encoding) -> None:
+    # The repeated text is compressed with references to its first occurrence,
+    # which must not be computed from history that excludes the spliced chunk.
+    text = "<p>repeated text</p>" * 20
+    compressor = StreamCompressor(encoding)
+    data = (
+        compressor.compress(text)
+        + compressor.compress(FLUSH_CHUNK)
+        + compressor.compress(FOOTER)
+        + compressor.compress(text)
+        + compressor.finish()
+    )
+    assert decompress(data, encoding) == text + FOOTER + text
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_precompressed_chunk_spliced(encoding: Encoding) -> None:
+    compressor = StreamCompressor(encoding)
+    compressor.compress("<main>")
+    output = compressor.compress(FOOTER)
+    assert output.endswith(FOOTER.deflated())
+
+
+def test_precompressed_chunk_is_str() -> None:
+    assert FOOTER == str(FOOTER)
+    assert isinstance(FOOTER, str)
+    assert len(FOOTER) > MIN_PRECOMPRESSED_SIZE
+
+
+def test_deflated_cached() -> None:
+    chunk = PrecompressedChunk("<p>x</p>")
+    assert chunk.deflated() is chunk.deflated()
+    assert chunk.deflated(1) is not chunk.deflated()
+
+
+def test_deflate_segment() -> None:
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    assert decompressor.decompress(deflate_segment(b"abc") + deflate_segment(b"def")) == (b"abcdef")
+    assert not decompressor.eof
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_flush(encoding: Encoding) -> None:
+    compressor = StreamCompressor(encoding)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == "gzip" else 0)
+
+    data = compressor.compress("<p>first</p>")
+    data += compressor.flush()
+    assert decompressor.decompress(data) == b"<p>first</p>"
+    assert compressor.flush() == b""
+
+    data = compressor.compress("<p>second</p>") + compressor.finish()
+    assert decompressor.decompress(data) == b"<p>second</p>"
+    assert decompressor.eof
+
+
+def test_entry_with_deflated() -> None:
+    data = encode_entry("<p>å</p>", {"a": 1}, deflate_segment("<p>å</p>".encode()))
+    entry = decode_entry(data)
+    assert entry is not None
+    header, html = entry
+    assert header["a"] == 1
+    assert html == "<p>å</p>"
+    assert isinstance(html, PrecompressedChunk)
+    assert html.deflated() == deflate_segment("<p>å</p>".encode())
+
+
+def test_invalid_entry_with_deflated() -> None:
+    assert decode_entry(b'{"deflate":[6,100]}\n<p></p>') is None
+
+
+def test_cache_precompress() -> None:
+    str(h.cache("footer", precompress=True)[markupsafe.Markup(FOOTER)])
+    chunks = list(h.cache("footer", precompress=True)["not used"].iter_chunks())
+    assert chunks == [FOOTER]
+    assert isinstance(chunks[0], PrecompressedChunk)
+    assert chunks[0].__dict__ == {"_deflated": {6: FOOTER.deflated()}}
+
+
+def test_cache_without_precompress() -> None:
+    str(h.cache("footer")[markupsafe.Markup(FOOTER)])
+    chunks = list(h.cache("footer")["not used"].iter_chunks())
+    assert not isinstance(chunks[0], PrecompressedChunk)
+
+
+@pytest.fixture
+def static_cache() -> Iterator[None]:
+    h.enable_static_cache()
+    yield
+    h.disable_static_cache()
+
+
+@pytest.mark.usefixtures("static_cache")
+def test_static_cache() -> None:
+    footer = h.static(h.footer[tuple(h.p["Footer text"] for _ in range(50))])
+    str(footer)
+    [chunk] = footer.iter_chunks()
+    assert isinstance(chunk, PrecompressedChunk)
+    assert decompress(compress_chunks(["<body>", chunk], "gzip"), "gzip") == f"<body>{footer}"
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_flush_chunk(encoding: Encoding) -> None:
+    compressor = StreamCompressor(encoding)
+    data = compressor.compress("<p>first</p>")
+    data += compressor.compress(FLUSH_CHUNK)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == "gzip" else 0)
+    assert decompressor.decompress(data) == b"<p>first</p>"
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate", "deflate"),
+        ("deflate, gzip", "gzip"),
+        ("GZIP;q=0.5, deflate", "deflate"),
+        ("gzip;q=0, deflate;q=0", None),
+        ("gzip;q=0, *", "zstd" if "zstd" in ENCODINGS else "deflate"),
+        ("br, zstd", "zstd" if "zstd" in ENCODINGS else None),
+        ("gzip;q=invalid, deflate;q=0.1", "deflate"),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, expected: str | None) -> None:
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+@requires_zstd
+def test_zstd_round_trip() -> None:
+    from compression import zstd  # type: ignore[import-not-found,unused-ignore]
+
+    compressor = ZstdStreamCompressor()
+    data = compressor.compress("<p>first</p>") + compressor.compress(FLUSH_CHUNK)
+    decompressor = zstd.ZstdDecompressor()
+    assert decompressor.decompress(data) == b"<p>first</p>"
+    data = compressor.compress(FOOTER) + compressor.finish()
+    assert decompressor.decompress(data) == FOOTER.encode()
+    assert decompressor.eof
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 14), reason="zstd is available")
+def test_zstd_not_available() -> None:
+    assert "zstd" not in ENCODINGS
+    with pytest.raises(RuntimeError, match="requires Python 3.14"):
+        ZstdStreamCompressor()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import markupsafe
+import pytest
+
+import htpy as h
+from htpy import _fingerprint
+
+
+def table(*cells: str) -> h.Element:
+    rows = [h.tr[h.td(id=f"cell-{n}")[cell], h.td[n]] for n, cell in enumerate(cells)]
+    return h.table("#table")[h.tbody[rows]]
+
+
+def rendered(changes: list[h.BaseElement]) -> list[str]:
+    return [str(change) for change in changes]
+
+
+def test_unchanged() -> None:
+    assert h.diff(table("a", "b"), table("a", "b")) == []
+
+
+def test_changed_element_with_id() -> None:
+    assert rendered(h.diff(table("a", "b", "c"), table("a", "B", "c"))) == [
+        '<td id="cell-1" hx-swap-oob="true">B</td>'
+    ]
+
+
+def test_change_without_id_swaps_parent() -> None:
+    old = h.div("#list")[h.ul("#items")[h.li["a"], h.li["b"]]]
+    new = h.div("#list")[h.ul("#items")[h.li["a"], h.li["c"]]]
+    assert rendered(h.diff(old, new)) == [
+        '<ul id="items" hx-swap-oob="true"><li>a</li><li>c</li></ul>'
+    ]
+
+
+def test_changed_attributes() -> None:
+    old = h.div("#list")[h.p("#p", class_="a")["x"]]
+    new = h.div("#list")[h.p("#p", class_="b")["x"]]
+    assert rendered(h.diff(old, new)) == ['<p id="p" class="b" hx-swap-oob="true">x</p>']
+
+
+@pytest.mark.parametrize(
+    "new",
+    [
+        h.div("#list")[h.p("#a")["x"], h.p("#b")["y"], h.p("#c")],
+        h.div("#list")[h.p("#b")["y"], h.p("#a")["x"]],
+        h.div("#list")[h.p("#a")["x"], h.p["y"]],
+    ],
+)
+def test_changed_structure_swaps_parent(new: h.Element) -> None:
+    old = h.div("#list")[h.p("#a")["x"], h.p("#b")["y"]]
+    assert rendered(h.diff(old, new)) == [str(new(id="list", hx_swap_oob="true"))]
+
+
+def test_changed_tag() -> None:
+    old = h.div("#list")[h.p("#a")["x"], h.p("#b")["y"]]
+    new = h.div("#list")[h.p("#a")["x"], h.span("#b")["y"]]
+    assert rendered(h.diff(old, new)) == ['<span id="b" hx-swap-oob="true">y</span>']
+
+
+def test_several_changes() -> None:
+    assert rendered(h.diff(table("a", "b", "c"), table("A", "b", "C"))) == [
+        '<td id="cell-0" hx-swap-oob="true">A</td>',
+        '<td id="cell-2" hx-swap-oob="true">C</td>',
+    ]
+
+
+def test_existing_swap_oob() -> None:
+    old = h.div["x", h.p(id="p", hx_swap_oob="innerHTML")["a"]]
+    new = h.div["x", h.p(id="p", hx_swap_oob="innerHTML")["b"]]
+    assert rendered(h.diff(old, new)) == ['<p id="p" hx-swap-oob="innerHTML">b</p>']
+
+
+def test_no_id() -> None:
+    with pytest.raises(ValueError, match="not inside an element with the same id"):
+        h.diff(h.div["a"], h.div["b"])
+
+
+def test_changed_id() -> None:
+    with pytest.raises(ValueError, match="not inside an element with the same id"):
+        h.diff(h.div("#a")["x"], h.div("#b")["x"])
+
+
+def test_flattened_children() -> None:
+    old = h.div("#d")[h.fragment["a", None, [h.b["b"]]], False]
+    new = h.div("#d")[["a"], h.b["b"]]
+    assert h.diff(old, new) == []
+
+
+def test_text_and_markup_differ() -> None:
+    old = h.div("#d")["<b>"]
+    new = h.div("#d")[markupsafe.Markup("<b>")]
+    assert rendered(h.diff(old, new)) == ['<div id="d" hx-swap-oob="true"><b></div>']
+
+
+def test_nodes_and_lists() -> None:
+    old = [h.p("#a")["x"], h.p("#b")["y"]]
+    new = h.fragment[h.p("#a")["x"], h.p("#b")["z"]]
+    assert rendered(h.diff(old, new)) == ['<p id="b" hx-swap-oob="true">z</p>']
+
+
+def test_lazy_children() -> None:
+    with pytest.raises(TypeError, match="can not be fingerprinted"):
+        h.diff(h.div("#d")[lambda: "x"], h.div("#d")["y"])
+
+
+def test_fingerprints_cached() -> None:
+    old = table("a", "b")
+    h.diff(old, table("a", "c"))
+    assert old in _fingerprint._digests  # pyright: ignore[reportPrivateUsage]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import threading
+import time
 import typing as t
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 from django.core import management
@@ -73,3 +76,78 @@ class Test_template_loader:
 def test_conditional_escape() -> None:
     result = conditional_escape(div["test"])  # type: ignore[arg-type]
     assert result == "<div>test</div>"
+
+
+def test_cache_backend(render: RenderFixture) -> None:
+    from htpy import cache
+    from htpy.django import DjangoCacheBackend
+
+    backend = DjangoCacheBackend()
+    str(cache("django-key", backend=backend)[div["cached"]])
+    assert render(cache("django-key", backend=backend)[div["not cached"]]) == ["<div>cached</div>"]
+
+
+def test_cache_backend_get_many() -> None:
+    from htpy.django import DjangoCacheBackend
+
+    backend = DjangoCacheBackend()
+    backend.set("a", b"1", None)
+    backend.set("c", b"3", None)
+    assert backend.get_many(["a", "b", "c"]) == [b"1", None, b"3"]
+
+
+def test_cache_backend_inline_single_flight() -> None:
+    from htpy import cache
+    from htpy.django import DjangoCacheBackend
+
+    assert DjangoCacheBackend() == DjangoCacheBackend("default")
+    assert DjangoCacheBackend("default") != DjangoCacheBackend("other")
+
+    calls: list[str] = []
+    barrier = threading.Barrier(8)
+
+    def slow() -> str:
+        calls.append("called")
+        time.sleep(0.2)
+        return "rendered"
+
+    def render() -> str:
+        barrier.wait()
+        # Each rendering creates its own backend.
+        return str(cache("django-flight", backend=DjangoCacheBackend("default"))[div[slow]])
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: render(), range(8)))
+    assert results == ["<div>rendered</div>"] * 8
+    assert calls == ["called"]
+
+
+def test_response_cache_policy() -> None:
+    from htpy import cache_policy
+    from htpy.django import HtpyResponse
+
+    def user_menu() -> Node:
+        cache_policy(max_age=60, private=True, vary=["Cookie"])
+        return li["menu"]
+
+    def news() -> Node:
+        cache_policy(max_age=300, vary=["Accept-Language"])
+        return li["news"]
+
+    response = HtpyResponse(ul[user_menu, news], headers={"Vary": "Accept-Encoding"})
+    assert response.content == b"<ul><li>menu</li><li>news</li></ul>"
+    assert response["Content-Type"] == "text/html; charset=utf-8"
+    assert response["Cache-Control"] == "private, max-age=60"
+    assert response["Vary"] == "Accept-Encoding, Cookie, Accept-Language"
+
+
+def test_response_explicit_cache_control() -> None:
+    from htpy import cache_policy
+    from htpy.django import HtpyResponse
+
+    def component() -> Node:
+        cache_policy(max_age=60)
+        return "x"
+
+    assert HtpyResponse(component, cache_control="no-cache")["Cache-Control"] == "no-cache"
+    assert not HtpyResponse("x").has_header("Cache-Control")
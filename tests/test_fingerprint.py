@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import typing as t
+
+import markupsafe
+import pytest
+
+import htpy as h
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+def test_same_structure() -> None:
+    def card(title: str) -> h.Element:
+        return h.div(".card", hidden=True)[h.h2[title], h.p["text", 1], h.br]
+
+    assert h.fingerprint(card("a")) == h.fingerprint(card("a"))
+    assert card("a") is not card("a")
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [
+        (h.div["a"], h.span["a"]),
+        (h.div["a"], h.div["b"]),
+        (h.div(".a")["x"], h.div(".b")["x"]),
+        (h.div["<b>"], h.div[markupsafe.Markup("<b>")]),
+        (h.div["1"], h.div[1]),
+        (h.div["ab"], h.div["a", "b"]),
+        (h.div[h.span["a"], "b"], h.div[h.span["a", "b"]]),
+        (h.div, h.br),
+        (h.html, h.Element("html")),
+        (h.fragment["a"], h.fragment[h.div["a"]]),
+    ],
+)
+def test_different_structure(a: h.Node, b: h.Node) -> None:
+    assert h.fingerprint(a) != h.fingerprint(b)
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [
+        (h.div["a", None, True, False], h.div["a"]),
+        (h.div[["a", ("b",)]], h.div["a", "b"]),
+        (h.fragment[h.div["a"]], h.div["a"]),
+    ],
+)
+def test_equivalent_structure(a: h.Node, b: h.Node) -> None:
+    assert h.fingerprint(a) == h.fingerprint(b)
+
+
+def test_stable() -> None:
+    assert h.fingerprint(h.div(".a")["b", 1]) == "f96df3410800cfc4264ebf272e10078b"
+
+
+def test_subclass() -> None:
+    class MyElement(h.Element):
+        pass
+
+    assert h.fingerprint(MyElement("div")["x"]) == h.fingerprint(h.div["x"])
+
+
+def test_subclass_with_custom_rendering() -> None:
+    class MyElement(h.Element):
+        def iter_chunks(self, context: t.Any = None) -> Iterator[str]:
+            yield "custom"
+
+    with pytest.raises(TypeError, match="changes how elements are rendered"):
+        h.fingerprint(MyElement("div")["x"])
+
+
+def test_cached_on_element() -> None:
+    children = ["a"]
+    element = h.div[children]
+    before = h.fingerprint(element)
+    children.append("b")
+    assert h.fingerprint(element) == before
+    assert h.fingerprint(h.section[element]) == h.fingerprint(h.section[h.div["a"]])
+
+
+def test_template() -> None:
+    template = h.Template(h.div[h.Slot("value")])
+    assert h.fingerprint(template.render(value="a")) == h.fingerprint(template.render(value="a"))
+    assert h.fingerprint(template.render(value="a")) != h.fingerprint(template.render(value="b"))
+
+
+def generator() -> Iterator[str]:
+    yield "a"
+
+
+@pytest.mark.parametrize(
+    "child",
+    [
+        lambda: "a",
+        generator,
+        h.Context[str]("ctx").provider("a", "b"),
+    ],
+)
+def test_lazy_children(child: t.Any) -> None:
+    with pytest.raises(TypeError, match="can not be fingerprinted"):
+        h.fingerprint(h.div[h.span[child]])
+
+
+def test_generator() -> None:
+    gen = generator()
+    with pytest.raises(TypeError, match="<generator object generator"):
+        h.fingerprint(h.div[gen])
+    # The generator is not consumed.
+    assert str(h.div[gen]) == "<div>a</div>"
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import typing as t
+
+import htpy as h
+from htpy._flush import FLUSH_AT_AWAIT, FLUSH_CHUNK
+from htpy._render_sync import new_render_context
+
+if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from .conftest import RenderFixture
+
+
+def test_flush_renders_nothing(render: RenderFixture) -> None:
+    assert render(h.div["a", h.flush, "b"]) == ["<div>", "a", "", "b", "</div>"]
+    assert str(h.div["a", h.flush, "b"]) == "<div>ab</div>"
+
+
+def test_flush_chunk() -> None:
+    [chunk] = h.flush.iter_chunks()
+    assert chunk is FLUSH_CHUNK
+
+
+async def child() -> str:
+    return "child"
+
+
+async def items() -> AsyncIterator[str]:
+    yield "a"
+    yield "b"
+
+
+def render_with_flush_at_await(node: h.Node, flush_at_await: bool) -> list[str]:
+    context = {**new_render_context(), FLUSH_AT_AWAIT: True} if flush_at_await else None
+
+    async def render() -> list[str]:
+        return [chunk async for chunk in h.fragment[node].aiter_chunks(context)]
+
+    return asyncio.run(render())
+
+
+def test_flush_at_await() -> None:
+    chunks = render_with_flush_at_await(h.div[child(), h.ul[items()]], True)
+    assert chunks == ["<div>", "", "child", "<ul>", "", "a", "", "b", "", "</ul>", "</div>"]
+    assert [chunk is FLUSH_CHUNK for chunk in chunks].count(True) == 4
+
+
+def test_no_flush_at_await_by_default() -> None:
+    chunks = render_with_flush_at_await(h.div[child(), h.ul[items()]], False)
+    assert chunks == ["<div>", "child", "<ul>", "a", "b", "</ul>", "</div>"]
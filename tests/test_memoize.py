@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import time
+import typing as t
+
+import pytest
+from markupsafe import Markup
+
+import htpy as h
+from htpy._cache_policy import recording_cache_policy
+
+if t.TYPE_CHECKING:
+    from .conftest import RenderFixture
+
+
+def test_memoize(render: RenderFixture) -> None:
+    calls: list[str] = []
+
+    @h.memoize
+    def badge(label: str) -> h.Element:
+        calls.append(label)
+        return h.span(".badge")[h.b[label], "!"]
+
+    assert str(badge("<new>")) == '<span class="badge"><b>&lt;new&gt;</b>!</span>'
+    assert render(badge("<new>")) == ['<span class="badge"><b>&lt;new&gt;</b>!</span>']
+    assert str(badge("other")) == '<span class="badge"><b>other</b>!</span>'
+    assert calls == ["<new>", "other"]
+    assert badge.cache_info() == (1, 2, 0, 128, 2)  # pyright: ignore[reportFunctionMemberAccess]
+
+
+def test_lazy() -> None:
+    calls: list[str] = []
+
+    @h.memoize
+    def component() -> str:
+        calls.append("called")
+        return "x"
+
+    node = h.div[component()]
+    assert calls == []
+    assert str(node) == "<div>x</div>"
+    assert calls == ["called"]
+
+
+def test_maxsize() -> None:
+    calls: list[int] = []
+
+    @h.memoize(maxsize=2)
+    def component(value: int) -> int:
+        calls.append(value)
+        return value
+
+    for value in [1, 2, 1, 3, 2, 1]:
+        assert str(component(value)) == str(value)
+
+    # 2 was evicted when 3 was added, 1 was evicted when 2 was added again.
+    assert calls == [1, 2, 3, 2, 1]
+    info = component.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 5, 3, 2)
+
+
+def test_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    calls: list[str] = []
+
+    @h.memoize(ttl=10)
+    def component() -> str:
+        calls.append("called")
+        return "x"
+
+    str(component())
+    now += 5
+    str(component())
+    assert calls == ["called"]
+
+    now += 6
+    str(component())
+    assert calls == ["called", "called"]
+
+
+def test_key() -> None:
+    calls: list[int] = []
+
+    @h.memoize(key=lambda user: user["role"])
+    def menu(user: dict[str, str]) -> h.Element:
+        calls.append(1)
+        return h.nav[user["role"]]
+
+    assert str(menu({"name": "a", "role": "admin"})) == "<nav>admin</nav>"
+    assert str(menu({"name": "b", "role": "admin"})) == "<nav>admin</nav>"
+    assert len(calls) == 1
+
+
+def test_unhashable_arguments() -> None:
+    @h.memoize
+    def component(items: list[str]) -> str:
+        return ""
+
+    with pytest.raises(TypeError, match="unhashable"):
+        component(["a"])
+
+
+def test_markup_and_str_arguments() -> None:
+    @h.memoize
+    def component(label: str) -> h.Element:
+        return h.b[label]
+
+    assert str(component(Markup("<i>x</i>"))) == "<b><i>x</i></b>"
+    assert str(component("<i>x</i>")) == "<b>&lt;i&gt;x&lt;/i&gt;</b>"
+    assert str(component(label=Markup("<i>x</i>"))) == "<b><i>x</i></b>"
+    assert str(component(label="<i>x</i>")) == "<b>&lt;i&gt;x&lt;/i&gt;</b>"
+
+
+def test_bool_and_int_arguments() -> None:
+    @h.memoize
+    def component(value: bool | int) -> h.Element:
+        return h.b[value]
+
+    assert str(component(1)) == "<b>1</b>"
+    assert str(component(True)) == "<b></b>"
+    assert str(component(value=True)) == "<b></b>"
+    assert str(component(value=1)) == "<b>1</b>"
+
+
+def test_cache_policy_recorded_when_cached(render: RenderFixture) -> None:
+    @h.memoize
+    def component() -> h.Element:
+        h.cache_policy(max_age=60, private=True)
+        return h.nav[lambda: h.cache_policy(vary=["Cookie"])]
+
+    with recording_cache_policy() as recorder:
+        assert str(component()) == "<nav></nav>"
+    assert recorder.policy == h.CachePolicy(max_age=60, private=True, vary=("Cookie",))
+
+    with recording_cache_policy() as recorder:
+        assert render(component()) == ["<nav></nav>"]
+    assert recorder.policy == h.CachePolicy(max_age=60, private=True, vary=("Cookie",))
+    assert component.cache_info().hits == 1  # pyright: ignore[reportFunctionMemberAccess]
+
+
+def test_tags_recorded_when_cached(render: RenderFixture) -> None:
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+
+    @h.memoize
+    def component() -> str:
+        h.depends_on("products")
+        return "products"
+
+    def fragment(key: str) -> h.Renderable:
+        return h.cache(key, backend=backend)[lambda: calls.append(key), component()]
+
+    assert str(fragment("a")) == "products"
+    assert render(fragment("b")) == ["products"]
+    assert component.cache_info().hits == 1  # pyright: ignore[reportFunctionMemberAccess]
+
+    h.invalidate_tags(["products"], backend=backend)
+    assert str(fragment("a")) == "products"
+    assert str(fragment("b")) == "products"
+    assert calls == ["a", "b", "a", "b"]
+
+
+def test_invalidated_by_tags(render: RenderFixture) -> None:
+    backend = h.LRUCacheBackend()
+    prices = {"apple": 10}
+
+    @h.memoize(backend=backend)
+    def price(product: str) -> h.Element:
+        h.depends_on(f"price:{product}")
+        return h.span[str(prices[product])]
+
+    def page() -> h.Renderable:
+        return h.cache("page", backend=backend)[h.div[lambda: price("apple")]]
+
+    assert str(page()) == "<div><span>10</span></div>"
+    assert str(price("apple")) == "<span>10</span>"
+
+    prices["apple"] = 12
+    h.invalidate_tags(["price:apple"], backend=backend)
+    assert render(page()) == ["<div>", "<span>12</span>", "</div>"]
+    assert str(price("apple")) == "<span>12</span>"
+    assert price.cache_info().hits == 2  # pyright: ignore[reportFunctionMemberAccess]
+
+
+def test_contexts(render: RenderFixture) -> None:
+    theme: h.Context[str] = h.Context("theme", default="light")
+    calls: list[str] = []
+
+    @h.memoize(contexts=[theme])
+    def button(label: str) -> h.Renderable:
+        @theme.consumer
+        def themed(value: str) -> h.Element:
+            calls.append(value)
+            return h.button(class_=value)[label]
+
+        return themed()
+
+    assert str(button("a")) == '<button class="light">a</button>'
+    assert str(theme.provider("dark", button("a"))) == '<button class="dark">a</button>'
+    assert render(theme.provider("dark", button("a"))) == ['<button class="dark">a</button>']
+    assert calls == ["light", "dark"]
+
+
+def test_async(render_async: RenderFixture) -> None:
+    calls: list[str] = []
+
+    async def child() -> str:
+        return "async"
+
+    @h.memoize
+    def component() -> h.Element:
+        calls.append("called")
+        return h.div[h.p["a"], child()]
+
+    assert render_async(h.fragment[component(), component()]) == [
+        "<div><p>a</p>async</div>",
+        "<div><p>a</p>async</div>",
+    ]
+    assert calls == ["called"]
+
+
+def test_empty(render: RenderFixture) -> None:
+    @h.memoize
+    def component() -> None:
+        return None
+
+    assert render(component()) == []
+
+
+def test_cache_clear() -> None:
+    @h.memoize
+    def component() -> str:
+        return "x"
+
+    str(component())
+    component.cache_clear()
+    assert component.cache_info() == (0, 0, 0, 128, 0)
+
+
+def test_wraps() -> None:
+    @h.memoize
+    def component() -> str:
+        """Docstring."""
+        return "x"
+
+    assert component.__name__ == "component"  # type: ignore[attr-defined]
+    assert component.__doc__ == "Docstring."
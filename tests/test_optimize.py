@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import typing as t
+
+import markupsafe
+
+import htpy as h
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from .conftest import RenderFixture
+
+
+ctx: h.Context[str] = h.Context("ctx", default="default")
+
+
+@ctx.consumer
+def consumer(value: str) -> str:
+    return value
+
+
+def test_static_tree(render: RenderFixture) -> None:
+    node = h.div("#main.container")[
+        h.h1["Hello ", "<World>"],
+        None,
+        [True, h.p[False, "a", ["b", h.fragment["c", 1]]]],
+        h.br,
+        h.comment("comment"),
+        markupsafe.Markup("<b>markup</b>"),
+    ]
+    optimized = h.optimize(node)
+
+    assert render(optimized) == [str(node)]
+    assert isinstance(optimized, h.Fragment)
+
+
+def test_html_element() -> None:
+    node = h.html[h.body["hi"]]
+    assert list(h.optimize(node).iter_chunks()) == ["<!doctype html><html><body>hi</body></html>"]
+
+
+def test_keeps_dynamic_nodes(render: RenderFixture) -> None:
+    def gen() -> Iterator[str]:
+        yield "gen"
+
+    def callable_child() -> str:
+        return "callable"
+
+    optimized = h.optimize(h.div[h.span["a"], gen(), callable_child, "b", consumer(), h.i["c"]])
+    assert render(optimized) == [
+        "<div><span>a</span>",
+        "gen",
+        "callable",
+        "b",
+        "default",
+        "<i>c</i></div>",
+    ]
+
+
+def test_context_provider(render: RenderFixture) -> None:
+    optimized = h.optimize(ctx.provider("provided", h.div[h.span["a"], consumer(), h.span["b"]]))
+    assert render(optimized) == ["<div><span>a</span>", "provided", "<span>b</span></div>"]
+
+
+def test_async_child(render_async: RenderFixture) -> None:
+    async def async_child() -> str:
+        return "async"
+
+    optimized = h.optimize(h.div[h.p["a"], async_child(), h.p["b"]])
+    assert render_async(optimized) == ["<div><p>a</p>", "async", "<p>b</p></div>"]
+
+
+def test_empty(render: RenderFixture) -> None:
+    assert render(h.optimize([None, [], h.fragment[False]])) == []
+
+
+def test_element_subclass_kept() -> None:
+    class CustomElement(h.Element):
+        def iter_chunks(self, context: t.Any = None) -> Iterator[str]:
+            yield "custom"
+
+    element = CustomElement("custom")
+    assert list(h.optimize(h.div[element]).iter_chunks()) == ["<div>", "custom", "</div>"]
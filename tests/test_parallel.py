@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from htpy import Context, div, li, parallel, ul
+
+if t.TYPE_CHECKING:
+    from .conftest import RenderFixture
+
+
+letter_ctx: Context[str] = Context("letter_ctx")
+
+
+@letter_ctx.consumer
+def letter(value: str) -> str:
+    return value
+
+
+def test_render_in_order(render: RenderFixture) -> None:
+    result = ul[parallel[li["a"], li["b"], li["c"]]]
+    assert render(result) == [
+        "<ul>",
+        "<li>a</li>",
+        "<li>b</li>",
+        "<li>c</li>",
+        "</ul>",
+    ]
+
+
+def test_single_node(render: RenderFixture) -> None:
+    assert render(parallel[div["a"]]) == ["<div>", "a", "</div>"]
+
+
+def test_list(render: RenderFixture) -> None:
+    assert render(parallel[[div["a"], div["b"]]]) == ["<div>a</div>", "<div>b</div>"]
+
+
+def test_str() -> None:
+    assert str(parallel["<", div["a"]]) == "&lt;<div>a</div>"
+
+
+def test_context(render: RenderFixture) -> None:
+    result = letter_ctx.provider("x", parallel[div[letter()], div[letter()]])
+    assert render(result) == ["<div>x</div>", "<div>x</div>"]
+
+
+def test_renders_on_worker_threads() -> None:
+    thread_names: list[str] = []
+
+    def record_thread() -> str:
+        thread_names.append(threading.current_thread().name)
+        return "x"
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="test-pool") as executor:
+        result = str(parallel(executor=executor)[div[record_thread], div[record_thread]])
+
+    assert result == "<div>x</div><div>x</div>"
+    assert len(thread_names) == 2
+    assert all(name.startswith("test-pool") for name in thread_names)
+
+
+def test_nested_renders_sequentially() -> None:
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        inner = parallel(executor=executor)[div["a"], div["b"]]
+        result = str(parallel(executor=executor)[inner, inner])
+
+    assert result == "<div>a</div><div>b</div>" * 2
+
+
+def test_exception_is_propagated() -> None:
+    def fail() -> str:
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError, match="broken"):
+        str(parallel[div["a"], div[fail]])
+
+
+def test_async_subtrees_overlap(render_async: RenderFixture) -> None:
+    started: list[str] = []
+
+    async def item(name: str) -> str:
+        started.append(name)
+        await asyncio.sleep(0.01)
+        # Both subtrees must have been started before any of them finishes.
+        assert started == ["a", "b"]
+        return name
+
+    assert render_async(parallel[div[item("a")], div[item("b")]]) == [
+        "<div>a</div>",
+        "<div>b</div>",
+    ]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import typing as t
+
+import pytest
+
+import htpy
+from htpy import Element, li, ul
+
+if t.TYPE_CHECKING:
+    from pathlib import Path
+
+
+# Other tests start threads, avoid forking a multi-threaded process.
+render_many = functools.partial(htpy.render_many, mp_context=multiprocessing.get_context("spawn"))
+render_many_to_files = functools.partial(
+    htpy.render_many_to_files, mp_context=multiprocessing.get_context("spawn")
+)
+
+
+def product_page(name: str, count: int) -> Element:
+    return ul[(li[f"{name} {n}"] for n in range(count))]
+
+
+def broken_page() -> Element:
+    raise ValueError("broken page")
+
+
+def test_render_many() -> None:
+    jobs = [(product_page, ("<a>", n)) for n in range(5)]
+
+    result = list(render_many(jobs, workers=2, chunksize=2))
+
+    assert result == [str(product_page("<a>", n)).encode() for n in range(5)]
+    assert result[2] == b"<ul><li>&lt;a&gt; 0</li><li>&lt;a&gt; 1</li></ul>"
+
+
+def test_render_many_lazy_jobs() -> None:
+    jobs = ((product_page, ("x", 1)) for _ in range(50))
+
+    assert list(render_many(jobs, workers=2, chunksize=3)) == [b"<ul><li>x 0</li></ul>"] * 50
+
+
+def test_render_many_encoding() -> None:
+    result = list(render_many([(product_page, ("å", 1))], workers=1, encoding="latin-1"))
+    assert result == ["<ul><li>å 0</li></ul>".encode("latin-1")]
+
+
+def test_render_many_progress() -> None:
+    progress: list[int] = []
+    jobs = [(product_page, ("x", 1))] * 5
+
+    list(render_many(jobs, workers=2, chunksize=2, progress=progress.append))
+
+    assert progress == [2, 4, 5]
+
+
+def test_render_many_error() -> None:
+    with pytest.raises(ValueError, match="broken page"):
+        list(render_many([(broken_page, ())], workers=1))
+
+
+def test_render_many_invalid_chunksize() -> None:
+    with pytest.raises(ValueError, match="chunksize must be at least 1"):
+        list(render_many([], chunksize=0))
+
+
+def test_render_many_to_files(tmp_path: Path) -> None:
+    jobs = [(tmp_path / f"{n}.html", product_page, ("x", n)) for n in range(3)]
+
+    render_many_to_files(jobs, workers=2)
+
+    assert (tmp_path / "0.html").read_bytes() == b"<ul></ul>"
+    assert (tmp_path / "2.html").read_bytes() == b"<ul><li>x 0</li><li>x 1</li></ul>"
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import typing as t
+
+import pytest
+from markupsafe import Markup
+
+import htpy as h
+
+if t.TYPE_CHECKING:
+    from .conftest import RenderFixture
+
+
+def test_render_once(render: RenderFixture) -> None:
+    calls: list[str] = []
+
+    @h.render_once_per_args
+    def icon(name: str) -> h.Element:
+        calls.append(name)
+        return h.i(class_=name)[name]
+
+    node = h.div[icon("edit"), (icon("edit") for _ in range(2)), icon("delete")]
+    assert render(node) == [
+        "<div>",
+        '<i class="edit">',
+        "edit",
+        "</i>",
+        '<i class="edit">edit</i>',
+        '<i class="edit">edit</i>',
+        '<i class="delete">',
+        "delete",
+        "</i>",
+        "</div>",
+    ]
+    assert calls == ["edit", "delete"]
+
+
+def test_not_kept_between_renderings() -> None:
+    calls: list[str] = []
+
+    @h.render_once_per_args
+    def component(value: str) -> str:
+        calls.append(value)
+        return value
+
+    node = h.div[component("a"), component("a")]
+    assert str(node) == "<div>aa</div>"
+    assert str(node) == "<div>aa</div>"
+    assert calls == ["a", "a"]
+
+
+def test_markup_and_str_arguments() -> None:
+    @h.render_once_per_args
+    def component(label: str) -> h.Element:
+        return h.b[label]
+
+    node = h.div[
+        component(Markup("<i>x</i>")),
+        component("<i>x</i>"),
+        component(label=Markup("<i>y</i>")),
+        component(label="<i>y</i>"),
+    ]
+    assert str(node) == (
+        "<div><b><i>x</i></b><b>&lt;i&gt;x&lt;/i&gt;</b>"
+        "<b><i>y</i></b><b>&lt;i&gt;y&lt;/i&gt;</b></div>"
+    )
+
+
+def test_bool_and_int_arguments() -> None:
+    @h.render_once_per_args
+    def component(value: bool | int) -> h.Element:
+        return h.b[value]
+
+    node = h.div[component(1), component(True), component(value=True), component(value=1)]
+    assert str(node) == "<div><b>1</b><b></b><b></b><b>1</b></div>"
+
+
+def test_root() -> None:
+    calls: list[str] = []
+
+    @h.render_once_per_args
+    def component(value: str) -> h.Element:
+        calls.append(value)
+        return h.b[value]
+
+    assert str(component("a")) == "<b>a</b>"
+    assert list(component("a").iter_chunks()) == ["<b>", "a", "</b>"]
+    assert calls == ["a", "a"]
+
+
+def test_keyword_arguments() -> None:
+    calls: list[str] = []
+
+    @h.render_once_per_args
+    def component(*, value: str) -> str:
+        calls.append(value)
+        return value
+
+    assert str(h.div[component(value="a"), component(value="a"), component(value="b")]) == (
+        "<div>aab</div>"
+    )
+    assert calls == ["a", "b"]
+
+
+def test_context(render: RenderFixture) -> None:
+    theme: h.Context[str] = h.Context("theme", default="light")
+    calls: list[str] = []
+
+    @h.render_once_per_args
+    def button(label: str) -> h.Renderable:
+        @theme.consumer
+        def themed(value: str) -> h.Element:
+            calls.append(value)
+            return h.button(class_=value)[label]
+
+        return themed()
+
+    node = h.div[
+        button("a"),
+        theme.provider("dark", [button("a"), button("a")]),
+        button("a"),
+    ]
+    assert render(node) == [
+        "<div>",
+        '<button class="light">',
+        "a",
+        "</button>",
+        '<button class="dark">',
+        "a",
+        "</button>",
+        '<button class="dark">a</button>',
+        '<button class="light">a</button>',
+        "</div>",
+    ]
+    assert calls == ["light", "dark"]
+
+
+def test_provider_root() -> None:
+    ctx: h.Context[str] = h.Context("ctx")
+    calls: list[str] = []
+
+    @h.render_once_per_args
+    def component() -> str:
+        calls.append("called")
+        return "x"
+
+    assert str(ctx.provider("value", [component(), component()])) == "xx"
+    assert calls == ["called"]
+
+
+def test_async(render_async: RenderFixture) -> None:
+    calls: list[str] = []
+
+    async def child() -> str:
+        return "async"
+
+    @h.render_once_per_args
+    def component() -> h.Element:
+        calls.append("called")
+        return h.i[child()]
+
+    assert render_async(h.div[component(), component()]) == [
+        "<div>",
+        "<i>",
+        "async",
+        "</i>",
+        "<i>async</i>",
+        "</div>",
+    ]
+    assert calls == ["called"]
+
+
+def test_unhashable_arguments() -> None:
+    @h.render_once_per_args
+    def component(items: list[str]) -> str:
+        return ""
+
+    with pytest.raises(TypeError, match="unhashable"):
+        component(["a"])
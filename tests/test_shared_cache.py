@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+import sys
+import time
+import typing as t
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import htpy as h
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+
+
+@pytest.fixture
+def backend(tmp_path: Path) -> Iterator[h.SharedMemoryCacheBackend]:
+    backend = h.SharedMemoryCacheBackend(tmp_path / "cache", size=1024 * 1024)
+    yield backend
+    backend.close()
+
+
+def test_get_set(backend: h.SharedMemoryCacheBackend) -> None:
+    assert backend.get("key") is None
+    backend.set("key", b"value", None)
+    assert backend.get("key") == b"value"
+    backend.set("key", b"new", None)
+    assert backend.get("key") == b"new"
+    backend.set("empty", b"", None)
+    assert backend.get("empty") == b""
+
+
+def test_ttl(backend: h.SharedMemoryCacheBackend, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    backend.set("key", b"value", 10)
+    now += 5
+    assert backend.get("key") == b"value"
+    now += 6
+    assert backend.get("key") is None
+
+
+def test_too_large(backend: h.SharedMemoryCacheBackend) -> None:
+    backend.set("key", b"x" * (backend.max_entry_size + 1), None)
+    assert backend.get("key") is None
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    # A single set with two slots.
+    backend = h.SharedMemoryCacheBackend(tmp_path / "cache", size=400, max_entry_size=100, ways=2)
+    assert backend.num_sets == 1
+
+    backend.set("a", b"a", None)
+    backend.set("b", b"b", None)
+    assert backend.get("a") == b"a"
+    backend.set("c", b"c", None)
+
+    assert backend.get("a") == b"a"
+    assert backend.get("b") is None
+    assert backend.get("c") == b"c"
+    backend.close()
+
+
+def test_clear(backend: h.SharedMemoryCacheBackend) -> None:
+    backend.set("key", b"value", None)
+    backend.clear()
+    assert backend.get("key") is None
+
+
+def test_other_settings(backend: h.SharedMemoryCacheBackend) -> None:
+    backend.set("key", b"value", None)
+    other = h.SharedMemoryCacheBackend(backend.path, size=1024 * 1024, max_entry_size=1024)
+    with pytest.raises(ValueError, match="created with other settings"):
+        other.get("key")
+
+
+def test_pickle(backend: h.SharedMemoryCacheBackend) -> None:
+    backend.set("key", b"value", None)
+    restored = pickle.loads(pickle.dumps(backend))
+    assert restored.get("key") == b"value"
+    restored.close()
+
+
+def test_cache_node(backend: h.SharedMemoryCacheBackend) -> None:
+    assert str(h.cache("key", backend=backend)[h.p["<cached>"]]) == "<p>&lt;cached&gt;</p>"
+    assert str(h.cache("key", backend=backend)["not cached"]) == "<p>&lt;cached&gt;</p>"
+
+
+def test_threads(backend: h.SharedMemoryCacheBackend) -> None:
+    def work(index: int) -> None:
+        for i in range(200):
+            key = f"key{i % 20}"
+            backend.set(key, key.encode() * (index + 1), None)
+            value = backend.get(key)
+            assert value is None or value == key.encode() * (len(value) // len(key))
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(work, range(4)))
+
+
+def _write_and_read(backend: h.SharedMemoryCacheBackend, index: int) -> list[bytes | None]:
+    # Readers must never see partially written entries.
+    key = "shared"
+    for i in range(500):
+        value = bytes([index]) * (1000 + i)
+        backend.set(key, value, None)
+        read = backend.get(key)
+        if read is not None:
+            assert len(set(read)) == 1, "torn read"
+    backend.set(f"process{index}", f"value{index}".encode(), None)
+    return [backend.get(f"process{i}") for i in range(index + 1)]
+
+
+def test_processes(backend: h.SharedMemoryCacheBackend) -> None:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(4, mp_context=context) as executor:
+        results = list(executor.map(_write_and_read, [backend] * 4, range(4)))
+
+    for index in range(4):
+        assert backend.get(f"process{index}") == f"value{index}".encode()
+    assert results[0] == [b"value0"]
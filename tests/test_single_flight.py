@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import htpy as h
+
+if t.TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    import pytest
+
+
+def _render_concurrently(count: int, func: Callable[[], object]) -> list[str]:
+    barrier = threading.Barrier(count)
+
+    def render() -> str:
+        barrier.wait()
+        return str(func())
+
+    with ThreadPoolExecutor(count) as executor:
+        return list(executor.map(lambda _: render(), range(count)))
+
+
+def _slow(calls: list[str], delay: float = 0.2) -> Callable[[], str]:
+    def slow() -> str:
+        calls.append("called")
+        count = len(calls)
+        time.sleep(delay)
+        return f"rendered {count}"
+
+    return slow
+
+
+def test_cache_threads() -> None:
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+    slow = _slow(calls)
+
+    results = _render_concurrently(8, lambda: h.cache("key", backend=backend)[h.div[slow]])
+    assert results == ["<div>rendered 1</div>"] * 8
+    assert calls == ["called"]
+
+
+def test_cache_threads_inline_backends(tmp_path: Path) -> None:
+    assert h.FileCacheBackend(tmp_path) == h.FileCacheBackend(str(tmp_path))
+    calls: list[str] = []
+    slow = _slow(calls)
+
+    results = _render_concurrently(
+        8, lambda: h.cache("key", backend=h.FileCacheBackend(tmp_path))[h.div[slow]]
+    )
+    assert results == ["<div>rendered 1</div>"] * 8
+    assert calls == ["called"]
+
+
+def test_cache_tasks() -> None:
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+
+    async def slow() -> str:
+        calls.append("called")
+        await asyncio.sleep(0.05)
+        return "async"
+
+    async def render() -> str:
+        node = h.cache("key", backend=backend)[h.div[lambda: slow()]]
+        return "".join([chunk async for chunk in node.aiter_chunks()])
+
+    async def main() -> list[str]:
+        return await asyncio.gather(*(render() for _ in range(8)))
+
+    assert asyncio.run(main()) == ["<div>async</div>"] * 8
+    assert calls == ["called"]
+
+
+def test_cache_sync_leader_async_waiter() -> None:
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+    slow = _slow(calls)
+    started = threading.Event()
+
+    def leader() -> str:
+        def child() -> str:
+            started.set()
+            return slow()
+
+        return str(h.cache("key", backend=backend)[child])
+
+    async def waiter() -> str:
+        node = h.cache("key", backend=backend)["not rendered"]
+        return "".join([chunk async for chunk in node.aiter_chunks()])
+
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(leader)
+        started.wait()
+        assert asyncio.run(waiter()) == "rendered 1"
+        assert future.result() == "rendered 1"
+
+
+def test_cache_timeout() -> None:
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+    slow = _slow(calls, delay=0.5)
+
+    results = _render_concurrently(
+        3, lambda: h.cache("key", backend=backend, wait_timeout=0.05)[slow]
+    )
+    assert len(calls) == 3
+    assert sorted(results) == ["rendered 1", "rendered 2", "rendered 3"]
+
+
+def test_cache_leader_fails() -> None:
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+    lock = threading.Lock()
+
+    def child() -> str:
+        with lock:
+            calls.append("called")
+            first = len(calls) == 1
+        time.sleep(0.1)
+        if first:
+            raise ValueError("first rendering fails")
+        return "ok"
+
+    def render() -> str:
+        try:
+            return str(h.cache("key", backend=backend)[child])
+        except ValueError:
+            return "error"
+
+    results = _render_concurrently(4, render)
+    assert sorted(results) == ["error", "ok", "ok", "ok"]
+
+
+def test_cache_same_key_nested() -> None:
+    backend = h.LRUCacheBackend()
+    node = h.cache("key", backend=backend)[
+        h.div[lambda: h.cache("key", backend=backend, wait_timeout=60)["inner"]]
+    ]
+    assert str(node) == "<div>inner</div>"
+
+
+def test_cache_same_key_nested_async() -> None:
+    backend = h.LRUCacheBackend()
+    node = h.cache("key", backend=backend)[
+        h.div[lambda: h.cache("key", backend=backend, wait_timeout=60)["inner"]]
+    ]
+
+    async def render() -> str:
+        return "".join([chunk async for chunk in node.aiter_chunks()])
+
+    assert asyncio.run(render()) == "<div>inner</div>"
+
+
+def _wait_for(predicate: Callable[[], bool]) -> None:
+    for _ in range(200):
+        if predicate():
+            return
+        time.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_stale_while_revalidate(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    backend = h.LRUCacheBackend()
+    version = "v1"
+    calls: list[str] = []
+
+    def child() -> str:
+        calls.append(version)
+        return version
+
+    def node() -> h.CachedFragment:
+        return h.cache("key", ttl=10, stale_while_revalidate=60, backend=backend)[child]
+
+    assert str(node()) == "v1"
+
+    now += 20
+    version = "v2"
+    # The stale entry is served while it is refreshed in the background.
+    assert str(node()) == "v1"
+    _wait_for(lambda: calls == ["v1", "v2"])
+    _wait_for(lambda: str(node()) == "v2")
+
+    # The stale entry is not used after stale_while_revalidate.
+    now += 100
+    version = "v3"
+    assert str(node()) == "v3"
+
+
+def test_stale_while_revalidate_async(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    backend = h.LRUCacheBackend()
+    calls: list[str] = []
+
+    async def child() -> str:
+        calls.append("called")
+        return f"v{len(calls)}"
+
+    def node() -> h.CachedFragment:
+        return h.cache("key", ttl=10, stale_while_revalidate=60, backend=backend)[lambda: child()]
+
+    async def render() -> str:
+        return "".join([chunk async for chunk in node().aiter_chunks()])
+
+    async def main() -> list[str]:
+        nonlocal now
+        results = [await render()]
+        now += 20
+        results += await asyncio.gather(render(), render())
+        await asyncio.sleep(0.01)
+        results.append(await render())
+        return results
+
+    assert asyncio.run(main()) == ["v1", "v1", "v1", "v2"]
+    assert calls == ["called", "called"]
+
+
+def test_memoize_threads() -> None:
+    calls: list[str] = []
+    slow = _slow(calls)
+
+    @h.memoize
+    def component() -> h.Element:
+        return h.div[slow]
+
+    assert _render_concurrently(8, component) == ["<div>rendered 1</div>"] * 8
+    assert calls == ["called"]
+    assert component.cache_info().misses == 8
+
+
+def test_memoize_tasks() -> None:
+    calls: list[str] = []
+
+    async def slow() -> str:
+        calls.append("called")
+        await asyncio.sleep(0.05)
+        return "async"
+
+    @h.memoize
+    def component() -> h.Element:
+        return h.div[lambda: slow()]
+
+    async def render() -> str:
+        return "".join([chunk async for chunk in component().aiter_chunks()])
+
+    async def main() -> list[str]:
+        return await asyncio.gather(*(render() for _ in range(8)))
+
+    assert asyncio.run(main()) == ["<div>async</div>"] * 8
+    assert calls == ["called"]
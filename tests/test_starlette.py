@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import typing as t
+import zlib
 
 import pytest
 from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect
 from starlette.responses import HTMLResponse
 from starlette.routing import Route
 from starlette.testclient import TestClient
 
-from htpy import Element, h1, li, ul
-from htpy.starlette import HtpyResponse
+import htpy as h
+from htpy import Element, Slot, Template, cache_policy, fingerprint, flush, h1, li, ul
+from htpy.starlette import HtpyResponse, HtpySSEResponse, ServerSentEvent
 
 if t.TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from starlette.requests import Request
 
 
@@ -51,3 +57,524 @@ def test_streaming_response() -> None:
     response = client.get("/stream-response")
     assert response.headers["content-type"] == "text/html; charset=utf-8"
     assert response.content == b"<ul><li>0</li><li>1</li><li>2</li></ul>"
+
+
+def etag_client(**kwargs: t.Any) -> tuple[TestClient, list[str]]:
+    renders: list[str] = []
+
+    def content() -> Element:
+        renders.append("rendered")
+        return h1["Hello"]
+
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(content, **kwargs)
+
+    return TestClient(Starlette(routes=[Route("/", endpoint, methods=["GET", "POST"])])), renders
+
+
+def test_etag() -> None:
+    client, renders = etag_client(etag="v1", cache_control="max-age=60")
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v1"'
+    assert response.headers["cache-control"] == "max-age=60"
+    assert response.content == b"<h1>Hello</h1>"
+    assert renders == ["rendered"]
+
+
+@pytest.mark.parametrize("if_none_match", ['"v1"', 'W/"v1"', '"v0", "v1"', "*"])
+def test_etag_not_modified(if_none_match: str) -> None:
+    client, renders = etag_client(etag="v1", cache_control="max-age=60")
+
+    response = client.get("/", headers={"if-none-match": if_none_match})
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"v1"'
+    assert response.headers["cache-control"] == "max-age=60"
+    assert "content-type" not in response.headers
+    assert response.content == b""
+    assert renders == []
+
+
+def test_etag_modified() -> None:
+    client, renders = etag_client(etag='W/"v2"')
+
+    response = client.get("/", headers={"if-none-match": '"v1"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] == 'W/"v2"'
+    assert response.content == b"<h1>Hello</h1>"
+    assert renders == ["rendered"]
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "etag"),
+    [("gzip", '"v1-gzip"'), ("deflate", '"v1-deflate"'), ("identity", '"v1"')],
+)
+def test_etag_compressed(accept_encoding: str, etag: str) -> None:
+    client, renders = etag_client(etag="v1", compress=True)
+
+    response = client.get("/", headers={"accept-encoding": accept_encoding})
+    assert response.headers["etag"] == etag
+    assert response.content == b"<h1>Hello</h1>"
+
+    response = client.get("/", headers={"accept-encoding": accept_encoding, "if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert "content-encoding" not in response.headers
+    assert renders == ["rendered"]
+
+
+def test_etag_compressed_other_encoding() -> None:
+    client, renders = etag_client(etag="v1", compress=True)
+
+    response = client.get("/", headers={"accept-encoding": "gzip", "if-none-match": '"v1"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert response.headers["content-encoding"] == "gzip"
+
+    response = client.get(
+        "/", headers={"accept-encoding": "identity", "if-none-match": '"v1-gzip"'}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"v1"'
+    assert renders == ["rendered", "rendered"]
+
+
+def test_etag_other_methods() -> None:
+    client, _ = etag_client(etag="v1")
+    assert client.post("/", headers={"if-none-match": '"v1"'}).status_code == 200
+
+
+def test_etag_fingerprint() -> None:
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(ul[li["a"], li["b"]], etag=True)
+
+    client = TestClient(Starlette(routes=[Route("/", endpoint)]))
+    response = client.get("/")
+    etag = response.headers["etag"]
+    assert etag == f'"{fingerprint(ul[li["a"], li["b"]])}"'
+
+    assert client.get("/", headers={"if-none-match": etag}).status_code == 304
+
+
+def test_etag_fingerprint_lazy_node() -> None:
+    with pytest.raises(TypeError, match="can not be fingerprinted"):
+        HtpyResponse(ul[lambda: li["a"]], etag=True)
+
+
+def test_buffered_cache_policy() -> None:
+    def user_menu() -> Element:
+        cache_policy(max_age=60, private=True, vary=["Cookie"])
+        return li["menu"]
+
+    async def news() -> Element:
+        cache_policy(max_age=300, vary=["cookie", "Accept-Language"])
+        return li["news"]
+
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(ul[user_menu, news], headers={"vary": "Accept-Encoding"}, buffer=True)
+
+    response = TestClient(Starlette(routes=[Route("/", endpoint)])).get("/")
+    assert response.content == b"<ul><li>menu</li><li>news</li></ul>"
+    assert response.headers["cache-control"] == "private, max-age=60"
+    assert response.headers["vary"] == "Accept-Encoding, Cookie, Accept-Language"
+    assert response.headers["content-length"] == str(len(response.content))
+
+
+def test_buffered_explicit_cache_control() -> None:
+    def component() -> Element:
+        cache_policy(max_age=60)
+        return li["x"]
+
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(component, cache_control="no-cache", buffer=True)
+
+    response = TestClient(Starlette(routes=[Route("/", endpoint)])).get("/")
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_streaming_ignores_cache_policy() -> None:
+    def component() -> Element:
+        cache_policy(max_age=60)
+        return li["x"]
+
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(component)
+
+    response = TestClient(Starlette(routes=[Route("/", endpoint)])).get("/")
+    assert "cache-control" not in response.headers
+
+
+def compressed_client(**kwargs: t.Any) -> TestClient:
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(ul[(li[n] for n in range(100))], compress=True, **kwargs)
+
+    return TestClient(Starlette(routes=[Route("/", endpoint)]))
+
+
+@pytest.mark.parametrize("buffer", [False, True])
+def test_compress(buffer: bool) -> None:
+    response = compressed_client(buffer=buffer).get("/", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    # The test client decompresses the response.
+    assert response.content == str(ul[(li[n] for n in range(100))]).encode()
+    if buffer:
+        assert int(response.headers["content-length"]) < len(response.content)
+    else:
+        assert "content-length" not in response.headers
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip;q=0", "br"])
+def test_compress_not_accepted(accept_encoding: str) -> None:
+    response = compressed_client().get("/", headers={"accept-encoding": accept_encoding})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == str(ul[(li[n] for n in range(100))]).encode()
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "encoding"), [("deflate", "deflate"), ("gzip;q=0.5, deflate", "deflate")]
+)
+def test_compress_negotiation(accept_encoding: str, encoding: str) -> None:
+    response = compressed_client().get("/", headers={"accept-encoding": accept_encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert response.content == str(ul[(li[n] for n in range(100))]).encode()
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_compress_cached_precompressed_fragment_after_await(encoding: str) -> None:
+    backend = h.LRUCacheBackend()
+    text = "<p>repeated text</p>" * 20
+
+    async def footer() -> h.Renderable:
+        return h.cache("footer", precompress=True, backend=backend)[
+            h.footer[(h.p["Footer text"] for _ in range(50))]
+        ]
+
+    async def endpoint(request: Request) -> HtpyResponse:
+        return HtpyResponse(h.body[text, footer(), text], compress=True)
+
+    client = TestClient(Starlette(routes=[Route("/", endpoint)]))
+    expected = str(h.body[text, h.footer[(h.p["Footer text"] for _ in range(50))], text]).encode()
+    for _ in range(2):
+        response = client.get("/", headers={"accept-encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert response.content == expected
+
+
+def test_compress_flushes_at_await() -> None:
+    messages: list[bytes] = []
+    event = asyncio.Event()
+
+    async def slow_child() -> str:
+        # The content before this child has been sent.
+        assert messages
+        await event.wait()
+        return "slow"
+
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        if message["type"] == "http.response.body":
+            messages.append(message["body"])
+            event.set()
+
+    async def receive() -> t.MutableMapping[str, t.Any]:
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    response = HtpyResponse(h1["fast", slow_child()], compress=True)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    asyncio.run(response(scope, receive, send))
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decompressor.decompress(messages[0]) == b"<h1>fast"
+    assert decompressor.decompress(b"".join(messages[1:])) == b"slow</h1>"
+    assert decompressor.eof
+
+
+class ASGIResult(t.NamedTuple):
+    start: t.MutableMapping[str, t.Any]
+    bodies: list[bytes]
+
+
+def call_asgi(
+    response: HtpyResponse | HtpySSEResponse,
+    *,
+    method: str = "GET",
+    receive: t.Callable[[], t.Awaitable[t.MutableMapping[str, t.Any]]] | None = None,
+    spec_version: str = "2.3",
+) -> ASGIResult:
+    messages: list[t.MutableMapping[str, t.Any]] = []
+
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        messages.append(message)
+
+    async def wait_forever() -> t.MutableMapping[str, t.Any]:
+        await asyncio.Event().wait()
+        raise AssertionError
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "headers": [],
+        "asgi": {"spec_version": spec_version},
+    }
+    asyncio.run(response(scope, receive or wait_forever, send))
+    start, *bodies = messages
+    assert start["type"] == "http.response.start"
+    assert all(body["type"] == "http.response.body" for body in bodies)
+    assert [body.get("more_body", False) for body in bodies][-1:] == [False]
+    return ASGIResult(start, [body["body"] for body in bodies])
+
+
+def test_coalesce_chunks() -> None:
+    node = ul[[li[n] for n in range(1000)]]
+    result = call_asgi(HtpyResponse(node, send_size=4096))
+    assert b"".join(result.bodies) == str(node).encode()
+    assert len(result.bodies) == len(str(node)) // 4096 + 1
+    assert all(len(body) >= 4096 for body in result.bodies[:-1])
+
+
+def test_send_at_flush() -> None:
+    result = call_asgi(HtpyResponse(ul[li["a"], flush, li["b"]]))
+    assert result.bodies == [b"<ul><li>a</li>", b"<li>b</li></ul>"]
+
+
+def test_head_not_rendered() -> None:
+    def fail() -> Element:
+        raise AssertionError("rendered")
+
+    result = call_asgi(HtpyResponse(fail, etag="v1"), method="HEAD")
+    assert result.start["status"] == 200
+    assert (b"etag", b'"v1"') in result.start["headers"]
+    assert result.bodies == [b""]
+
+
+def test_disconnect_stops_rendering() -> None:
+    finished: list[bool] = []
+    disconnected = asyncio.Event()
+
+    async def receive() -> t.MutableMapping[str, t.Any]:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def slow() -> AsyncIterator[Element]:
+        try:
+            yield li["a"]
+            disconnected.set()
+            await asyncio.sleep(10)
+            yield li["b"]
+        finally:
+            finished.append(True)
+
+    messages: list[t.MutableMapping[str, t.Any]] = []
+
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        messages.append(message)
+
+    async def run() -> None:
+        scope = {"type": "http", "method": "GET", "headers": []}
+        await asyncio.wait_for(HtpyResponse(ul[slow()])(scope, receive, send), 5)
+
+    asyncio.run(run())
+    assert finished == [True]
+    assert b"".join(message.get("body", b"") for message in messages) == b"<ul><li>a</li>"
+
+
+def test_disconnect_spec_2_4() -> None:
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        if message["type"] == "http.response.body":
+            raise OSError("disconnected")
+
+    async def receive() -> t.MutableMapping[str, t.Any]:
+        raise AssertionError("receive should not be called")
+
+    scope = {"type": "http", "method": "GET", "headers": [], "asgi": {"spec_version": "2.4"}}
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(HtpyResponse(ul[li["a"]])(scope, receive, send))
+
+
+def test_auto_buffer_sync() -> None:
+    def component() -> Element:
+        cache_policy(max_age=60)
+        return li["a"]
+
+    result = call_asgi(HtpyResponse(ul[component], buffer="auto"))
+    assert result.bodies == [b"<ul><li>a</li></ul>"]
+    assert (b"content-length", b"19") in result.start["headers"]
+    assert (b"cache-control", b"max-age=60") in result.start["headers"]
+
+
+def test_auto_buffer_streams_at_await() -> None:
+    async def slow() -> Element:
+        return li["b"]
+
+    result = call_asgi(HtpyResponse(ul[li["a"], slow()], buffer="auto"))
+    assert result.bodies == [b"<ul><li>a</li>", b"<li>b</li></ul>"]
+    assert b"content-length" not in dict(result.start["headers"])
+
+
+def test_auto_buffer_streams_above_buffer_size() -> None:
+    node = ul[[li[n] for n in range(1000)]]
+    result = call_asgi(HtpyResponse(node, buffer="auto", buffer_size=1024, send_size=512))
+    assert b"".join(result.bodies) == str(node).encode()
+    assert len(result.bodies) > 1
+    assert b"content-length" not in dict(result.start["headers"])
+
+
+def test_auto_buffer_compressed() -> None:
+    node = ul[[li[n] for n in range(100)]]
+    response = HtpyResponse(node, buffer="auto", compress=True)
+    messages: list[t.MutableMapping[str, t.Any]] = []
+
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        messages.append(message)
+
+    async def receive() -> t.MutableMapping[str, t.Any]:
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(response(scope, receive, send))
+    start, body = messages
+    assert dict(start["headers"])[b"content-length"] == str(len(body["body"])).encode()
+    assert zlib.decompress(body["body"], 16 + zlib.MAX_WBITS) == str(node).encode()
+
+
+def test_buffer_spooled_to_file() -> None:
+    node = ul[[li[n] for n in range(1000)]]
+    result = call_asgi(HtpyResponse(node, buffer=True, buffer_size=1024, send_size=4096))
+    content = str(node).encode()
+    assert b"".join(result.bodies) == content
+    assert len(result.bodies) == len(content) // 4096 + 1
+    assert (b"content-length", str(len(content)).encode()) in result.start["headers"]
+
+
+def test_static_shell_sent_before_dynamic_work() -> None:
+    messages: list[t.MutableMapping[str, t.Any]] = []
+    page = Template(h.html[h.head[h.title["Shop"]], h.flush, h.body[Slot("content")]])
+
+    def content() -> Element:
+        assert [m["body"] for m in messages[1:]] == [
+            b"<!doctype html><html><head><title>Shop</title></head>"
+        ]
+        return h1["Hi"]
+
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        messages.append(message)
+
+    async def receive() -> t.MutableMapping[str, t.Any]:
+        await asyncio.Event().wait()
+        raise AssertionError
+
+    scope = {"type": "http", "method": "GET", "headers": []}
+    asyncio.run(HtpyResponse(page.render(content=content))(scope, receive, send))
+    assert [m["body"] for m in messages[1:]] == [
+        b"<!doctype html><html><head><title>Shop</title></head>",
+        b"<body><h1>Hi</h1></body></html>",
+    ]
+
+
+def test_sse_events() -> None:
+    async def events() -> AsyncIterator[h.Node | ServerSentEvent]:
+        yield h.li["a"]
+        await asyncio.sleep(0)
+        yield ServerSentEvent(h.li["b"], event="item", id="2", retry=500)
+
+    result = call_asgi(HtpySSEResponse(events()))
+    headers = dict(result.start["headers"])
+    assert headers[b"content-type"] == b"text/event-stream; charset=utf-8"
+    assert headers[b"cache-control"] == b"no-cache"
+    assert b"".join(result.bodies) == (
+        b"data: <li>a</li>\n\nevent: item\nid: 2\nretry: 500\ndata: <li>b</li>\n\n"
+    )
+
+
+def test_sse_line_breaks() -> None:
+    async def events() -> AsyncIterator[h.Node]:
+        yield h.pre["a\r\nb\rc\n\u2028d"]
+
+    result = call_asgi(HtpySSEResponse(events()))
+    assert b"".join(result.bodies).decode() == (
+        "data: <pre>a\ndata: b\ndata: c\ndata: \u2028d</pre>\n\n"
+    )
+
+
+@pytest.mark.parametrize("field", [{"id": "a\nb"}, {"event": "a\rb"}, {"id": "a\0"}])
+def test_sse_invalid_field(field: dict[str, t.Any]) -> None:
+    async def events() -> AsyncIterator[ServerSentEvent]:
+        yield ServerSentEvent("x", **field)
+
+    with pytest.raises(ValueError, match="line breaks"):
+        call_asgi(HtpySSEResponse(events()))
+
+
+def test_sse_retry_and_ping() -> None:
+    async def events() -> AsyncIterator[h.Node]:
+        await asyncio.sleep(0.2)
+        yield "a"
+
+    result = call_asgi(HtpySSEResponse(events(), retry=1000, ping=0.05))
+    assert result.bodies[0] == b"retry: 1000\n\n"
+    assert b": ping\n\n" in result.bodies
+    assert result.bodies[-2:] == [b"data: a\n\n", b""]
+
+
+def test_sse_coalesce() -> None:
+    async def events() -> AsyncIterator[h.Node]:
+        for n in range(3):
+            yield n
+        await asyncio.sleep(0.01)
+        yield 3
+
+    result = call_asgi(HtpySSEResponse(events()))
+    assert result.bodies == [b"data: 0\n\ndata: 1\n\ndata: 2\n\n", b"data: 3\n\n", b""]
+
+    result = call_asgi(HtpySSEResponse(events(), send_size=1))
+    assert result.bodies == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n", b"data: 3\n\n", b""]
+
+    result = call_asgi(HtpySSEResponse(events(), coalesce=1))
+    assert result.bodies == [b"data: 0\n\ndata: 1\n\ndata: 2\n\ndata: 3\n\n", b""]
+
+
+def test_sse_disconnect_stops_rendering() -> None:
+    finished: list[bool] = []
+    disconnected = asyncio.Event()
+
+    async def receive() -> t.MutableMapping[str, t.Any]:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def events() -> AsyncIterator[h.Node]:
+        try:
+            yield "a"
+            disconnected.set()
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            finished.append(True)
+
+    messages: list[t.MutableMapping[str, t.Any]] = []
+
+    async def send(message: t.MutableMapping[str, t.Any]) -> None:
+        messages.append(message)
+
+    async def run() -> None:
+        scope = {"type": "http", "method": "GET", "headers": []}
+        await asyncio.wait_for(HtpySSEResponse(events(), ping=None)(scope, receive, send), 5)
+
+    asyncio.run(run())
+    assert finished == [True]
+    assert [message.get("body") for message in messages[1:]] == [b"data: a\n\n"]
+
+
+def test_sse_head() -> None:
+    async def events() -> AsyncIterator[h.Node]:
+        raise AssertionError("rendered")
+        yield
+
+    result = call_asgi(HtpySSEResponse(events()), method="HEAD")
+    assert result.bodies == [b""]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import gc
+import typing as t
+
+import markupsafe
+import pytest
+
+import htpy as h
+from htpy import _static_cache
+from htpy._templates import FilledTemplate
+
+if t.TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from .conftest import RenderFixture
+
+
+@pytest.fixture(autouse=True)
+def static_cache() -> Generator[None, None, None]:
+    h.enable_static_cache()
+    yield
+    h.disable_static_cache()
+
+
+def test_cached(render: RenderFixture) -> None:
+    navbar = h.static(h.nav(".navbar")[h.ul[h.li[h.a(href="/")["Home"]], h.li["<About>"]]])
+
+    assert (
+        str(navbar)
+        == '<nav class="navbar"><ul><li><a href="/">Home</a></li><li>&lt;About&gt;</li></ul></nav>'
+    )
+    assert render(navbar) == [
+        '<nav class="navbar"><ul><li><a href="/">Home</a></li><li>&lt;About&gt;</li></ul></nav>'
+    ]
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        None,
+        True,
+        False,
+        "text",
+        42,
+        markupsafe.Markup("<br>"),
+        ("a", ("b", h.i["c"])),
+        h.fragment["a", h.comment("b")],
+        h.img(src="a.png"),
+        FilledTemplate(["<b>", "</b>"], ("static",)),
+    ],
+)
+def test_static_children(node: h.Node) -> None:
+    element = h.static(h.div[node])
+    str(element)
+    assert isinstance(_static_cache.entries.get(element), str)
+
+
+def test_html_element(render: RenderFixture) -> None:
+    element = h.static(h.html[h.head[h.title["hi"]]])
+    str(element)
+    assert render(element) == ["<!doctype html><html><head><title>hi</title></head></html>"]
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        ["list", "is", "mutable"],
+        lambda: "callable",
+        h.fragment[lambda: "callable"],
+        h.div[lambda: "callable"],
+    ],
+)
+def test_dynamic_children(node: h.Node) -> None:
+    element = h.static(h.div[node])
+    str(element)
+    assert str(element) == str(h.div[node])
+    assert _static_cache.entries.get(element) is _static_cache.NOT_STATIC
+
+
+def test_generator_child_is_not_cached() -> None:
+    element = h.static(h.ul[(h.li[x] for x in "ab")])
+    assert str(element) == "<ul><li>a</li><li>b</li></ul>"
+
+    with pytest.raises(RuntimeError, match="Generator has already been consumed"):
+        str(element)
+
+
+def test_context_consumer_is_not_cached() -> None:
+    ctx: h.Context[str] = h.Context("ctx")
+    element = h.static(h.div[ctx.consumer(lambda value: value)()])
+
+    assert str(ctx.provider("a", element)) == "<div>a</div>"
+    assert str(ctx.provider("b", element)) == "<div>b</div>"
+    assert str(ctx.provider("c", element)) == "<div>c</div>"
+
+
+def test_nested_elements_not_cached_separately() -> None:
+    child = h.span["child"]
+    parent = h.static(h.div[child])
+    str(parent)
+
+    assert isinstance(_static_cache.entries.get(parent), str)
+    assert _static_cache.entries.get(child) is _static_cache.MARKED
+
+
+def test_static_elements_in_dynamic_node(render: RenderFixture) -> None:
+    header = h.header["header"]
+    page = h.static(h.body[header, lambda: "dynamic", [h.footer["footer"]]])
+
+    assert render(page) == [
+        "<body>",
+        "<header>header</header>",
+        "dynamic",
+        "<footer>footer</footer>",
+        "</body>",
+    ]
+    assert _static_cache.entries.get(page) is _static_cache.NOT_STATIC
+    assert isinstance(_static_cache.entries.get(header), str)
+
+
+def test_unmarked_elements_not_tracked() -> None:
+    child = h.span["x"]
+    element = h.div[child]
+    str(element)
+    str(element)
+    assert list(element.iter_chunks()) == ["<div>", "<span>", "x", "</span>", "</div>"]
+    assert element not in _static_cache.entries
+    assert child not in _static_cache.entries
+
+
+def test_static_returns_node() -> None:
+    node = (h.div["a"], h.fragment[h.p["b"]])
+    assert h.static(node) is node
+
+
+def test_max_bytes() -> None:
+    h.enable_static_cache(max_bytes=0)
+    element = h.static(h.div["hi"])
+    assert str(element) == "<div>hi</div>"
+    assert _static_cache.entries.get(element) is _static_cache.CACHE_FULL
+
+
+def test_memory_released() -> None:
+    used_bytes = _static_cache.state.used_bytes
+    element = h.static(h.div["x" * 1000])
+    str(element)
+    assert _static_cache.state.used_bytes > used_bytes + 1000
+
+    del element
+    gc.collect()
+    assert _static_cache.state.used_bytes == used_bytes
+
+
+def test_disabled() -> None:
+    h.disable_static_cache()
+    element = h.static(h.div["hi"])
+    str(element)
+    assert list(element.iter_chunks()) == ["<div>", "hi", "</div>"]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import typing as t
+
+import markupsafe
+import pytest
+
+import htpy as h
+from htpy import Slot, Template
+from htpy._compression import PrecompressedChunk
+from htpy._flush import FLUSH_CHUNK
+
+if t.TYPE_CHECKING:
+    from .conftest import RenderFixture
+
+
+row = Template(
+    h.tr[
+        h.td[Slot("name")],
+        h.td(class_=Slot("cls"), data_qty=Slot("qty"))[Slot("qty")],
+    ]
+)
+
+
+def test_render(render: RenderFixture) -> None:
+    assert render(row.render(name="<Chair>", cls="a b", qty=3)) == [
+        "<tr><td>",
+        "&lt;Chair&gt;",
+        '</td><td class="a b" data-qty="3">',
+        "3",
+        "</td></tr>",
+    ]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        {"name": "a", "cls": "b", "qty": 1},
+        {"name": '"<&>', "cls": '"<&>', "qty": '"<&>'},
+        {"name": markupsafe.Markup("<b>x</b>"), "cls": markupsafe.Markup("<b>"), "qty": 2},
+        {"name": h.b["bold"], "cls": "x", "qty": 0},
+        {"name": ["a", h.i["b"], None, False], "cls": "x", "qty": -1},
+        {"name": "a", "cls": "", "qty": ""},
+        {"name": "a", "cls": None, "qty": None},
+        {"name": "a", "cls": False, "qty": True},
+        {"name": "a", "cls": ["a", {"b": True, "c": False}], "qty": 1},
+        {"name": "a", "cls": {"b": False}, "qty": 1},
+    ],
+)
+def test_matches_elements(values: dict[str, t.Any]) -> None:
+    expected = h.tr[
+        h.td[values["name"]],
+        h.td(class_=values["cls"], data_qty=values["qty"])[values["qty"]],
+    ]
+    assert str(row.render(**values)) == str(expected)
+
+
+def test_f_string(render: RenderFixture) -> None:
+    template = Template(h.p[f"Hello {Slot('name')}!"])
+    assert render(template.render(name="<World>")) == ["<p>Hello &lt;World&gt;!</p>"]
+
+
+def test_slot_used_as_child_node_and_text() -> None:
+    template = Template(h.a(href=Slot("url"))[Slot("url")])
+    assert str(template.render(url="/a?b&c")) == '<a href="/a?b&amp;c">/a?b&amp;c</a>'
+
+
+def test_context_value(render: RenderFixture) -> None:
+    ctx: h.Context[str] = h.Context("ctx")
+    template = Template(h.div[Slot("content")])
+    filled = template.render(content=ctx.consumer(lambda value: value)())
+    assert render(ctx.provider("from context", filled)) == ["<div>", "from context", "</div>"]
+
+
+def test_async_value(render_async: RenderFixture) -> None:
+    async def content() -> str:
+        return "async"
+
+    template = Template(h.div[Slot("content")])
+    assert render_async(template.render(content=content())) == ["<div>", "async", "</div>"]
+
+
+def test_no_slots() -> None:
+    template = Template(h.div["static"])
+    assert str(template.render()) == "<div>static</div>"
+
+
+def test_missing_and_unexpected_values() -> None:
+    with pytest.raises(TypeError, match=r"missing: \['cls', 'qty'\], unexpected: \['other'\]"):
+        row.render(name="a", other="b")
+
+
+def test_invalid_child_value() -> None:
+    with pytest.raises(TypeError, match="is not a valid child element"):
+        row.render(name=b"bytes", cls="a", qty=1)
+
+
+def test_attributes_around_slots() -> None:
+    template = Template(h.input(id="a", class_=Slot("cls"), disabled=Slot("disabled"), name="b"))
+    assert str(template.render(cls="", disabled=False)) == '<input id="a" name="b">'
+    assert (
+        str(template.render(cls="c", disabled=True)) == '<input id="a" class="c" disabled name="b">'
+    )
+
+
+@pytest.mark.parametrize("value", [1.5, ["a"], b"bytes"])
+def test_invalid_attribute_value(value: t.Any) -> None:
+    template = Template(h.div(title=Slot("title")))
+    with pytest.raises(TypeError, match="must be a string or an integer"):
+        template.render(title=value)
+
+
+@pytest.mark.parametrize("value", [None, True, False, 1.5, ["a"]])
+def test_invalid_text_value(value: t.Any) -> None:
+    template = Template(h.a(href=f"/users/{Slot('id')}"))
+    with pytest.raises(TypeError, match="must be a string or an integer"):
+        template.render(id=value)
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        h.div[lambda: "callable"],
+        h.div[(x for x in ["generator"])],
+        h.div[Slot("name").__str__().upper()],
+    ],
+)
+def test_invalid_template(node: h.Node) -> None:
+    with pytest.raises(ValueError, match="Template|Slots"):
+        Template(node)
+
+
+def test_invalid_slot_name() -> None:
+    with pytest.raises(ValueError, match="valid identifiers"):
+        Slot("not valid")
+
+
+def test_repr() -> None:
+    assert repr(row) == "<Template ['cls', 'name', 'qty']>"
+    assert repr(page) == "<Template ['content']>"
+    assert repr(Slot("name")) == "<Slot 'name'>"
+
+
+page = Template(
+    h.html[
+        h.head[h.title["Shop"], h.link(rel="stylesheet", href="/app.css")],
+        h.flush,
+        h.body[Slot("content")],
+    ]
+)
+
+
+def test_flush(render: RenderFixture) -> None:
+    assert render(page.render(content="x")) == [
+        '<!doctype html><html><head><title>Shop</title><link rel="stylesheet" href="/app.css">'
+        "</head>",
+        "",
+        "<body>",
+        "x",
+        "</body></html>",
+    ]
+
+
+def test_flush_chunk() -> None:
+    chunks = list(page.render(content="x").iter_chunks())
+    assert chunks[1] is FLUSH_CHUNK
+
+
+def test_static_shell_precompressed() -> None:
+    shell = Template(h.html[h.head[h.meta(content="x" * 300)], h.flush, h.body[Slot("content")]])
+    first, second = (list(shell.render(content=n).iter_chunks()) for n in range(2))
+    assert isinstance(first[0], PrecompressedChunk)
+    assert first[0] is second[0]
+
+
+def test_flush_after_text_slot_not_precompressed() -> None:
+    template = Template(h.head[h.meta(content=Slot("description")), h.flush])
+    chunks = list(template.render(description="x" * 300).iter_chunks())
+    assert chunks[0] == f'<head><meta content="{"x" * 300}">'
+    assert not isinstance(chunks[0], PrecompressedChunk)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import htpy
+from htpy import Context, div, li, ul
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+number_ctx: Context[int] = Context("number_ctx")
+
+
+@number_ctx.consumer
+def number(value: int) -> int:
+    return value
+
+
+def test_concurrent_rendering() -> None:
+    def page(n: int) -> str:
+        def items() -> Iterator[htpy.Element]:
+            for _ in range(100):
+                yield li[number()]
+
+        return str(number_ctx.provider(n, ul[items()]))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(page, range(200)))
+
+    assert results == [f"<ul>{f'<li>{n}</li>' * 100}</ul>" for n in range(200)]
+
+
+def test_generator_consumed_in_other_thread() -> None:
+    node = div[(x for x in "abc")]
+    assert str(node) == "<div>abc</div>"
+
+    errors: list[BaseException] = []
+
+    def render() -> None:
+        try:
+            str(node)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=render)
+    thread.start()
+    thread.join()
+
+    assert len(errors) == 1
+    assert str(errors[0]) == "Generator has already been consumed"
+
+
+def test_dynamic_element_cache() -> None:
+    assert htpy.my_element is htpy.my_element
+
+
+def test_dynamic_element_invalid_name() -> None:
+    with pytest.raises(AttributeError, match="html elements must have all lowercase names"):
+        htpy.MyElement  # noqa: B018
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import typing as t
+
 import pytest
+from markupsafe import Markup
 
 import htpy as h
 
+if t.TYPE_CHECKING:
+    from .conftest import RenderFixture
+
 
 @h.with_children
 def example_with_children(
@@ -32,3 +38,120 @@ def example_with_children(
 )
 def test_with_children_repr(component: h.Renderable, expected: str) -> None:
     assert repr(component) == expected
+
+
+def test_precompiled(render: RenderFixture) -> None:
+    calls: list[str] = []
+
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node, *, title: str) -> h.Renderable:
+        calls.append(title)
+        return h.html[h.head[h.title[title]], h.body[h.main[children], h.footer["footer"]]]
+
+    assert render(layout(title="<Title>")[h.p["a"], "b"]) == [
+        "<!doctype html><html><head><title>&lt;Title&gt;</title></head><body><main>",
+        "<p>",
+        "a",
+        "</p>",
+        "b",
+        "</main><footer>footer</footer></body></html>",
+    ]
+    assert str(layout(title="<Title>")["c"]) == (
+        "<!doctype html><html><head><title>&lt;Title&gt;</title></head><body>"
+        "<main>c</main><footer>footer</footer></body></html>"
+    )
+    assert str(layout(title="Other")["d"]) == (
+        "<!doctype html><html><head><title>Other</title></head><body>"
+        "<main>d</main><footer>footer</footer></body></html>"
+    )
+    assert calls == ["<Title>", "Other"]
+
+
+def test_precompiled_without_children() -> None:
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node) -> h.Renderable:
+        return h.div[children]
+
+    assert str(layout) == "<div></div>"
+    assert str(layout["x"]) == "<div>x</div>"
+
+
+@pytest.mark.parametrize(
+    "func",
+    [
+        # Children tested.
+        lambda children: h.div[children or "empty"],
+        # Children rendered twice.
+        lambda children: h.div[children, children],
+        # Children not rendered.
+        lambda children: h.div["static"],
+        # Children converted to a string.
+        lambda children: h.div[str(children)],
+        # Dynamic content.
+        lambda children: h.div[lambda: "callable", children],
+    ],
+)
+def test_precompiled_fallback(func: t.Callable[[h.Node], h.Renderable]) -> None:
+    layout = h.with_children(precompiled=True)(func)
+    children_values: list[h.Node] = ["a", "", h.b["b"]]
+    for children in children_values:
+        assert str(layout[children]) == str(func(children))
+
+
+def test_precompiled_children_checked() -> None:
+    calls: list[str] = []
+
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node, title: str) -> h.Renderable:
+        calls.append(title)
+        if isinstance(children, str):
+            children = h.p[children]
+        return h.div[h.h1[title], children]
+
+    assert str(layout("t")["text"]) == "<div><h1>t</h1><p>text</p></div>"
+    assert str(layout("t")[h.b["b"]]) == "<div><h1>t</h1><b>b</b></div>"
+    # Not precompiled, the layout renders every time.
+    assert calls == ["t", "t"]
+
+
+def test_precompiled_unhashable_arguments() -> None:
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node, items: list[str]) -> h.Renderable:
+        return h.ul[h.li[items], children]
+
+    assert str(layout(["a"])["b"]) == "<ul><li>a</li>b</ul>"
+
+
+def test_precompiled_markup_and_str_arguments() -> None:
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node, title: h.Node) -> h.Renderable:
+        return h.div[h.h1[title], children]
+
+    assert str(layout(Markup("<b>trusted</b>"))["x"]) == "<div><h1><b>trusted</b></h1>x</div>"
+    assert str(layout("<b>trusted</b>")["x"]) == ("<div><h1>&lt;b&gt;trusted&lt;/b&gt;</h1>x</div>")
+    assert str(layout(title=(Markup("<i>"),))["x"]) == "<div><h1><i></h1>x</div>"
+    assert str(layout(title=("<i>",))["x"]) == "<div><h1>&lt;i&gt;</h1>x</div>"
+
+
+def test_precompiled_bool_and_int_arguments() -> None:
+    @h.with_children(precompiled=True)
+    def layout(children: h.Node, value: bool | int) -> h.Renderable:
+        return h.div[value, children]
+
+    assert str(layout(1)["x"]) == "<div>1x</div>"
+    assert str(layout(True)["x"]) == "<div>x</div>"
+    assert str(layout(value=1)["x"]) == "<div>1x</div>"
+    assert str(layout(value=True)["x"]) == "<div>x</div>"
+
+
+def test_precompiled_maxsize() -> None:
+    calls: list[str] = []
+
+    @h.with_children(precompiled=True, maxsize=1)
+    def layout(children: h.Node, title: str) -> h.Renderable:
+        calls.append(title)
+        return h.div[h.h1[title], children]
+
+    for title in ["a", "a", "b", "a"]:
+        assert str(layout(title)["x"]) == f"<div><h1>{title}</h1>x</div>"
+    assert calls == ["a", "b", "a"]